@@ -2,7 +2,7 @@ import re
 from datetime import datetime, timedelta, timezone
 
 import orjson as json
-from httpx import AsyncClient, URL
+from httpx import URL
 from nonebot import on_regex
 from nonebot.adapters.onebot.v11 import (
     Bot,
@@ -12,6 +12,7 @@ from nonebot.adapters.onebot.v11 import (
 )
 
 from util.config import config
+from util.http_client import http_client
 from util.permission import ADMIN
 from util.stars import stars
 from .database import bvidList
@@ -34,15 +35,14 @@ async def _(bot: Bot, event: GroupMessageEvent):
     while True:
         bvid = await bvidList.random_bvid()
         headers = {"User-Agent": f"kumabot/{config.version[0]}.{config.version[1]}"}
-        async with AsyncClient(http2=True, follow_redirects=True) as session:
-            resp = await session.get(
-                URL("https://api.bilibili.com/x/web-interface/wbi/view"),
-                params={"bvid": bvid},
-                headers=headers,
-            )
-            if resp.is_error:
-                resp.raise_for_status()
-            video_info = resp.json()
+        resp = await http_client.get(
+            URL("https://api.bilibili.com/x/web-interface/wbi/view"),
+            params={"bvid": bvid},
+            headers=headers,
+        )
+        if resp.is_error:
+            resp.raise_for_status()
+        video_info = resp.json()
         if video_info["code"] != 0:
             await bvidList.remove(bvid)
             continue
@@ -15,7 +15,7 @@ class BvidRecord(Base):
 
 
 class BvidList:
-    @with_transaction
+    @with_transaction(read_only=True)
     async def random_bvid(self, **kwargs) -> str:
         rng = random.default_rng()
         session: AsyncSession = kwargs["session"]
@@ -49,7 +49,7 @@ class BvidList:
         if record:
             await session.delete(record)
 
-    @with_transaction
+    @with_transaction(read_only=True)
     async def count(self, **kwargs) -> int:
         session: AsyncSession = kwargs["session"]
 
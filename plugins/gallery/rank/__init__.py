@@ -4,6 +4,7 @@ import re
 from nonebot import on_regex
 from nonebot.adapters.onebot.v11 import Bot
 
+from util.exceptions import WriteBufferError
 from ..random_bvid.database import bvidList
 from ..rank.database import ranking
 
@@ -14,7 +15,10 @@ rank = on_regex(r"^(迪拉熊|dlx)(排行榜|rank)$", re.I)
 async def _(bot: Bot):
     time = ranking.now
 
-    leaderboard = await ranking.gen_rank(time)
+    try:
+        leaderboard = await ranking.gen_rank(time)
+    except WriteBufferError:
+        await rank.finish("迪拉熊还没记完刚刚的积分，过一会儿再来看排行榜吧~")
 
     leaderboard_output = list()
     count = min(len(leaderboard), 5)  # 最多显示5个人，取实际人数和5的较小值
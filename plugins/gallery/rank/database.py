@@ -7,6 +7,7 @@ from sqlalchemy.future import select
 from sqlalchemy.orm import Mapped, mapped_column
 
 from util.database import Base, with_transaction
+from util.write_buffer import write_buffer
 
 
 class RankingRecord(Base):
@@ -41,8 +42,9 @@ class Ranking:
         # 将年份和周数拼接成字符串
         return f"{year}{week_number:02d}"
 
+    # 刚写入的计数可能尚未同步到只读副本，从主库读取
     @with_transaction
-    async def gen_rank(self, time: str, **kwargs) -> list[tuple[str, int]]:
+    async def _gen_rank(self, time: str, **kwargs) -> list[tuple[str, int]]:
         session: AsyncSession = kwargs["session"]
 
         stmt = select(
@@ -61,11 +63,12 @@ class Ranking:
 
         return leaderboard[:5]
 
-    @with_transaction
-    async def update_count(self, qq: str, type: str, **kwargs) -> None:
-        session: AsyncSession = kwargs["session"]
+    async def gen_rank(self, time: str) -> list[tuple[str, int]]:
+        # 先写入缓冲中的计数，保证排行包含刚刚的记录
+        await write_buffer.flush("ranking_records")
+        return await self._gen_rank(time)
 
-        time = self.now
+    async def update_count(self, qq: str, type: str) -> None:
         count_increment = {"sfw_count": 0, "nsfw_count": 0, "video_count": 0}
         if type == "sfw":
             count_increment["sfw_count"] = 1
@@ -74,9 +77,33 @@ class Ranking:
         elif type == "video":
             count_increment["video_count"] = 1
 
-        stmt = insert(RankingRecord).values(
-            qq=qq, week_key=time, **count_increment, created_at=date.today()
+        write_buffer.put(
+            "ranking_records",
+            {
+                "qq": qq,
+                "week_key": self.now,
+                **count_increment,
+                "created_at": date.today().isoformat(),
+            },
         )
+
+    @staticmethod
+    async def _write_counts(items: list[dict], session: AsyncSession) -> None:
+        # 同一用户同一周的计数先在内存中合并
+        rows: dict[tuple[str, str], dict] = dict()
+        for item in items:
+            key = (item["qq"], item["week_key"])
+            if row := rows.get(key):
+                row["sfw_count"] += item["sfw_count"]
+                row["nsfw_count"] += item["nsfw_count"]
+                row["video_count"] += item["video_count"]
+            else:
+                rows[key] = {
+                    **item,
+                    "created_at": date.fromisoformat(item["created_at"]),
+                }
+
+        stmt = insert(RankingRecord).values(list(rows.values()))
         stmt = stmt.on_conflict_do_update(
             constraint="uq_qq_week_key",
             set_={
@@ -89,3 +116,4 @@ class Ranking:
 
 
 ranking = Ranking()
+write_buffer.register("ranking_records", ranking._write_counts)
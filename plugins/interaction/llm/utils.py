@@ -2,7 +2,7 @@ import base64
 from datetime import datetime, timedelta, timezone
 from typing import Optional
 
-from httpx import AsyncClient, HTTPError
+from httpx import HTTPError
 from nonebot.adapters.onebot.v11 import (
     Bot,
     GroupMessageEvent,
@@ -13,6 +13,7 @@ from volcenginesdkarkruntime import AsyncArk
 from xxhash import xxh32_hexdigest
 
 from util.config import config
+from util.http_client import http_client
 
 client = AsyncArk(api_key=config.llm_api_key)
 
@@ -260,17 +261,16 @@ async def gen_vedio_info(url: str, file: str) -> str:
 
 
 async def _get_media_url(content_type: str, url: str, format: str) -> str:
-    async with AsyncClient(http2=True, follow_redirects=True) as session:
-        try:
-            resp = await session.get(url)
-        except HTTPError:
-            return url
+    try:
+        resp = await http_client.get(url)
+    except HTTPError:
+        return url
 
-        if resp.is_error:
-            return url
+    if resp.is_error:
+        return url
 
-        encoded_data = base64.b64encode(resp.content).decode()
-        return f"data:{content_type}/{format};base64,{encoded_data}"
+    encoded_data = base64.b64encode(resp.content).decode()
+    return f"data:{content_type}/{format};base64,{encoded_data}"
 
 
 async def _gen_media_info(
@@ -1,10 +1,11 @@
 import re
 
-from httpx import AsyncClient, URL
+from httpx import URL
 from nonebot import on_regex
 from nonebot.adapters.onebot.v11 import MessageEvent, MessageSegment
 
 from util.config import config
+from util.http_client import http_client
 from util.stars import stars
 
 tts = on_regex(r"^(迪拉熊|dlx)(说：?|say|speak|t[2t][as])\s*.", re.I)
@@ -33,7 +34,7 @@ async def _(event: MessageEvent):
 
     audio, usage_characters = await text_to_speech(text)
     if not await stars.apply_change(qq, -usage_characters, "让迪拉熊说话", event.time):
-        raise
+        await tts.finish(f"这段话要{usage_characters}颗★，你的★不够哦~", at_sender=True)
     balance = await stars.get_balance(qq)
     if balance == "inf":
         msg = f"迪拉熊吃掉了{usage_characters}颗★mai~你有∞颗★哦~"
@@ -63,13 +64,12 @@ async def text_to_speech(text: str) -> tuple[bytes, int]:
         "language_boost": "auto",
     }
 
-    async with AsyncClient(http2=True, follow_redirects=True) as session:
-        resp = await session.post(
-            URL("https://api.minimaxi.com/v1/t2a_v2"), json=payload, headers=headers
-        )
-        if resp.is_error:
-            resp.raise_for_status()
-        audio_info = resp.json()
+    resp = await http_client.post(
+        URL("https://api.minimaxi.com/v1/t2a_v2"), json=payload, headers=headers
+    )
+    if resp.is_error:
+        resp.raise_for_status()
+    audio_info = resp.json()
 
     data = audio_info.get("data", dict())
     if not (audio := data.get("audio")):
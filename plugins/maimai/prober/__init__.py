@@ -1,38 +1,30 @@
 import asyncio
-import math
+import os
 import re
 from io import BytesIO
 from pathlib import Path
 from typing import Optional
 
-import numpy as np
 from grpc import RpcError, StatusCode
 from nonebot import on_regex
 from nonebot.adapters.onebot.v11 import Bot, MessageEvent, MessageSegment
 from numpy import random
-from rapidfuzz import fuzz, process
 from requests import HTTPError
 
+from util.alias import get_alias_index
 from util.config import config
 from util.data import (
     get_alias_list_lxns,
     get_alias_list_xray,
     get_alias_list_ycn,
-    get_chart_stats,
-    get_music_data_df,
 )
 from util.resources import get_frame, get_icon, get_plate
-from .bests_gen import (
-    compute_record,
-    dxscore_proc,
-    find_song_by_id,
-    generate_wcb,
-    generatebests,
-    get_fit_diff,
-    get_page_records,
-    ratings,
-    records_filter,
-)
+from .bests_cache import get_bests_image
+from .bests_engine import BestsComparer, RecordTable, get_rating_solver, select_bests
+from .bests_gen import generate_wcb, generatebests
+from .catalog import SongCatalog, get_song_catalog, sibling_id
+from .chart_stats import get_chart_stats_index
+from .completion import get_completion_table
 from .database import user_config_manager
 from .diving_fish import get_player_record, get_player_records
 from .info_gen import (
@@ -42,7 +34,7 @@ from .info_gen import (
     utage_chart_info,
     utage_score_info,
 )
-from .limekuma_client import BestsApiClient, ListApiClient
+from .limekuma_client import ListApiClient, collect_image
 
 best50 = on_regex(r"^dlxb?50$", re.I)
 ani50 = on_regex(r"^dlxani(50)?$", re.I)
@@ -105,71 +97,27 @@ set_source = on_regex(
 set_token = on_regex(r"^(迪拉熊|dlx)?(绑定|bind)\s*(落雪|水鱼)\s*.", re.I)
 
 
+async def prefetch_user_configs(event: MessageEvent):
+    # 发起者与被@用户的设置一次查询完，之后读取权限与外观都命中缓存
+    user_ids = [event.get_user_id()]
+    user_ids.extend(message.data["qq"] for message in event.get_message()["at"])
+    await user_config_manager.get_user_configs(user_ids)
+
+
 # 根据乐曲别名查询乐曲id列表
-async def find_songid_by_alias(name, song_list):
+async def find_songid_by_alias(name, catalog: SongCatalog):
     # 芝士id列表
-    matched_ids = list()
+    matched_ids = [info["id"] for info in catalog.find_by_title_casefold(name)]
 
     # 芝士查找
-    for info in song_list:
-        if name.casefold() == info["title"].casefold() or name == info["id"]:
-            matched_ids.append(info["id"])
+    if catalog.get(name) and name not in matched_ids:
+        matched_ids.append(name)
 
     if matched_ids:
         return matched_ids
 
-    alias_map = dict()
-
-    async def process_lxns(alias_map: dict[str, list[str]]):
-        alias_list = await get_alias_list_lxns()
-        for info in alias_list["aliases"]:
-            song_id = str(info["song_id"])
-            for alias in info["aliases"]:
-                alias_map.setdefault(alias, list())
-                if song_id in alias_map[alias]:
-                    continue
-                alias_map[alias].append(song_id)
-
-    async def process_xray(alias_map: dict[str, list[str]]):
-        alias_list = await get_alias_list_xray()
-        for song_id, info in alias_list.items():
-            for alias in info:
-                alias_map.setdefault(alias, list())
-                if song_id in alias_map[alias]:
-                    continue
-                alias_map[alias].append(song_id)
-
-    async def process_ycn(alias_map: dict[str, list[str]]):
-        alias_list = await get_alias_list_ycn()
-        for info in alias_list["content"]:
-            song_id = str(info["SongID"])
-            for alias in info["Alias"]:
-                alias_map.setdefault(alias, list())
-                if song_id in alias_map[alias]:
-                    continue
-                alias_map[alias].append(song_id)
-
-    await asyncio.gather(
-        process_lxns(alias_map), process_xray(alias_map), process_ycn(alias_map)
-    )
-
-    results = process.extract(
-        name, alias_map.keys(), scorer=fuzz.QRatio, score_cutoff=100
-    )
-    filtered = {
-        id for ids in [alias_map[alias] for alias, _, _ in results] for id in ids
-    }
-    matched_ids = list(filtered)
-    if len(matched_ids) > 0:
-        return matched_ids
-
-    results = process.extract(
-        name, alias_map.keys(), scorer=fuzz.WRatio, score_cutoff=80
-    )
-    filtered = {
-        id for ids in [alias_map[alias] for alias, _, _ in results] for id in ids
-    }
-    matched_ids = list(filtered)
+    alias_index = await get_alias_index()
+    matched_ids = alias_index.search(name)
 
     # 芝士排序
     # sorted_matched_ids = sorted(matched_ids, key=int)
@@ -180,7 +128,7 @@ async def find_songid_by_alias(name, song_list):
 
 async def records_to_bests(
     records: Optional[list],
-    songList,
+    catalog: SongCatalog,
     fc_rules: Optional[list] = None,
     rate_rules: Optional[list] = None,
     is_fit: bool = False,
@@ -191,256 +139,47 @@ async def records_to_bests(
     dx_star_count: Optional[str] = None,
     rating: int = 0,
 ):
-    sd = list()
-    dx = list()
-    charts = await get_chart_stats()
-    mask_enabled = False
-
-    def default_k(x):
-        return (x["ra"], x["ds"], x["achievements"])
-
     if not records:
-        for song in songList:
-            if len(song["id"]) > 5:
-                continue
-            for i, j in enumerate(song["ds"]):
-                record = {
-                    "achievements": 101,
-                    "ds": j,
-                    "dxScore": np.sum(song["charts"][i]["notes"]) * 3,
-                    "fc": "fsdp",
-                    "fs": "app",
-                    "level": str(),
-                    "level_index": i,
-                    "level_label": [
-                        "Basic",
-                        "Advanced",
-                        "Expert",
-                        "Master",
-                        "ReMASTER",
-                    ][i],
-                    "ra": math.trunc(j * 22.512),
-                    "rate": "sssp",
-                    "song_id": int(song["id"]),
-                    "title": song["title"],
-                    "type": song["type"],
-                }
-                if song["basic_info"]["is_new"]:
-                    dx.append(record)
-                else:
-                    sd.append(record)
-        sd.sort(key=default_k, reverse=True)
-        dx.sort(key=default_k, reverse=True)
-        if rating:
-            while (
-                np.sum(d["ra"] for d in sd[:35]) + np.sum(d["ra"] for d in dx[:15])
-                > rating
-            ):
-                if (dx and sd and dx[0]["ra"] > sd[0]["ra"]) or (dx and not sd):
-                    b = dx
-                elif sd:
-                    b = sd
-                else:
-                    continue
-                b.pop(0)
-        return sd[:35], dx[:15], False
-    for record in records:
-        if record["level_label"] == "Utage":
-            continue
-        if fc_rules and record["fc"] not in fc_rules:
-            continue
-        if rate_rules and record["rate"] not in rate_rules:
-            continue
-        song_id = str(record["song_id"])
-        song_data = [d for d in songList if d["id"] == song_id][0]
-        is_new = song_data["basic_info"]["is_new"]
-        fit_diff = get_fit_diff(song_id, record["level_index"], record["ds"], charts)
-        if is_fit:
-            if record["achievements"] > 0 and record["dxScore"] == 0:
-                mask_enabled = True
-                continue
-            record["s_ra"] = record["ds"]
-            record["ds"] = math.trunc(fit_diff * 100) / 100
-            record["ra"] = math.trunc(
-                fit_diff
-                * (record["achievements"] if record["achievements"] < 100.5 else 100.5)
-                * get_ra_in(record["rate"])
-                / 100
-            )
-        if is_sd:
-            record["diff"] = (
-                charts["charts"][song_id][record["level_index"]]["std_dev"]
-                if song_id in charts["charts"]
-                else 0.0
-            )
-        if is_dxs:
-            if record["achievements"] > 0 and record["dxScore"] == 0:
-                mask_enabled = True
-                continue
-            if not dx_star_count:
-                song_data = find_song_by_id(song_id, songList)
-                if not song_data:
-                    continue
-                record["achievements"] = (
-                    record["dxScore"]
-                    / (np.sum(song_data["charts"][record["level_index"]]["notes"]) * 3)
-                    * 101
-                )
-                record["ra"] = math.trunc(
-                    record["ds"]
-                    * record["achievements"]
-                    * get_ra_in(record["rate"])
-                    / 100
-                )
-            else:
-                sum_dxscore = (
-                    np.sum(song_data["charts"][record["level_index"]]["notes"]) * 3
-                )
-                _, stars = dxscore_proc(record["dxScore"], sum_dxscore)
-                if str(stars) not in dx_star_count:
-                    continue
-        if is_old:
-            if record["achievements"] > 0 and record["dxScore"] == 0:
-                mask_enabled = True
-                continue
-            record["ra"] = math.trunc(
-                record["ds"]
-                * (record["achievements"] if record["achievements"] < 100.5 else 100.5)
-                * get_ra_in_old(record["rate"])
-                / 100
-            )
-        if record["ra"] == 0 or record["achievements"] > 101:
-            continue
-        if is_new or is_all:
-            b = dx
-        else:
-            b = sd
-        b.append(record)
-    if is_all:
-        all_records = sorted(dx, key=default_k, reverse=True)
-        dx = list()
-        for record in [
-            i
-            for i in all_records
-            if i["ra"]
-            >= all_records[49 if len(all_records) > 50 else len(all_records) - 1]["ra"]
-        ]:
-            song_id = str(record["song_id"])
-            song_data = [d for d in songList if d["id"] == song_id][0]
-            is_new = song_data["basic_info"]["is_new"]
-            if is_new:
-                if len(dx) < 15:
-                    dx.append(record)
-                    all_records.remove(record)
-            elif len(sd) < 35:
-                sd.append(record)
-                all_records.remove(record)
-            if len(dx) >= 15 and len(sd) >= 35:
-                break
-        else:
-            for i in all_records:
-                if len(sd) < 35:
-                    b = sd
-                elif len(dx) < 15:
-                    b = dx
-                else:
-                    break
-                b.append(i)
-        return sd, dx, mask_enabled
-    if is_sd:
-
-        def k(x):
-            return (x["ra"] * (1 + x["diff"] / 10), x["ds"], x["achievements"])
-    else:
-        k = default_k
-    b35 = sorted(sd, key=k, reverse=True)[: 25 if is_old else 35]
-    b15 = sorted(dx, key=k, reverse=True)[:15]
-    return b35, b15, mask_enabled
-
-
-async def compare_bests(sender_records, target_records, songList):
-    handle_type = len(sender_records) > len(target_records)
-    sd = list()
-    dx = list()
-    mask_enabled = False
-    b35, b15, mask_enabled = await records_to_bests(sender_records, songList)
-    if not b35 and not b15:
-        return sd, dx, mask_enabled
-    sd_min = b35[-1]["ra"] if b35 else -1
-    dx_min = b15[-1]["ra"] if b15 else -1
-    for record in target_records if handle_type else sender_records:
-        if record["level_label"] == "Utage":
-            continue
-        if record["ra"] == 0 or record["achievements"] > 101:
-            continue
-        if record["achievements"] > 0 and record["dxScore"] == 0:
-            mask_enabled = True
-            continue
-        other_record = [
-            d
-            for d in (sender_records if handle_type else target_records)
-            if d["song_id"] == record["song_id"]
-            and d["level_index"] == record["level_index"]
-        ]
-        if not other_record:
-            continue
-        other_record = other_record[0]
-        if other_record["ra"] == 0 or other_record["achievements"] > 101:
-            continue
-        if other_record["achievements"] > 0 and other_record["dxScore"] == 0:
-            mask_enabled = True
-            continue
-        song_id = str(record["song_id"])
-        song_data = [d for d in songList if d["id"] == song_id][0]
-        is_new = song_data["basic_info"]["is_new"]
-        if handle_type:
-            record["preferred"] = record["ra"] >= (dx_min if is_new else sd_min)
-            record["s_ra"] = other_record["ra"]
-            if is_new:
-                dx.append(record)
-            else:
-                sd.append(record)
-        else:
-            other_record["preferred"] = other_record["ra"] >= (
-                dx_min if is_new else sd_min
-            )
-            other_record["s_ra"] = record["ra"]
-            if is_new:
-                dx.append(other_record)
-            else:
-                sd.append(other_record)
-
-    def k(x):
-        return (x["preferred"], x["ra"] - x["s_ra"], x["ds"], x["achievements"])
-
-    b35 = sorted(sd, key=k, reverse=True)[:35]
-    b15 = sorted(dx, key=k, reverse=True)[:15]
-    return b35, b15, mask_enabled
-
-
-def get_ra_in(rate: str) -> float:
-    return ratings[rate][1]
+        sd, dx = get_rating_solver(catalog).solve(rating)
+        return sd, dx, False
+    stats = await get_chart_stats_index()
+    table = RecordTable(records, catalog, stats, with_notes=is_dxs)
+    return select_bests(
+        table,
+        fc_rules,
+        rate_rules,
+        is_fit=is_fit,
+        is_sd=is_sd,
+        is_dxs=is_dxs,
+        is_all=is_all,
+        is_old=is_old,
+        dx_star_count=dx_star_count,
+    )
 
 
-def get_ra_in_old(rate: str) -> float:
-    return ratings[rate][2]
+async def compare_bests(
+    sender_records: list, target_records_list: list[list], catalog: SongCatalog
+) -> list[tuple[list, list, bool]]:
+    b35, b15, mask_enabled = await records_to_bests(sender_records, catalog)
+    if not b35 and not b15:
+        return [(list(), list(), mask_enabled) for _ in target_records_list]
+    # 发起者的成绩只建一次索引，与每个被比较者分别合并
+    comparer = BestsComparer(sender_records, catalog, b35, b15)
+    return [comparer.compare(records) for records in target_records_list]
 
 
-async def get_info_by_name(name, music_type, songList):
-    rep_ids = await find_songid_by_alias(name, songList)
+async def get_info_by_name(name, music_type, catalog: SongCatalog):
+    rep_ids = await find_songid_by_alias(name, catalog)
     if not rep_ids:
         return 2, None
     rep_id = name
     if music_type or name not in rep_ids:
         for song_id in rep_ids.copy():
-            id_int = int(song_id)
-            song_info = find_song_by_id(song_id, songList)
+            song_info = catalog.get(song_id)
             if not song_info:
                 rep_ids.remove(song_id)
-                other_id = (
-                    str(id_int + 10000) if id_int < 10000 else str(id_int % 10000)
-                )
-                song_info = find_song_by_id(other_id, songList)
+                other_id = sibling_id(song_id)
+                song_info = catalog.get(other_id)
                 if not song_info:
                     continue
                 if not check_type(song_info, music_type):
@@ -453,19 +192,14 @@ async def get_info_by_name(name, music_type, songList):
                     continue
                 if song_info["basic_info"]["genre"] == "宴会場":
                     continue
-                elif song_info["type"] == "DX":
-                    other_id = str(id_int % 10000)
-                elif song_info["type"] == "SD":
-                    other_id = str(id_int + 10000)
-                else:
+                elif song_info["type"] not in ("DX", "SD"):
+                    continue
+                other_info = catalog.get_sibling(song_id)
+                if not other_info or other_info["id"] in rep_ids:
                     continue
-                if other_id in rep_ids:
+                if not check_type(other_info, music_type):
                     continue
-                other_info = find_song_by_id(other_id, songList)
-                if other_info:
-                    if not check_type(other_info, music_type):
-                        continue
-                    rep_ids.append(other_id)
+                rep_ids.append(other_info["id"])
         if not rep_ids:
             return 2, None
         elif len(rep_ids) > 16:
@@ -474,7 +208,7 @@ async def get_info_by_name(name, music_type, songList):
             output_lst = set()
             song_info = None
             for song_id in sorted(rep_ids, key=int):
-                song_info = find_song_by_id(song_id, songList)
+                song_info = catalog.get(song_id)
                 if not song_info:
                     continue
                 song_title = f"{song_info['id']}：{song_info['title']}"
@@ -484,7 +218,7 @@ async def get_info_by_name(name, music_type, songList):
             return 1, output_lst if len(output_lst) > 1 else song_info
 
         rep_id = rep_ids[0]
-    song_info = find_song_by_id(rep_id, songList)
+    song_info = catalog.get(rep_id)
     if not song_info:
         return 2, None
 
@@ -511,6 +245,7 @@ async def _(bot: Bot, event: MessageEvent):
     sender_qq = event.user_id
     target_qq = event.get_user_id()
     user_info = await bot.get_stranger_info(user_id=sender_qq)
+    await prefetch_user_configs(event)
     for message in event.get_message()["at"]:
         target_qq = message.data["qq"]
         if target_qq == event.get_user_id():
@@ -545,82 +280,68 @@ async def _(bot: Bot, event: MessageEvent):
     elif source == "diving-fish":
         source_name = "水鱼"
         another_source_name = "落雪"
-    img_byte_arr = BytesIO()
-    async with BestsApiClient() as client:
-        try:
-            if source == "lxns":
-                params = {"dev_token": config.lx_token}
-                if lx_personal_token:
-                    params["personal_token"] = lx_personal_token
-                else:
-                    params["qq"] = int(target_qq)
-                gen = client.get_from_lxns(**params)
-            elif source == "diving-fish":
-                params = {
-                    "qq": int(target_qq),
-                    "frame": int(frame),
-                    "plate": int(plate),
-                    "icon": int(icon),
-                }
-                gen = client.get_from_diving_fish(**params)
-            else:
-                return
-            async for b in gen:
-                img_byte_arr.write(b.data)
-        except RpcError as err:
-            if err.code() == StatusCode.NOT_FOUND:
-                msg = (
-                    MessageSegment.at(sender_qq),
-                    MessageSegment.text(" "),
-                    MessageSegment.text(
-                        f"迪拉熊没有在{source_name}查分器上找到{
-                            '你' if target_qq == event.get_user_id() else '他'
-                        }的信息，可以试试发送“换源{another_source_name}”更换查分器mai~"
-                    ),
-                    MessageSegment.image(Path("./Static/Maimai/Function/1.png")),
-                )
-            elif err.code() == StatusCode.PERMISSION_DENIED:
-                msg = (
-                    MessageSegment.at(sender_qq),
-                    MessageSegment.text(" "),
-                    MessageSegment.text(
-                        f"{'你' if target_qq == event.get_user_id() else '他'}在{
-                            source_name
-                        }查分器启用了隐私，或者没有同意{
-                            source_name
-                        }查分器的用户协议mai~"
-                    ),
-                    MessageSegment.image(Path("./Static/Maimai/Function/1.png")),
-                )
-            elif err.code() == StatusCode.UNAUTHENTICATED:
-                msg = (
-                    MessageSegment.at(sender_qq),
-                    MessageSegment.text(" "),
-                    MessageSegment.text(
-                        f"{'你' if target_qq == event.get_user_id() else '他'}的{
-                            source_name
-                        }查分器绑定有点问题mai~"
-                    ),
-                    MessageSegment.image(Path("./Static/Maimai/Function/1.png")),
-                )
-            else:
-                msg = (
-                    MessageSegment.text("（查分器出了点问题）"),
-                    MessageSegment.image(Path("./Static/Maimai/Function/2.png")),
-                )
-            await best50.finish(msg)
-    img_byte_arr.seek(0)
-    img_bytes = img_byte_arr.getvalue()
+    # 成绩与外观均未变化时直接复用上次生成的图片
+    try:
+        img = await get_bests_image(
+            False, target_qq, source, lx_personal_token, frame, plate, icon
+        )
+    except RpcError as err:
+        if err.code() == StatusCode.NOT_FOUND:
+            msg = (
+                MessageSegment.at(sender_qq),
+                MessageSegment.text(" "),
+                MessageSegment.text(
+                    f"迪拉熊没有在{source_name}查分器上找到{
+                        '你' if target_qq == event.get_user_id() else '他'
+                    }的信息，可以试试发送“换源{another_source_name}”更换查分器mai~"
+                ),
+                MessageSegment.image(Path("./Static/Maimai/Function/1.png")),
+            )
+        elif err.code() == StatusCode.PERMISSION_DENIED:
+            msg = (
+                MessageSegment.at(sender_qq),
+                MessageSegment.text(" "),
+                MessageSegment.text(
+                    f"{'你' if target_qq == event.get_user_id() else '他'}在{
+                        source_name
+                    }查分器启用了隐私，或者没有同意{source_name}查分器的用户协议mai~"
+                ),
+                MessageSegment.image(Path("./Static/Maimai/Function/1.png")),
+            )
+        elif err.code() == StatusCode.UNAUTHENTICATED:
+            msg = (
+                MessageSegment.at(sender_qq),
+                MessageSegment.text(" "),
+                MessageSegment.text(
+                    f"{'你' if target_qq == event.get_user_id() else '他'}的{
+                        source_name
+                    }查分器绑定有点问题mai~"
+                ),
+                MessageSegment.image(Path("./Static/Maimai/Function/1.png")),
+            )
+        else:
+            msg = (
+                MessageSegment.text("（查分器出了点问题）"),
+                MessageSegment.image(Path("./Static/Maimai/Function/2.png")),
+            )
+        await best50.finish(msg)
+    if img is None:
+        return
     msg = (
         MessageSegment.at(sender_qq),
-        MessageSegment.image(img_bytes),
+        MessageSegment.image(img),
     )
-    await best50.send(msg)
+    try:
+        await best50.send(msg)
+    finally:
+        if isinstance(img, Path):
+            os.remove(img)
 
 
 @ani50.handle()
 async def _(event: MessageEvent):
     target_qq = event.get_user_id()
+    await prefetch_user_configs(event)
     for message in event.get_message()["at"]:
         target_qq = message.data["qq"]
         if target_qq == event.get_user_id():
@@ -646,74 +367,62 @@ async def _(event: MessageEvent):
     elif source == "diving-fish":
         source_name = "水鱼"
         another_source_name = "落雪"
-    img_byte_arr = BytesIO()
-    async with BestsApiClient() as client:
-        try:
-            if source == "lxns":
-                params = {"dev_token": config.lx_token}
-                if lx_personal_token:
-                    params["personal_token"] = lx_personal_token
-                else:
-                    params["qq"] = int(target_qq)
-                gen = client.get_anime_from_lxns(**params)
-            elif source == "diving-fish":
-                params = {
-                    "qq": int(target_qq),
-                    "frame": int(frame),
-                    "plate": int(plate),
-                    "icon": int(icon),
-                }
-                gen = client.get_anime_from_diving_fish(**params)
-            else:
-                return
-            async for b in gen:
-                img_byte_arr.write(b.data)
-        except RpcError as err:
-            if err.code() == StatusCode.NOT_FOUND:
-                msg = (
-                    MessageSegment.text(
-                        f"迪拉熊没有在{source_name}查分器上找到{
-                            '你' if target_qq == event.get_user_id() else '他'
-                        }的信息，可以试试发送“换源{another_source_name}”更换查分器mai~"
-                    ),
-                    MessageSegment.image(Path("./Static/Maimai/Function/1.png")),
-                )
-            elif err.code() == StatusCode.PERMISSION_DENIED:
-                msg = (
-                    MessageSegment.text(
-                        f"{'你' if target_qq == event.get_user_id() else '他'}在{
-                            source_name
-                        }查分器启用了隐私或者没有同意{source_name}查分器的用户协议mai~"
-                    ),
-                    MessageSegment.image(Path("./Static/Maimai/Function/1.png")),
-                )
-            elif err.code() == StatusCode.UNAUTHENTICATED:
-                msg = (
-                    MessageSegment.text(
-                        f"{'你' if target_qq == event.get_user_id() else '他'}的{
-                            source_name
-                        }查分器绑定有点问题mai~"
-                    ),
-                    MessageSegment.image(Path("./Static/Maimai/Function/1.png")),
-                )
-            else:
-                msg = (
-                    MessageSegment.text("（查分器出了点问题）"),
-                    MessageSegment.image(Path("./Static/Maimai/Function/2.png")),
-                )
-            await ani50.finish(msg, at_sender=True)
-    img_byte_arr.seek(0)
-    img_bytes = img_byte_arr.getvalue()
+    # 成绩与外观均未变化时直接复用上次生成的图片
+    try:
+        img = await get_bests_image(
+            True, target_qq, source, lx_personal_token, frame, plate, icon
+        )
+    except RpcError as err:
+        if err.code() == StatusCode.NOT_FOUND:
+            msg = (
+                MessageSegment.text(
+                    f"迪拉熊没有在{source_name}查分器上找到{
+                        '你' if target_qq == event.get_user_id() else '他'
+                    }的信息，可以试试发送“换源{another_source_name}”更换查分器mai~"
+                ),
+                MessageSegment.image(Path("./Static/Maimai/Function/1.png")),
+            )
+        elif err.code() == StatusCode.PERMISSION_DENIED:
+            msg = (
+                MessageSegment.text(
+                    f"{'你' if target_qq == event.get_user_id() else '他'}在{
+                        source_name
+                    }查分器启用了隐私或者没有同意{source_name}查分器的用户协议mai~"
+                ),
+                MessageSegment.image(Path("./Static/Maimai/Function/1.png")),
+            )
+        elif err.code() == StatusCode.UNAUTHENTICATED:
+            msg = (
+                MessageSegment.text(
+                    f"{'你' if target_qq == event.get_user_id() else '他'}的{
+                        source_name
+                    }查分器绑定有点问题mai~"
+                ),
+                MessageSegment.image(Path("./Static/Maimai/Function/1.png")),
+            )
+        else:
+            msg = (
+                MessageSegment.text("（查分器出了点问题）"),
+                MessageSegment.image(Path("./Static/Maimai/Function/2.png")),
+            )
+        await ani50.finish(msg, at_sender=True)
+    if img is None:
+        return
     msg = (
         MessageSegment.at(target_qq),
-        MessageSegment.image(img_bytes),
+        MessageSegment.image(img),
     )
-    await ani50.send(msg)
+    try:
+        await ani50.send(msg)
+    finally:
+        if isinstance(img, Path):
+            os.remove(img)
 
 
 @ap50.handle()
 async def _(event: MessageEvent):
     target_qq = event.get_user_id()
+    await prefetch_user_configs(event)
     for message in event.get_message()["at"]:
         target_qq = message.data["qq"]
         if target_qq == event.get_user_id():
@@ -753,8 +462,8 @@ async def _(event: MessageEvent):
             ),
             at_sender=True,
         )
-    songList = await get_music_data_df()
-    ap35, ap15, _ = await records_to_bests(records, songList, ["ap", "app"])
+    catalog = await get_song_catalog()
+    ap35, ap15, _ = await records_to_bests(records, catalog, ["ap", "app"])
     if not ap35 and not ap15:
         await ap50.finish(
             (
@@ -782,7 +491,7 @@ async def _(event: MessageEvent):
         frame=frame,
         plate=plate,
         is_rating_tj=is_rating_tj,
-        songList=songList,
+        catalog=catalog,
     )
     msg = MessageSegment.image(img)
     await ap50.send(msg, at_sender=True)
@@ -791,6 +500,7 @@ async def _(event: MessageEvent):
 @fc50.handle()
 async def _(event: MessageEvent):
     target_qq = event.get_user_id()
+    await prefetch_user_configs(event)
     for message in event.get_message()["at"]:
         target_qq = message.data["qq"]
         if target_qq == event.get_user_id():
@@ -830,8 +540,8 @@ async def _(event: MessageEvent):
             ),
             at_sender=True,
         )
-    songList = await get_music_data_df()
-    fc35, fc15, _ = await records_to_bests(records, songList, ["fc", "fcp"])
+    catalog = await get_song_catalog()
+    fc35, fc15, _ = await records_to_bests(records, catalog, ["fc", "fcp"])
     if not fc35 and not fc15:
         await fc50.finish(
             (
@@ -859,7 +569,7 @@ async def _(event: MessageEvent):
         frame=frame,
         plate=plate,
         is_rating_tj=is_rating_tj,
-        songList=songList,
+        catalog=catalog,
     )
     msg = MessageSegment.image(img)
     await fc50.send(msg, at_sender=True)
@@ -868,6 +578,7 @@ async def _(event: MessageEvent):
 @fit50.handle()
 async def _(event: MessageEvent):
     target_qq = event.get_user_id()
+    await prefetch_user_configs(event)
     for message in event.get_message()["at"]:
         target_qq = message.data["qq"]
         if target_qq == event.get_user_id():
@@ -907,8 +618,8 @@ async def _(event: MessageEvent):
             ),
             at_sender=True,
         )
-    songList = await get_music_data_df()
-    b35, b15, mask_enabled = await records_to_bests(records, songList, is_fit=True)
+    catalog = await get_song_catalog()
+    b35, b15, mask_enabled = await records_to_bests(records, catalog, is_fit=True)
     if not b35 and not b15:
         if mask_enabled:
             msg = f"迪拉熊无法获取{'你' if target_qq == event.get_user_id() else '他'}的真实成绩mai~"
@@ -938,7 +649,7 @@ async def _(event: MessageEvent):
         frame=frame,
         plate=plate,
         is_rating_tj=is_rating_tj,
-        songList=songList,
+        catalog=catalog,
     )
     msg = MessageSegment.image(img)
     await fit50.send(msg, at_sender=True)
@@ -947,6 +658,7 @@ async def _(event: MessageEvent):
 @best40.handle()
 async def _(event: MessageEvent):
     target_qq = event.get_user_id()
+    await prefetch_user_configs(event)
     for message in event.get_message()["at"]:
         target_qq = message.data["qq"]
         if target_qq == event.get_user_id():
@@ -986,8 +698,8 @@ async def _(event: MessageEvent):
             ),
             at_sender=True,
         )
-    songList = await get_music_data_df()
-    b25, b15, _ = await records_to_bests(records, songList, is_old=True)
+    catalog = await get_song_catalog()
+    b25, b15, _ = await records_to_bests(records, catalog, is_old=True)
     nickname = data["nickname"]
     dani = data["additional_rating"]
     user_config = await user_config_manager.get_user_config(target_qq)
@@ -1005,7 +717,7 @@ async def _(event: MessageEvent):
         frame=frame,
         plate=plate,
         is_rating_tj=is_rating_tj,
-        songList=songList,
+        catalog=catalog,
     )
     msg = MessageSegment.image(img)
     await best40.send(msg, at_sender=True)
@@ -1014,6 +726,7 @@ async def _(event: MessageEvent):
 @rate50.handle()
 async def _(event: MessageEvent):
     target_qq = event.get_user_id()
+    await prefetch_user_configs(event)
     for message in event.get_message()["at"]:
         target_qq = message.data["qq"]
         if target_qq == event.get_user_id():
@@ -1055,8 +768,8 @@ async def _(event: MessageEvent):
         )
     msg_text = event.get_plaintext().replace("+", "p").casefold()
     rate_rules = re.findall(r"s{1,3}p?|a{1,3}|b{1,3}|[cd]", msg_text, re.I)
-    songList = await get_music_data_df()
-    rate35, rate15, _ = await records_to_bests(records, songList, rate_rules=rate_rules)
+    catalog = await get_song_catalog()
+    rate35, rate15, _ = await records_to_bests(records, catalog, rate_rules=rate_rules)
     if not rate35 and not rate15:
         await rate50.finish(
             (
@@ -1084,7 +797,7 @@ async def _(event: MessageEvent):
         frame=frame,
         plate=plate,
         is_rating_tj=is_rating_tj,
-        songList=songList,
+        catalog=catalog,
     )
     msg = MessageSegment.image(img)
     await rate50.send(msg, at_sender=True)
@@ -1093,6 +806,7 @@ async def _(event: MessageEvent):
 @dxs50.handle()
 async def _(event: MessageEvent):
     target_qq = event.get_user_id()
+    await prefetch_user_configs(event)
     for message in event.get_message()["at"]:
         target_qq = message.data["qq"]
         if target_qq == event.get_user_id():
@@ -1132,8 +846,8 @@ async def _(event: MessageEvent):
             ),
             at_sender=True,
         )
-    songList = await get_music_data_df()
-    dxs35, dxs15, mask_enabled = await records_to_bests(records, songList, is_dxs=True)
+    catalog = await get_song_catalog()
+    dxs35, dxs15, mask_enabled = await records_to_bests(records, catalog, is_dxs=True)
     if not dxs35 and not dxs15:
         if mask_enabled:
             msg = f"迪拉熊无法获取{'你' if target_qq == event.get_user_id() else '他'}的真实成绩mai~"
@@ -1163,7 +877,7 @@ async def _(event: MessageEvent):
         frame=frame,
         plate=plate,
         is_rating_tj=is_rating_tj,
-        songList=songList,
+        catalog=catalog,
     )
     msg = MessageSegment.image(img)
     await dxs50.send(msg, at_sender=True)
@@ -1176,6 +890,7 @@ async def _(event: MessageEvent):
         return
 
     target_qq = event.get_user_id()
+    await prefetch_user_configs(event)
     for message in event.get_message()["at"]:
         target_qq = message.data["qq"]
         if target_qq == event.get_user_id():
@@ -1215,9 +930,9 @@ async def _(event: MessageEvent):
             ),
             at_sender=True,
         )
-    songList = await get_music_data_df()
+    catalog = await get_song_catalog()
     star35, star15, mask_enabled = await records_to_bests(
-        records, songList, is_dxs=True, dx_star_count=match.group(1)
+        records, catalog, is_dxs=True, dx_star_count=match.group(1)
     )
     if not star35 and not star15:
         if mask_enabled:
@@ -1248,7 +963,7 @@ async def _(event: MessageEvent):
         frame=frame,
         plate=plate,
         is_rating_tj=is_rating_tj,
-        songList=songList,
+        catalog=catalog,
     )
     msg = MessageSegment.image(img)
     await star50.send(msg, at_sender=True)
@@ -1257,25 +972,27 @@ async def _(event: MessageEvent):
 @cf50.handle()
 async def _(event: MessageEvent):
     sender_qq = event.get_user_id()
-    target_qq = None
+    target_qqs = list()
+    mentioned = False
+    await prefetch_user_configs(event)
     for message in event.get_message()["at"]:
         target_qq = message.data["qq"]
-        if target_qq == sender_qq:
+        if target_qq == sender_qq or target_qq in target_qqs:
             continue
+        mentioned = True
         if await user_config_manager.get_config_value(target_qq, "allow_other", True):
-            break
-    else:
-        if target_qq != sender_qq:
+            target_qqs.append(target_qq)
+    if not target_qqs:
+        if mentioned:
             msg = (
                 MessageSegment.text("他不允许别人查询他的成绩mai~"),
                 MessageSegment.image(Path("./Static/Maimai/Function/3.png")),
             )
-            await cf50.finish(msg, at_sender=True)
-    if not target_qq or target_qq == sender_qq:
-        msg = (
-            MessageSegment.text("你没有比较任何人mai~"),
-            MessageSegment.image(Path("./Static/Maimai/Function/1.png")),
-        )
+        else:
+            msg = (
+                MessageSegment.text("你没有比较任何人mai~"),
+                MessageSegment.image(Path("./Static/Maimai/Function/1.png")),
+            )
         await cf50.finish(msg, at_sender=True)
     sender_data, status = await get_player_records(sender_qq)
     if status == 400:
@@ -1296,26 +1013,9 @@ async def _(event: MessageEvent):
             MessageSegment.image(Path("./Static/Maimai/Function/2.png")),
         )
         await cf50.finish(msg, at_sender=True)
-    target_data, status = await get_player_records(target_qq)
-    if status == 400:
-        msg = (
-            MessageSegment.text("迪拉熊没有找到他的信息mai~"),
-            MessageSegment.image(Path("./Static/Maimai/Function/1.png")),
-        )
-        await cf50.finish(msg, at_sender=True)
-    elif status == 403:
-        msg = (
-            MessageSegment.text("他在查分器启用了隐私或者没有同意查分器的用户协议mai~"),
-            MessageSegment.image(Path("./Static/Maimai/Function/1.png")),
-        )
-        await cf50.finish(msg, at_sender=True)
-    elif not target_data:
-        msg = (
-            MessageSegment.text("（查分器出了点问题）"),
-            MessageSegment.image(Path("./Static/Maimai/Function/2.png")),
-        )
-        await cf50.finish(msg, at_sender=True)
-    songList = await get_music_data_df()
+    results = await asyncio.gather(
+        *(get_player_records(target_qq) for target_qq in target_qqs)
+    )
     sender_records = sender_data["records"]
     if not sender_records:
         await cf50.finish(
@@ -1325,57 +1025,100 @@ async def _(event: MessageEvent):
             ),
             at_sender=True,
         )
-    target_records = target_data["records"]
-    if not target_records:
-        await cf50.finish(
-            (
-                MessageSegment.text("他没有上传任何成绩mai~"),
-                MessageSegment.image(Path("./Static/Maimai/Function/1.png")),
-            ),
-            at_sender=True,
-        )
-    songList = await get_music_data_df()
-    b35, b15, mask_enabled = await compare_bests(
-        sender_records, target_records, songList
-    )
-    if not b35 and not b15:
-        if mask_enabled:
-            msg = "迪拉熊无法获取真实成绩mai~"
+    # 无法比较的玩家单独跳过，只有全部无法比较时才结束
+    targets = list()
+    failures = list()
+    for target_qq, (target_data, status) in zip(target_qqs, results):
+        # (QQ 号, 单独回复的文本, 列出时的原因, 配图)
+        if status == 400:
+            failures.append(
+                (target_qq, "迪拉熊没有找到他的信息mai~", "没有找到信息", 1)
+            )
+        elif status == 403:
+            failures.append(
+                (
+                    target_qq,
+                    "他在查分器启用了隐私或者没有同意查分器的用户协议mai~",
+                    "启用了隐私或者没有同意查分器的用户协议",
+                    1,
+                )
+            )
+        elif not target_data:
+            failures.append((target_qq, "（查分器出了点问题）", "查分器出了点问题", 2))
+        elif not target_data["records"]:
+            failures.append(
+                (target_qq, "他没有上传任何成绩mai~", "没有上传任何成绩", 1)
+            )
         else:
-            msg = "你们没有上传任何可以比较的成绩mai~"
-        await cf50.finish(
-            (
-                MessageSegment.text(msg),
-                MessageSegment.image(Path("./Static/Maimai/Function/1.png")),
-            ),
-            at_sender=True,
+            targets.append((target_qq, target_data))
+    if not targets and len(failures) == 1:
+        _, text, _, image = failures[0]
+        msg = (
+            MessageSegment.text(text),
+            MessageSegment.image(Path(f"./Static/Maimai/Function/{image}.png")),
         )
-    nickname = target_data["nickname"]
-    dani = target_data["additional_rating"]
-    user_config = await user_config_manager.get_user_config(target_qq)
-    frame = user_config["frame"]
-    plate = user_config["plate"]
-    icon = user_config["icon"]
-    is_rating_tj = user_config["rating_tj"]
-    img = await generatebests(
-        b35=b35,
-        b15=b15,
-        nickname=nickname,
-        dani=dani,
-        type="cf50",
-        icon=icon,
-        frame=frame,
-        plate=plate,
-        is_rating_tj=is_rating_tj,
-        songList=songList,
+        await cf50.finish(msg, at_sender=True)
+    elif failures:
+        msg = [MessageSegment.text("迪拉熊没法和这些人比较mai~")]
+        for target_qq, _, reason, _ in failures:
+            msg.extend(
+                (
+                    MessageSegment.text("\r\n"),
+                    MessageSegment.at(target_qq),
+                    MessageSegment.text(f" {reason}"),
+                )
+            )
+        if not targets:
+            msg.append(MessageSegment.image(Path("./Static/Maimai/Function/1.png")))
+            await cf50.finish(msg, at_sender=True)
+        await cf50.send(msg, at_sender=True)
+    catalog = await get_song_catalog()
+    compared = await compare_bests(
+        sender_records,
+        [target_data["records"] for _, target_data in targets],
+        catalog,
     )
-    msg = MessageSegment.image(img)
-    await cf50.send(msg, at_sender=True)
+    for (target_qq, target_data), (b35, b15, mask_enabled) in zip(targets, compared):
+        if not b35 and not b15:
+            if mask_enabled:
+                msg = "迪拉熊无法获取真实成绩mai~"
+            else:
+                msg = "你们没有上传任何可以比较的成绩mai~"
+            await cf50.send(
+                (
+                    MessageSegment.text(msg),
+                    MessageSegment.image(Path("./Static/Maimai/Function/1.png")),
+                ),
+                at_sender=True,
+            )
+            continue
+        nickname = target_data["nickname"]
+        dani = target_data["additional_rating"]
+        user_config = await user_config_manager.get_user_config(target_qq)
+        frame = user_config["frame"]
+        plate = user_config["plate"]
+        icon = user_config["icon"]
+        is_rating_tj = user_config["rating_tj"]
+        img = await generatebests(
+            b35=b35,
+            b15=b15,
+            nickname=nickname,
+            dani=dani,
+            type="cf50",
+            icon=icon,
+            frame=frame,
+            plate=plate,
+            is_rating_tj=is_rating_tj,
+            catalog=catalog,
+        )
+        msg = MessageSegment.image(img)
+        await cf50.send(msg, at_sender=True)
 
 
 @sd50.handle()
 async def _(event: MessageEvent):
     target_qq = event.get_user_id()
+    await prefetch_user_configs(event)
     for message in event.get_message()["at"]:
         target_qq = message.data["qq"]
         if target_qq == event.get_user_id():
@@ -1415,8 +1158,8 @@ async def _(event: MessageEvent):
             ),
             at_sender=True,
         )
-    songList = await get_music_data_df()
-    b35, b15, _ = await records_to_bests(records, songList, is_sd=True)
+    catalog = await get_song_catalog()
+    b35, b15, _ = await records_to_bests(records, catalog, is_sd=True)
     if not b35 and not b15:
         await sd50.finish(
             (
@@ -1444,7 +1187,7 @@ async def _(event: MessageEvent):
         frame=frame,
         plate=plate,
         is_rating_tj=is_rating_tj,
-        songList=songList,
+        catalog=catalog,
     )
     msg = MessageSegment.image(img)
     await sd50.send(msg, at_sender=True)
@@ -1453,6 +1196,7 @@ async def _(event: MessageEvent):
 @all50.handle()
 async def _(event: MessageEvent):
     target_qq = event.get_user_id()
+    await prefetch_user_configs(event)
     for message in event.get_message()["at"]:
         target_qq = message.data["qq"]
         if target_qq == event.get_user_id():
@@ -1492,8 +1236,8 @@ async def _(event: MessageEvent):
             ),
             at_sender=True,
         )
-    songList = await get_music_data_df()
-    all35, all15, _ = await records_to_bests(records, songList, is_all=True)
+    catalog = await get_song_catalog()
+    all35, all15, _ = await records_to_bests(records, catalog, is_all=True)
     nickname = data["nickname"]
     dani = data["additional_rating"]
     user_config = await user_config_manager.get_user_config(target_qq)
@@ -1511,7 +1255,7 @@ async def _(event: MessageEvent):
         frame=frame,
         plate=plate,
         is_rating_tj=is_rating_tj,
-        songList=songList,
+        catalog=catalog,
     )
     msg = MessageSegment.image(img)
     await all50.send(msg, at_sender=True)
@@ -1532,10 +1276,10 @@ async def _(event: MessageEvent):
                 at_sender=True,
             )
 
-    songList = await get_music_data_df()
+    catalog = await get_song_catalog()
     rr35, rr15, _ = await records_to_bests(
         None,
-        songList,
+        catalog,
         rating=rating,
     )
     if not rr35 and not rr15:
@@ -1559,7 +1303,7 @@ async def _(event: MessageEvent):
         frame=None,
         plate="1",
         is_rating_tj=False,
-        songList=songList,
+        catalog=catalog,
     )
     msg = MessageSegment.image(img)
     await rr50.send(msg, at_sender=True)
@@ -1568,21 +1312,21 @@ async def _(event: MessageEvent):
 @sunnlist.handle()
 async def _(event: MessageEvent):
     qq = event.get_user_id()
-    data, status = await get_player_records(qq)
+    catalog = await get_song_catalog()
+    table, status = await get_completion_table(qq, catalog, is_sun=True)
     if status == 400:
         msg = (
             MessageSegment.text("迪拉熊没有找到你的信息mai~"),
             MessageSegment.image(Path("./Static/Maimai/Function/1.png")),
         )
         await sunnlist.finish(msg, at_sender=True)
-    elif not data:
+    elif not table:
         msg = (
             MessageSegment.text("（查分器出了点问题）"),
             MessageSegment.image(Path("./Static/Maimai/Function/2.png")),
         )
         await sunnlist.finish(msg, at_sender=True)
-    records = data["records"]
-    if not records:
+    if not table.record_count:
         await sunnlist.finish(
             (
                 MessageSegment.text("你没有上传任何成绩mai~"),
@@ -1590,12 +1334,8 @@ async def _(event: MessageEvent):
             ),
             at_sender=True,
         )
-    songList = await get_music_data_df()
-    filted_records, mask_enabled = records_filter(
-        records=records, is_sun=True, songList=songList
-    )
-    if not filted_records:
-        if mask_enabled:
+    if not table.records:
+        if table.mask_enabled:
             msg = "迪拉熊无法获取你的真实成绩mai~"
         else:
             msg = "你没有上传任何对得上的成绩mai~"
@@ -1615,12 +1355,12 @@ async def _(event: MessageEvent):
             page = 1
     else:
         page = 1
-    all_page_num = math.ceil(len(filted_records) / 55)
+    all_page_num = table.page_count
     page = min(page, all_page_num)
-    input_records = get_page_records(filted_records, page=page)
-    nickname = data["nickname"]
-    rating = data["rating"]
-    dani = data["additional_rating"]
+    input_records = table.page(page)
+    nickname = table.player["nickname"]
+    rating = table.player["rating"]
+    dani = table.player["additional_rating"]
     user_config = await user_config_manager.get_user_config(qq)
     frame = user_config["frame"]
     plate = user_config["plate"]
@@ -1635,7 +1375,7 @@ async def _(event: MessageEvent):
         plate=plate,
         input_records=input_records,
         all_page_num=all_page_num,
-        songList=songList,
+        catalog=catalog,
     )
     msg = MessageSegment.image(img)
     await sunnlist.send(msg, at_sender=True)
@@ -1644,21 +1384,21 @@ async def _(event: MessageEvent):
 @locklist.handle()
 async def _(event: MessageEvent):
     qq = event.get_user_id()
-    data, status = await get_player_records(qq)
+    catalog = await get_song_catalog()
+    table, status = await get_completion_table(qq, catalog, is_lock=True)
     if status == 400:
         msg = (
             MessageSegment.text("迪拉熊没有找到你的信息mai~"),
             MessageSegment.image(Path("./Static/Maimai/Function/1.png")),
         )
         await locklist.finish(msg, at_sender=True)
-    elif not data:
+    elif not table:
         msg = (
             MessageSegment.text("（查分器出了点问题）"),
             MessageSegment.image(Path("./Static/Maimai/Function/2.png")),
         )
         await locklist.finish(msg, at_sender=True)
-    records = data["records"]
-    if not records:
+    if not table.record_count:
         await locklist.finish(
             (
                 MessageSegment.text("你没有上传任何成绩mai~"),
@@ -1666,12 +1406,8 @@ async def _(event: MessageEvent):
             ),
             at_sender=True,
         )
-    songList = await get_music_data_df()
-    filted_records, mask_enabled = records_filter(
-        records=records, is_lock=True, songList=songList
-    )
-    if not filted_records:
-        if mask_enabled:
+    if not table.records:
+        if table.mask_enabled:
             msg = "迪拉熊无法获取你的真实成绩mai~"
         else:
             msg = "你没有上传任何对得上的成绩mai~"
@@ -1691,12 +1427,12 @@ async def _(event: MessageEvent):
             page = 1
     else:
         page = 1
-    all_page_num = math.ceil(len(filted_records) / 55)
+    all_page_num = table.page_count
     page = min(page, all_page_num)
-    input_records = get_page_records(filted_records, page=page)
-    nickname = data["nickname"]
-    rating = data["rating"]
-    dani = data["additional_rating"]
+    input_records = table.page(page)
+    nickname = table.player["nickname"]
+    rating = table.player["rating"]
+    dani = table.player["additional_rating"]
     user_config = await user_config_manager.get_user_config(qq)
     frame = user_config["frame"]
     plate = user_config["plate"]
@@ -1711,7 +1447,7 @@ async def _(event: MessageEvent):
         plate=plate,
         input_records=input_records,
         all_page_num=all_page_num,
-        songList=songList,
+        catalog=catalog,
     )
     msg = MessageSegment.image(img)
     await locklist.send(msg, at_sender=True)
@@ -1751,7 +1487,6 @@ async def _(event: MessageEvent):
                 MessageSegment.image(Path("./Static/Maimai/Function/1.png")),
             )
             await complist.finish(msg, at_sender=True)
-        img_byte_arr = BytesIO()
         async with ListApiClient() as client:
             try:
                 params = {"level": level, "page": page}
@@ -1766,8 +1501,7 @@ async def _(event: MessageEvent):
                     gen = client.get_from_diving_fish(**params)
                 else:
                     return
-                async for b in gen:
-                    img_byte_arr.write(b.data)
+                img = await collect_image(gen)
             except RpcError as err:
                 if err.code() == StatusCode.NOT_FOUND:
                     msg = (
@@ -1805,24 +1539,24 @@ async def _(event: MessageEvent):
                         MessageSegment.image(Path("./Static/Maimai/Function/2.png")),
                     )
                 await complist.finish(msg, at_sender=True)
-        img_byte_arr.seek(0)
-        img = img_byte_arr.getvalue()
     else:
-        data, status = await get_player_records(qq)
+        catalog = await get_song_catalog()
+        table, status = await get_completion_table(
+            qq, catalog, level=level, ds=ds, gen=gen
+        )
         if status == 400:
             msg = (
                 MessageSegment.text("迪拉熊没有找到你的信息mai~"),
                 MessageSegment.image(Path("./Static/Maimai/Function/1.png")),
             )
             await complist.finish(msg, at_sender=True)
-        elif not data:
+        elif not table:
             msg = (
                 MessageSegment.text("（查分器出了点问题）"),
                 MessageSegment.image(Path("./Static/Maimai/Function/2.png")),
             )
             await complist.finish(msg, at_sender=True)
-        records = data["records"]
-        if not records:
+        if not table.record_count:
             await complist.finish(
                 (
                     MessageSegment.text("你没有上传任何成绩mai~"),
@@ -1830,11 +1564,7 @@ async def _(event: MessageEvent):
                 ),
                 at_sender=True,
             )
-        songList = await get_music_data_df()
-        filted_records, _ = records_filter(
-            records=records, level=level, ds=ds, gen=gen, songList=songList
-        )
-        if len(filted_records) == 0:
+        if not table.records:
             await complist.finish(
                 (
                     MessageSegment.text("你没有上传任何对得上的成绩mai~"),
@@ -1843,13 +1573,13 @@ async def _(event: MessageEvent):
                 at_sender=True,
             )
 
-        all_page_num = math.ceil(len(filted_records) / 55)
+        all_page_num = table.page_count
         page = min(page, all_page_num)
-        input_records = get_page_records(filted_records, page=page)
-        rate_count = compute_record(records=filted_records)
-        nickname = data["nickname"]
-        rating = data["rating"]
-        dani = data["additional_rating"]
+        input_records = table.page(page)
+        rate_count = table.rate_count
+        nickname = table.player["nickname"]
+        rating = table.player["rating"]
+        dani = table.player["additional_rating"]
         img = await generate_wcb(
             level=level,
             ds=ds,
@@ -1864,7 +1594,7 @@ async def _(event: MessageEvent):
             input_records=input_records,
             rate_count=rate_count,
             all_page_num=all_page_num,
-            songList=songList,
+            catalog=catalog,
         )
     msg = MessageSegment.image(img)
     await complist.send(msg, at_sender=True)
@@ -1890,8 +1620,8 @@ async def _(event: MessageEvent):
     if music_type and music_type in "左右":
         side_index = "左右".index(music_type)
         music_type = "宴"
-    songList = await get_music_data_df()
-    result, song_info = await get_info_by_name(song, music_type, songList)
+    catalog = await get_song_catalog()
+    result, song_info = await get_info_by_name(song, music_type, catalog)
     if result == 1:
         if isinstance(song_info, set):
             msg = f"迪拉熊找到了这些乐曲——\r\n{'\r\n'.join(song_info)}"
@@ -1953,8 +1683,8 @@ async def _(event: MessageEvent):
     if not song:
         return
 
-    songList = await get_music_data_df()
-    result, song_info = await get_info_by_name(song, music_type, songList)
+    catalog = await get_song_catalog()
+    result, song_info = await get_info_by_name(song, music_type, catalog)
     if result == 1:
         if isinstance(song_info, set):
             msg = f"迪拉熊找到了这些乐曲——\r\n{'\r\n'.join(song_info)}"
@@ -2034,8 +1764,8 @@ async def _(event: MessageEvent):
     if side:
         type_index = "左右".index(side)
 
-    songList = await get_music_data_df()
-    result, song_info = await get_info_by_name(song, music_type, songList)
+    catalog = await get_song_catalog()
+    result, song_info = await get_info_by_name(song, music_type, catalog)
     if result == 1:
         if isinstance(song_info, set):
             msg = f"迪拉熊找到了这些乐曲——\r\n{'\r\n'.join(song_info)}"
@@ -2105,8 +1835,8 @@ async def _(event: MessageEvent):
     if not song:
         return
 
-    songList = await get_music_data_df()
-    result, song_info = await get_info_by_name(song, None, songList)
+    catalog = await get_song_catalog()
+    result, song_info = await get_info_by_name(song, None, catalog)
     if result == 1:
         if isinstance(song_info, set):
             msg = f"迪拉熊找到了这些乐曲——\r\n{'\r\n'.join(song_info)}"
@@ -2156,8 +1886,8 @@ async def _(event: MessageEvent):
     if "." in level:
         s_type = "ds"
     s_songs = list()
-    songList = await get_music_data_df()
-    for song in songList:
+    catalog = await get_song_catalog()
+    for song in catalog:
         if song["basic_info"]["genre"] == "宴会場":
             continue
         s_list = song[s_type]
@@ -2187,8 +1917,8 @@ async def _(event: MessageEvent):
 @maiwhat.handle()
 async def _(event: MessageEvent):
     rng = random.default_rng()
-    songList = await get_music_data_df()
-    song = rng.choice(songList)
+    catalog = await get_song_catalog()
+    song = rng.choice(catalog.songs)
     if song["basic_info"]["genre"] == "宴会場":
         img = await utage_chart_info(song_data=song)
     else:
@@ -2222,8 +1952,8 @@ async def _(event: MessageEvent):
             at_sender=True,
         )
 
-    songList = await get_music_data_df()
-    result, song_info = await get_info_by_name(name, None, songList)
+    catalog = await get_song_catalog()
+    result, song_info = await get_info_by_name(name, None, catalog)
     if result == 1:
         if isinstance(song_info, set):
             msg = f"迪拉熊找到了这些乐曲——\r\n{'\r\n'.join(song_info)}"
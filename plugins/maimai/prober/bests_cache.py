@@ -0,0 +1,223 @@
+import os
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+from uuid import uuid4
+
+import aiofiles
+import orjson as json
+from httpx import HTTPError
+from xxhash import xxh32_hexdigest
+
+from util.resources import CACHE_ROOT
+from util.config import config
+from . import diving_fish, lxns
+from .limekuma_client import SPOOL_PATH, BestsApiClient, collect_image
+
+# 成绩图缓存有效期（秒）
+BESTS_CACHE_TTL = 30 * 60
+# 内存中缓存的成绩图总大小上限
+BESTS_CACHE_MAX_BYTES = 64 * 1024 * 1024
+# 磁盘上缓存的成绩图总大小上限
+BESTS_CACHE_MAX_DISK_BYTES = 512 * 1024 * 1024
+
+BESTS_CACHE_PATH = CACHE_ROOT / "Bests"
+
+
+async def get_records_fingerprint(
+    qq: str, source: str, personal_token: Optional[str] = None
+) -> Optional[str]:
+    # 通过查分器的玩家信息判断成绩是否有变化，获取失败时不使用缓存
+    try:
+        if source == "lxns":
+            data, _ = await lxns.get_player_data(qq, personal_token)
+        elif source == "diving-fish":
+            data, _ = await diving_fish.get_player_data(qq)
+        else:
+            return None
+    except HTTPError:
+        return None
+
+    if not data:
+        return None
+
+    return xxh32_hexdigest(json.dumps(data, option=json.OPT_SORT_KEYS))
+
+
+class BestsCache:
+    def __init__(self):
+        self.images: OrderedDict[tuple, tuple[float, bytes]] = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _file_path(self, key: tuple) -> Path:
+        # 以 QQ 号为前缀，便于按用户清除
+        return BESTS_CACHE_PATH / f"{key[0]}_{xxh32_hexdigest(repr(key).encode())}"
+
+    def _spool_path(self) -> Path:
+        os.makedirs(SPOOL_PATH, exist_ok=True)
+        return SPOOL_PATH / f"{uuid4().hex}.img"
+
+    async def get(self, key: tuple) -> Optional[bytes | Path]:
+        now = time.time()
+        if entry := self.images.get(key):
+            created_at, data = entry
+            if now - created_at < BESTS_CACHE_TTL:
+                self.images.move_to_end(key)
+                self.hits += 1
+                return data
+
+            self._pop(key)
+
+        path = self._file_path(key)
+        try:
+            if now - os.path.getmtime(path) < BESTS_CACHE_TTL:
+                # 磁盘上的图片不读入内存，硬链接为本次发送专用的文件，
+                # 发送前缓存文件被淘汰或清除也不受影响
+                link = self._spool_path()
+                os.link(path, link)
+                self.hits += 1
+                return link
+
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+        self.misses += 1
+        return None
+
+    async def put(self, key: tuple, data: bytes | Path) -> bytes | Path:
+        if key in self.images:
+            self._pop(key)
+
+        if isinstance(data, Path):
+            # 已落盘的图片以硬链接加入磁盘缓存，原文件仍由调用方发送后删除
+            os.makedirs(BESTS_CACHE_PATH, exist_ok=True)
+            path = self._file_path(key)
+            tmp_path = path.with_name(f"{path.name}.tmp")
+            os.link(data, tmp_path)
+            os.replace(tmp_path, path)
+            self._trim_disk()
+            return data
+
+        self.images[key] = (time.time(), data)
+        self.size += len(data)
+        while self.size > BESTS_CACHE_MAX_BYTES:
+            old_key, (created_at, old_data) = self.images.popitem(last=False)
+            self.size -= len(old_data)
+            if time.time() - created_at < BESTS_CACHE_TTL:
+                await self._spill(old_key, created_at, old_data)
+
+        return data
+
+    def invalidate(self, qq: str):
+        for key in [key for key in self.images if key[0] == qq]:
+            self._pop(key)
+
+        if not os.path.exists(BESTS_CACHE_PATH):
+            return
+        for file in os.listdir(BESTS_CACHE_PATH):
+            if file.startswith(f"{qq}_"):
+                os.remove(BESTS_CACHE_PATH / file)
+
+    def _pop(self, key: tuple):
+        _, data = self.images.pop(key)
+        self.size -= len(data)
+
+    async def _spill(self, key: tuple, created_at: float, data: bytes):
+        # 从内存淘汰的成绩图写入磁盘，保留原本的创建时间
+        os.makedirs(BESTS_CACHE_PATH, exist_ok=True)
+        path = self._file_path(key)
+        tmp_path = path.with_name(f"{path.name}.tmp")
+        async with aiofiles.open(tmp_path, "wb") as fd:
+            await fd.write(data)
+        os.replace(tmp_path, path)
+        os.utime(path, (created_at, created_at))
+        self._trim_disk()
+
+    def _trim_disk(self):
+        files = list()
+        total = 0
+        now = time.time()
+        for entry in os.scandir(BESTS_CACHE_PATH):
+            if entry.name.endswith(".tmp"):
+                continue
+            stat = entry.stat()
+            if now - stat.st_mtime >= BESTS_CACHE_TTL:
+                os.remove(entry.path)
+                continue
+            files.append((stat.st_mtime, stat.st_size, entry.path))
+            total += stat.st_size
+
+        files.sort()
+        for _, size, path in files:
+            if total <= BESTS_CACHE_MAX_DISK_BYTES:
+                break
+            os.remove(path)
+            total -= size
+
+
+bests_cache = BestsCache()
+
+
+async def _render_bests(
+    anime: bool,
+    qq: str,
+    source: str,
+    personal_token: Optional[str],
+    frame: str,
+    plate: str,
+    icon: str,
+) -> Optional[bytes | Path]:
+    async with BestsApiClient() as client:
+        if source == "lxns":
+            params = {"dev_token": config.lx_token}
+            if personal_token:
+                params["personal_token"] = personal_token
+            else:
+                params["qq"] = int(qq)
+            if anime:
+                gen = client.get_anime_from_lxns(**params)
+            else:
+                gen = client.get_from_lxns(**params)
+        elif source == "diving-fish":
+            params = {
+                "qq": int(qq),
+                "frame": int(frame),
+                "plate": int(plate),
+                "icon": int(icon),
+            }
+            if anime:
+                gen = client.get_anime_from_diving_fish(**params)
+            else:
+                gen = client.get_from_diving_fish(**params)
+        else:
+            return None
+
+        # 动图体积较大，直接写入临时文件
+        return await collect_image(gen, spool=anime)
+
+
+async def get_bests_image(
+    anime: bool,
+    qq: str,
+    source: str,
+    personal_token: Optional[str],
+    frame: str,
+    plate: str,
+    icon: str,
+) -> Optional[bytes | Path]:
+    # 返回的文件由调用方发送后删除，渲染失败时抛出 RpcError
+    # 先查缓存，只有未命中时才请求后端渲染
+    fingerprint = await get_records_fingerprint(qq, source, personal_token)
+    kind = "ani50" if anime else "b50"
+    cache_key = (qq, kind, source, frame, plate, icon, fingerprint)
+    if fingerprint and (img := await bests_cache.get(cache_key)):
+        return img
+
+    img = await _render_bests(anime, qq, source, personal_token, frame, plate, icon)
+    if img is None or not fingerprint:
+        return img
+    return await bests_cache.put(cache_key, img)
@@ -0,0 +1,395 @@
+import math
+from typing import Optional
+
+import numpy as np
+
+from .bests_gen import ratings
+from .catalog import SongCatalog
+from .chart_stats import ChartStatsIndex
+
+RATE_CODES = {rate: i for i, rate in enumerate(ratings)}
+FC_CODES = {fc: i for i, fc in enumerate(("", "fc", "fcp", "ap", "app"))}
+RA_IN = np.array([value[1] for value in ratings.values()])
+RA_IN_OLD = np.array([value[2] for value in ratings.values()])
+# 达成率对应 DX 分数星级的下限（百分比）
+DX_STAR_BOUNDS = np.array([85.0, 90.0, 93.0, 95.0, 97.0])
+
+
+class RecordTable:
+    def __init__(
+        self,
+        records: list[dict],
+        catalog: SongCatalog,
+        stats: ChartStatsIndex,
+        with_notes: bool = False,
+    ):
+        # 宴谱与曲库中不存在的乐曲不参与计算
+        self.records = list()
+        is_new = list()
+        chart_ids = list()
+        note_totals = list()
+        for record in records:
+            if record["level_label"] == "Utage":
+                continue
+            song_id = str(record["song_id"])
+            song_data = catalog.get(song_id)
+            if not song_data:
+                continue
+            self.records.append(record)
+            is_new.append(song_data["basic_info"]["is_new"])
+            level_index = record["level_index"]
+            chart_ids.append(stats.chart_id(song_id, level_index))
+            if with_notes:
+                note_totals.append(catalog.note_total(song_id, level_index) * 3)
+
+        self.is_new = np.array(is_new, dtype=bool)
+        self.ds = np.array([r["ds"] for r in self.records], dtype=np.float64)
+        self.achievements = np.array(
+            [r["achievements"] for r in self.records], dtype=np.float64
+        )
+        self.dx_score = np.array([r["dxScore"] for r in self.records], dtype=np.int64)
+        self.ra = np.array([r["ra"] for r in self.records], dtype=np.float64)
+        self.rate = np.array(
+            [RATE_CODES.get(r["rate"], -1) for r in self.records], dtype=np.int64
+        )
+        self.fc = np.array(
+            [FC_CODES.get(r["fc"], -1) for r in self.records], dtype=np.int64
+        )
+        chart_ids = np.array(chart_ids, dtype=np.int64)
+        # 没有拟合定数时使用谱面定数，没有标准差时视为 0
+        fit_diff = stats.fit_diffs[chart_ids]
+        self.fit_diff = np.where(np.isnan(fit_diff), self.ds, fit_diff)
+        self.std_dev = np.nan_to_num(stats.std_devs[chart_ids], nan=0.0)
+        self.sum_dxscore = np.array(note_totals, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+
+def top_n(
+    primary: np.ndarray, ds: np.ndarray, achievements: np.ndarray, n: int
+) -> np.ndarray:
+    # 按 (主键, 定数, 达成率) 降序取前 n 条，并列时保持原顺序，与 sorted 结果一致
+    if n <= 0 or not len(primary):
+        return np.empty(0, dtype=np.int64)
+
+    if len(primary) > n:
+        # 先按主键粗选，再把与边界并列的记录一起精确排序
+        kth = primary[np.argpartition(-primary, n - 1)[:n]].min()
+        candidates = np.flatnonzero(primary >= kth)
+    else:
+        candidates = np.arange(len(primary))
+
+    order = np.lexsort(
+        (
+            candidates,
+            -achievements[candidates],
+            -ds[candidates],
+            -primary[candidates],
+        )
+    )
+    return candidates[order][:n]
+
+
+def select_bests(
+    table: RecordTable,
+    fc_rules: Optional[list] = None,
+    rate_rules: Optional[list] = None,
+    is_fit: bool = False,
+    is_sd: bool = False,
+    is_dxs: bool = False,
+    is_all: bool = False,
+    is_old: bool = False,
+    dx_star_count: Optional[str] = None,
+) -> tuple[list[dict], list[dict], bool]:
+    mask = np.ones(len(table), dtype=bool)
+    if fc_rules:
+        mask &= np.isin(table.fc, [FC_CODES.get(fc, -2) for fc in fc_rules])
+    if rate_rules:
+        mask &= np.isin(table.rate, [RATE_CODES.get(rate, -2) for rate in rate_rules])
+
+    # 没有 DX 分数的成绩无法得知真实达成率
+    masked = (table.achievements > 0) & (table.dx_score == 0)
+    mask_enabled = False
+    if is_fit or is_dxs or is_old:
+        mask_enabled = bool(np.any(mask & masked))
+        mask &= ~masked
+
+    ds = table.ds
+    achievements = table.achievements
+    ra = table.ra
+    if is_fit:
+        ds = np.trunc(table.fit_diff * 100) / 100
+        ra = np.trunc(
+            table.fit_diff * np.minimum(achievements, 100.5) * RA_IN[table.rate] / 100
+        )
+    if is_dxs:
+        mask &= table.sum_dxscore > 0
+        sum_dxscore = np.where(table.sum_dxscore > 0, table.sum_dxscore, 1)
+        if not dx_star_count:
+            achievements = table.dx_score / sum_dxscore * 101
+            ra = np.trunc(ds * achievements * RA_IN[table.rate] / 100)
+        else:
+            percentage = (table.dx_score / sum_dxscore) * 100
+            stars = np.searchsorted(DX_STAR_BOUNDS, percentage, side="right")
+            allowed = [int(c) for c in dx_star_count if c.isdigit()]
+            mask &= np.isin(stars, allowed)
+    if is_old:
+        ra = np.trunc(
+            ds * np.minimum(achievements, 100.5) * RA_IN_OLD[table.rate] / 100
+        )
+    mask &= (ra != 0) & (achievements <= 101)
+
+    def to_record(i: int) -> dict:
+        # 只为入选的成绩生成新的字典，不修改原始成绩
+        record = dict(table.records[i])
+        if is_fit:
+            record["s_ra"] = record["ds"]
+            record["ds"] = float(ds[i])
+        if is_fit or is_old or (is_dxs and not dx_star_count):
+            record["ra"] = int(ra[i])
+        if is_dxs and not dx_star_count:
+            record["achievements"] = float(achievements[i])
+        if is_sd:
+            record["diff"] = float(table.std_dev[i])
+        return record
+
+    if is_all:
+        return select_all(table, mask, ra, ds, achievements, to_record) + (
+            mask_enabled,
+        )
+
+    primary = ra * (1 + table.std_dev / 10) if is_sd else ra
+    sd_pool = np.flatnonzero(mask & ~table.is_new)
+    dx_pool = np.flatnonzero(mask & table.is_new)
+    b35 = sd_pool[
+        top_n(
+            primary[sd_pool], ds[sd_pool], achievements[sd_pool], 25 if is_old else 35
+        )
+    ]
+    b15 = dx_pool[top_n(primary[dx_pool], ds[dx_pool], achievements[dx_pool], 15)]
+    return (
+        [to_record(i) for i in b35],
+        [to_record(i) for i in b15],
+        mask_enabled,
+    )
+
+
+def select_all(
+    table: RecordTable,
+    mask: np.ndarray,
+    ra: np.ndarray,
+    ds: np.ndarray,
+    achievements: np.ndarray,
+    to_record,
+) -> tuple[list[dict], list[dict]]:
+    pool = np.flatnonzero(mask)
+    sd = list()
+    dx = list()
+    if not len(pool):
+        return sd, dx
+
+    # 分数不低于第 50 名的成绩优先按新旧版本分别填入
+    pool_ra = ra[pool]
+    threshold = np.partition(pool_ra, -50)[-50] if len(pool) > 50 else pool_ra.min()
+    candidates = int(np.count_nonzero(pool_ra >= threshold))
+    ordered = pool[
+        top_n(pool_ra, ds[pool], achievements[pool], candidates + 50)
+    ].tolist()
+
+    taken = set()
+    for i in ordered[:candidates]:
+        if table.is_new[i]:
+            if len(dx) < 15:
+                dx.append(i)
+                taken.add(i)
+        elif len(sd) < 35:
+            sd.append(i)
+            taken.add(i)
+        if len(dx) >= 15 and len(sd) >= 35:
+            break
+    else:
+        # 某一侧不足时，剩余名额按分数依次补齐
+        for i in ordered:
+            if i in taken:
+                continue
+            if len(sd) < 35:
+                sd.append(i)
+            elif len(dx) < 15:
+                dx.append(i)
+            else:
+                break
+
+    return [to_record(i) for i in sd], [to_record(i) for i in dx]
+
+
+class RatingSolver:
+    def __init__(self, catalog: SongCatalog):
+        self.catalog = catalog
+
+        # 每张谱面按 SSS+ 理论值生成成绩，新旧版本分别按分数降序排列
+        sd = list()
+        dx = list()
+        for song in catalog:
+            if len(song["id"]) > 5:
+                continue
+            for i, ds in enumerate(song["ds"]):
+                record = {
+                    "achievements": 101,
+                    "ds": ds,
+                    "dxScore": catalog.note_total(song["id"], i) * 3,
+                    "fc": "fsdp",
+                    "fs": "app",
+                    "level": str(),
+                    "level_index": i,
+                    "level_label": [
+                        "Basic",
+                        "Advanced",
+                        "Expert",
+                        "Master",
+                        "ReMASTER",
+                    ][i],
+                    "ra": math.trunc(ds * 22.512),
+                    "rate": "sssp",
+                    "song_id": int(song["id"]),
+                    "title": song["title"],
+                    "type": song["type"],
+                }
+                if song["basic_info"]["is_new"]:
+                    dx.append(record)
+                else:
+                    sd.append(record)
+
+        def k(x):
+            return (x["ra"], x["ds"], x["achievements"])
+
+        self.sd = sorted(sd, key=k, reverse=True)
+        self.dx = sorted(dx, key=k, reverse=True)
+
+        sd_ra = np.array([r["ra"] for r in self.sd], dtype=np.int64)
+        dx_ra = np.array([r["ra"] for r in self.dx], dtype=np.int64)
+        sd_sum = np.concatenate(([0], np.cumsum(sd_ra)))
+        dx_sum = np.concatenate(([0], np.cumsum(dx_ra)))
+
+        # 每次去掉两侧中分数最高的一张（相同时去掉旧版本的），
+        # 第 k 步后旧版本已去掉的张数即两侧按分数归并后前 k 张中旧版本的数量
+        merged_ra = np.concatenate((sd_ra, dx_ra))
+        is_dx = np.concatenate((np.zeros(len(sd_ra), bool), np.ones(len(dx_ra), bool)))
+        order = np.lexsort((is_dx, -merged_ra))
+        sd_skip = np.concatenate(([0], np.cumsum(~is_dx[order])))
+        dx_skip = np.arange(len(merged_ra) + 1) - sd_skip
+
+        # 第 k 步时 b35 与 b15 的总分，随 k 单调不增
+        self.sd_skip = sd_skip
+        self.dx_skip = dx_skip
+        self.totals = (
+            sd_sum[np.minimum(sd_skip + 35, len(sd_ra))]
+            - sd_sum[sd_skip]
+            + dx_sum[np.minimum(dx_skip + 15, len(dx_ra))]
+            - dx_sum[dx_skip]
+        )
+
+    def solve(self, rating: int) -> tuple[list[dict], list[dict]]:
+        step = 0
+        if rating:
+            # 二分查找总分首次不超过目标的步数
+            step = int(np.searchsorted(-self.totals, -rating, side="left"))
+        if step >= len(self.totals):
+            return list(), list()
+
+        sd_skip = int(self.sd_skip[step])
+        dx_skip = int(self.dx_skip[step])
+        return (
+            [dict(r) for r in self.sd[sd_skip : sd_skip + 35]],
+            [dict(r) for r in self.dx[dx_skip : dx_skip + 15]],
+        )
+
+
+_solver: Optional[RatingSolver] = None
+
+
+def get_rating_solver(catalog: SongCatalog) -> RatingSolver:
+    global _solver
+
+    # 曲库刷新后重建
+    if _solver is None or _solver.catalog is not catalog:
+        _solver = RatingSolver(catalog)
+    return _solver
+
+
+def index_records(records: list[dict]) -> dict[tuple, dict]:
+    # 以 (乐曲 id, 难度) 为键，重复时保留第一条
+    index = dict()
+    for record in records:
+        index.setdefault((record["song_id"], record["level_index"]), record)
+    return index
+
+
+class BestsComparer:
+    def __init__(
+        self,
+        records: list[dict],
+        catalog: SongCatalog,
+        b35: list[dict],
+        b15: list[dict],
+    ):
+        self.records = records
+        self.catalog = catalog
+        self.index = index_records(records)
+        self.sd_min = b35[-1]["ra"] if b35 else -1
+        self.dx_min = b15[-1]["ra"] if b15 else -1
+
+    def compare(
+        self, target_records: list[dict]
+    ) -> tuple[list[dict], list[dict], bool]:
+        sd = list()
+        dx = list()
+        mask_enabled = False
+
+        # 遍历较少的一方，在另一方的索引中查找同一谱面
+        outer_is_target = len(self.records) > len(target_records)
+        if outer_is_target:
+            outer, other_index = target_records, self.index
+        else:
+            outer, other_index = self.records, index_records(target_records)
+
+        for record in outer:
+            if record["level_label"] == "Utage":
+                continue
+            if record["ra"] == 0 or record["achievements"] > 101:
+                continue
+            if record["achievements"] > 0 and record["dxScore"] == 0:
+                mask_enabled = True
+                continue
+            other_record = other_index.get((record["song_id"], record["level_index"]))
+            if not other_record:
+                continue
+            if other_record["ra"] == 0 or other_record["achievements"] > 101:
+                continue
+            if other_record["achievements"] > 0 and other_record["dxScore"] == 0:
+                mask_enabled = True
+                continue
+            song_data = self.catalog.get(record["song_id"])
+            if not song_data:
+                continue
+            is_new = song_data["basic_info"]["is_new"]
+            if outer_is_target:
+                target, sender = record, other_record
+            else:
+                target, sender = other_record, record
+            result = dict(target)
+            result["preferred"] = target["ra"] >= (
+                self.dx_min if is_new else self.sd_min
+            )
+            result["s_ra"] = sender["ra"]
+            if is_new:
+                dx.append(result)
+            else:
+                sd.append(result)
+
+        def k(x):
+            return (x["preferred"], x["ra"] - x["s_ra"], x["ds"], x["achievements"])
+
+        b35 = sorted(sd, key=k, reverse=True)[:35]
+        b15 = sorted(dx, key=k, reverse=True)[:15]
+        return b35, b15, mask_enabled
@@ -1,11 +1,22 @@
+import asyncio
 import math
 from io import BytesIO
 from typing import Optional
 
 import numpy as np
-from PIL import Image, ImageDraw, ImageFont
-
-from util.resources import get_frame, get_icon, get_jacket, get_plate
+from PIL import Image, ImageDraw
+from PIL.Image import Image as ImageObject
+
+from util.config import config
+from util.render import render_executor
+from util.resources import (
+    CACHE_ROOT,
+    download_asset,
+    get_frame,
+    get_icon,
+    get_plate,
+    open_image,
+)
 
 from .Config import (
     font_path,
@@ -20,7 +31,8 @@ from .Config import (
     maimai_Static,
 )
 from .GLOBAL_CONSTANT import exclude_list, versions_map
-from .draw import paste
+from .catalog import SongCatalog
+from .draw import get_font, paste
 
 ratings = {
     "app": [1.01, 22.4, 15.0],
@@ -48,27 +60,6 @@ ttf2_bold_path = font_path / "NotoSansCJKsc-Bold.otf"
 ttf2_regular_path = font_path / "NotoSansCJKsc-Regular.otf"
 
 
-# id查歌
-def find_song_by_id(song_id, songList):
-    for song in songList:
-        if song_id == song["id"]:
-            return song
-
-    # 如果没有找到对应 id 的歌曲，返回 None
-    return
-
-
-def resize_image(image, scale):
-    # 计算缩放后的目标尺寸
-    width = math.ceil(image.width * scale)
-    height = math.ceil(image.height * scale)
-
-    # 缩放图像
-    resized_image = image.resize((width, height))
-
-    return resized_image
-
-
 def format_songid(id):
     id_str = str(id)
     if len(id_str) == 5 and id_str.startswith("10"):
@@ -150,95 +141,14 @@ def compute_record(records: list):
     return output
 
 
-def get_min_score(notes: list[int]):
-    weight = [1, 2, 3, 1, 5]
-    base_score = 5
-    sum_score = 0
-    for i in range(0, 5):
-        if i == 3 and len(notes) < 5:
-            sum_score += notes[i] * weight[4] * base_score
-            break
-        sum_score += notes[i] * weight[i] * base_score
-    return (1 - ((sum_score - 1) / sum_score)) * 100
-
-
-def records_filter(
-    records: list,
-    level: Optional[str] = None,
-    ds: Optional[float] = None,
-    gen: Optional[str] = None,
-    is_sun: bool = False,
-    is_lock: bool = False,
-    songList=None,
-):
-    filted_records = list()
-    mask_enabled = False
-    for record in records:
-        if record["level_label"] == "Utage":
-            continue
-        if level and record["level"] != level:
-            continue
-        if ds and record["ds"] != ds:
-            continue
-        song_data = find_song_by_id(str(record["song_id"]), songList)
-        if not song_data:
-            continue
-        if (
-            gen
-            and gen in versions_map
-            and (
-                (song_data["basic_info"]["from"] not in versions_map[gen])
-                or (gen != "舞" and record["level_index"] == 4)
-            )
-            or (gen in exclude_list and record["song_id"] in exclude_list[gen])
-        ):
-            continue
-        min_score_1 = get_min_score(song_data["charts"][record["level_index"]]["notes"])
-        min_score_2 = song_data["charts"][record["level_index"]]["notes"][-1]
-        min_score_2 = 1 / min_score_2 / 2 if min_score_2 > 0 else 0
-        min_score = min(min_score_1, min_score_2)
-        if is_sun:
-            if record["dxScore"] == 0:
-                mask_enabled = True
-                continue
-            passed = False
-            ra_kv = list(ratings.items())
-            ra_k = list(ratings.keys())
-            max_acc = ra_kv[ra_k.index(record["rate"]) - 1][1][0] * 100
-            min_acc = max_acc - min_score
-            if min_acc <= record["achievements"] < max_acc:
-                passed = True
-            if not passed:
-                continue
-        if is_lock:
-            if record["dxScore"] == 0:
-                mask_enabled = True
-                continue
-            ra_in = ratings[record["rate"]][0]
-            min_acc = ra_in * 100
-            max_acc = min_acc + min_score
-            if max_acc < record["achievements"] or record["achievements"] < min_acc:
-                continue
-        filted_records.append(record)
-    filted_records.sort(
-        key=lambda x: (
-            0 if level or ds else float(x["level"].replace("+", ".1")),
-            x["achievements"],
-            x["ra"],
-        ),
-        reverse=True,
-    )
-    return filted_records, mask_enabled
-
-
 def song_list_filter(
-    songList,
+    catalog: SongCatalog,
     level: Optional[str] = None,
     ds: Optional[float] = None,
     gen: Optional[str] = None,
 ):
     count = 0
-    for song in songList:
+    for song in catalog:
         if song["basic_info"]["genre"] == "宴会場":
             continue
         if level and level in song["level"]:
@@ -345,17 +255,7 @@ def compute_ra_old(ra: int):
     return 11
 
 
-def get_fit_diff(song_id: str, level_index: int, ds: float, charts) -> float:
-    if song_id not in charts["charts"]:
-        return ds
-    level_data = charts["charts"][song_id][level_index]
-    if "fit_diff" not in level_data:
-        return ds
-    fit_diff = level_data["fit_diff"]
-    return fit_diff
-
-
-async def music_to_part(
+def music_to_part(
     achievements: float,
     ds: float,
     dxScore: int,
@@ -371,7 +271,7 @@ async def music_to_part(
     type: str,
     index: int,
     b_type: str,
-    songList,
+    sum_dxscore: int,
     cid=0,
     s_ra=0,
     diff=-1,
@@ -384,22 +284,20 @@ async def music_to_part(
 
     # 根据难度 底图
     partbase_path = f"Static/Maimai/Bests/Part/{level_label}.png"
-    partbase = Image.open(partbase_path)
+    partbase = open_image(partbase_path).copy()
 
     # 歌曲封面
-    jacket = await get_jacket(song_id % 10000)
-    jacket = resize_image(jacket, 0.56)
-    partbase = paste(partbase, jacket, (36, 41))
+    jacket = open_image(CACHE_ROOT / "Jacket" / f"{song_id % 10000}.png", 0.56)
+    paste(partbase, jacket, (36, 41))
 
     # 歌曲分类 DX / SD
     icon_path = maimai_MusicType / f"{type}.png"
-    icon = Image.open(icon_path)
-    icon = resize_image(icon, 0.82)
-    partbase = paste(partbase, icon, (797, 16))
+    icon = open_image(icon_path, 0.82)
+    paste(partbase, icon, (797, 16))
     draw = ImageDraw.Draw(partbase)
 
     # 歌名
-    ttf = ImageFont.truetype(ttf_bold_path, size=40)
+    ttf = get_font(ttf_bold_path, 40)
     text_position = (295, 10)
     max_width = 450
     ellipsis = "…"
@@ -419,7 +317,7 @@ async def music_to_part(
         draw.text(text_position, f"{truncated_title}{ellipsis}", font=ttf, fill=color)
 
     # 达成率
-    ttf = ImageFont.truetype(ttf_black_path, size=76)
+    ttf = get_font(ttf_black_path, 76)
     achievements_str = str(achievements)
     if "." in str(achievements):
         achievements_parts = achievements_str.split(".")
@@ -432,21 +330,21 @@ async def music_to_part(
     text_content = str(achievements1)
     draw.text(text_position, text_content, font=ttf, fill=color, anchor="ls")
     text_position = (text_position[0] + ttf.getlength(text_content), 155)
-    ttf = ImageFont.truetype(ttf_black_path, size=54)
+    ttf = get_font(ttf_black_path, 54)
     text_content = str(achievements2)
     draw.text(text_position, text_content, font=ttf, fill=color, anchor="ls")
     text_position = (text_position[0] + ttf.getlength(text_content), 155)
-    ttf = ImageFont.truetype(ttf_black_path, size=65)
+    ttf = get_font(ttf_black_path, 65)
     text_content = "%"
     draw.text(text_position, text_content, font=ttf, fill=color, anchor="ls")
 
     # 一些信息
     # best序号
-    ttf1 = ImageFont.truetype(ttf_bold_path, size=24)
+    ttf1 = get_font(ttf_bold_path, 24)
     text_position = (336, 270)
     text_content1 = "#"
     text_len = ttf1.getlength(text_content1)
-    ttf2 = ImageFont.truetype(ttf_bold_path, size=30)
+    ttf2 = get_font(ttf_bold_path, 30)
     text_content2 = str(index)
     xdiff = (text_len + ttf2.getlength(text_content2)) / 2
     text_position = (math.ceil(text_position[0] - xdiff), 270)
@@ -461,7 +359,7 @@ async def music_to_part(
     ds_str = str(ds)
     if b_type == "fit50":
         ds_str = f"{math.trunc(ds * 100) / 100:.2f}"
-        ttf = ImageFont.truetype(ttf_bold_path, size=24)
+        ttf = get_font(ttf_bold_path, 24)
         draw.text(
             (376, 172),
             f"{'+' if diff > 0 else '±' if diff == 0 else str()}{math.trunc(diff * 100) / 100:.2f}",
@@ -470,7 +368,7 @@ async def music_to_part(
             anchor="lm",
         )
     elif b_type == "sd50":
-        ttf = ImageFont.truetype(ttf_bold_path, size=24)
+        ttf = get_font(ttf_bold_path, 24)
         draw.text(
             (376, 172),
             f"±{math.trunc(diff * 100) / 100:.2f}",
@@ -480,26 +378,26 @@ async def music_to_part(
         )
     s_ra_str = "No."
     s_ra_str2 = str(song_id)
-    ttf = ImageFont.truetype(ttf_bold_path, size=34)
+    ttf = get_font(ttf_bold_path, 34)
     ds_str = ds_str.split(".")
     text_position = (376, 215)
     text_content = f"{ds_str[0]}."
     draw.text(text_position, text_content, font=ttf, fill=color, anchor="ls")
     text_position = (text_position[0] + ttf.getlength(text_content), 215)
-    ttf = ImageFont.truetype(ttf_bold_path, size=28)
+    ttf = get_font(ttf_bold_path, 28)
     text_content = str(ds_str[1])
     draw.text(text_position, text_content, font=ttf, fill=color, anchor="ls")
-    ttf = ImageFont.truetype(ttf_bold_path, size=24)
+    ttf = get_font(ttf_bold_path, 24)
     text_position = (388, 270)
     draw.text(text_position, s_ra_str, font=ttf, fill=(28, 43, 120), anchor="ls")
     text_position = (text_position[0] + ttf.getlength(s_ra_str), 270)
-    ttf = ImageFont.truetype(ttf_bold_path, size=30)
+    ttf = get_font(ttf_bold_path, 30)
     draw.text(text_position, s_ra_str2, font=ttf, fill=(28, 43, 120), anchor="ls")
 
-    ttf = ImageFont.truetype(ttf_bold_path, size=34)
+    ttf = get_font(ttf_bold_path, 34)
     draw.text((550, 202), str(ra), font=ttf, fill=color, anchor="rm")
     if b_type == "cf50":
-        ttf = ImageFont.truetype(ttf_bold_path, size=20)
+        ttf = get_font(ttf_bold_path, 20)
         draw.text(
             (550, 172),
             f"{'+' if diff > 0 else '±' if diff == 0 else str()}{diff}",
@@ -508,16 +406,13 @@ async def music_to_part(
             anchor="rm",
         )
     # dx分数和星星
-    ttf = ImageFont.truetype(ttf_bold_path, size=24)
+    ttf = get_font(ttf_bold_path, 24)
     text_position = (730, 270)
-    id_str = str(song_id)
-    song_data = [d for d in songList if d["id"] == id_str][0]
-    sum_dxscore = np.sum(song_data["charts"][level_index]["notes"]) * 3
     text_content = str(sum_dxscore)
     draw.text(text_position, text_content, font=ttf, fill=(28, 43, 120), anchor="rs")
     if dxScore > 0:
         text_position = (text_position[0] - ttf.getlength(text_content), 270)
-        ttf = ImageFont.truetype(ttf_bold_path, size=30)
+        ttf = get_font(ttf_bold_path, 30)
         text_content = f"{dxScore}/"
         draw.text(
             text_position, text_content, font=ttf, fill=(28, 43, 120), anchor="rs"
@@ -529,38 +424,68 @@ async def music_to_part(
     if star_level:
         star_width = 30
         star_path = maimai_DXScoreStar / f"{star_level}.png"
-        star = Image.open(star_path)
-        star = resize_image(star, 1.3)
+        star = open_image(star_path, 1.3)
         for i in range(stars):
             x_offset = i * star_width
-            partbase = paste(partbase, star, (x_offset + 570, 178))
+            paste(partbase, star, (x_offset + 570, 178))
 
     # 评价
     rate_path = f"./Static/Maimai/Rate/{rate}.png"
-    rate_img = Image.open(rate_path)
-    rate_img = resize_image(rate_img, 0.87)
-    partbase = paste(partbase, rate_img, (770, 72))
+    rate_img = open_image(rate_path, 0.87)
+    paste(partbase, rate_img, (770, 72))
 
     # fc ap
     if fc:
         fc_path = maimai_MusicIcon / f"{fc}.png"
-        fc_img = Image.open(fc_path)
-        fc_img = resize_image(fc_img, 76 / 61)
-        partbase = paste(partbase, fc_img, (781, 191))
+        fc_img = open_image(fc_path, 76 / 61)
+        paste(partbase, fc_img, (781, 191))
     if fs:
         fs_path = maimai_MusicIcon / f"{fs}.png"
-        fs_img = Image.open(fs_path)
-        fs_img = resize_image(fs_img, 76 / 61)
-        partbase = paste(partbase, fs_img, (875, 191))
+        fs_img = open_image(fs_path, 76 / 61)
+        paste(partbase, fs_img, (875, 191))
 
     partbase = partbase.resize((340, 110))
     return partbase
 
 
-async def draw_best(bests: list, type: str, songList, begin: int = 0):
+async def render_parts(
+    bests: list, type: str, catalog: SongCatalog, begin: int = 0
+) -> list[ImageObject]:
+    # 曲绘需先在主进程下载到本地，渲染进程只读取文件
+    await asyncio.gather(
+        *(
+            download_asset("Jacket", "jacket", song_id)
+            for song_id in {song_data["song_id"] % 10000 for song_data in bests}
+        )
+    )
+
+    tasks = list()
+    for index, song_data in enumerate(bests):
+        if type == "fit50":
+            song_data["diff"] = song_data["ds"] - song_data["s_ra"]
+        elif type == "cf50":
+            song_data["diff"] = song_data["ra"] - song_data["s_ra"]
+        sum_dxscore = (
+            catalog.note_total(song_data["song_id"], song_data["level_index"]) * 3
+        )
+        tasks.append(
+            render_executor.run(
+                music_to_part,
+                **song_data,
+                index=index + 1 + begin,
+                b_type=type,
+                sum_dxscore=sum_dxscore,
+            )
+        )
+
+    # 各成绩分块在渲染进程中并行绘制，超时按整组分块计算，超时后取消仍在排队的分块
+    return await asyncio.wait_for(asyncio.gather(*tasks), config.render_timeout)
+
+
+def draw_best(parts: list[ImageObject]):
     index = 0
     # 计算列数
-    count = len(bests)
+    count = len(parts)
     queue_nums = 1 if count < 4 else 1 + math.ceil((count - 3) / 4)
     # 初始化行列标号
     queue_index = 0
@@ -586,21 +511,8 @@ async def draw_best(bests: list, type: str, songList, begin: int = 0):
         # 循环生成行
         while row_index < max_row_index:
             if index < count:
-                # 根据索引从列表中抽取数据
-                song_data = bests[index]
-                if type == "fit50":
-                    song_data["diff"] = song_data["ds"] - song_data["s_ra"]
-                elif type == "cf50":
-                    song_data["diff"] = song_data["ra"] - song_data["s_ra"]
-                # 传入数据生成图片
-                part = await music_to_part(
-                    **song_data,
-                    index=index + 1 + begin,
-                    b_type=type,
-                    songList=songList,
-                )
                 # 将图片粘贴到底图上
-                base = paste(base, part, (x, y))
+                paste(base, parts[index], (x, y))
             else:
                 break
 
@@ -621,9 +533,9 @@ async def draw_best(bests: list, type: str, songList, begin: int = 0):
 def rating_tj(b35max, b35min, b15max, b15min):
     rng = np.random.default_rng()
     ratingbase_path = maimai_Static / "rating_base.png"
-    ratingbase = Image.open(ratingbase_path)
+    ratingbase = open_image(ratingbase_path).copy()
     draw = ImageDraw.Draw(ratingbase)
-    ttf = ImageFont.truetype(ttf_bold_path, size=30)
+    ttf = get_font(ttf_bold_path, 30)
 
     b35max_diff = b35max - b35min
     b35min_diff = rng.integers(1, 6)
@@ -684,48 +596,78 @@ async def generatebests(
     frame: str,
     plate: str,
     is_rating_tj: bool,
-    songList,
+    catalog: SongCatalog,
+):
+    frame_img = await get_frame(frame, 0.95) if frame else None
+    plate_img = await get_plate(plate)
+    icon_img = await get_icon(icon, size=(94, 94))
+    b35_parts, b15_parts = await asyncio.gather(
+        render_parts(b35, type, catalog), render_parts(b15, type, catalog)
+    )
+
+    # 合成与编码在线程中进行，不阻塞事件循环
+    return await asyncio.to_thread(
+        draw_bests,
+        b35,
+        b15,
+        nickname,
+        dani,
+        type,
+        is_rating_tj,
+        frame_img,
+        plate_img,
+        icon_img,
+        b35_parts,
+        b15_parts,
+    )
+
+
+def draw_bests(
+    b35: list,
+    b15: list,
+    nickname: str,
+    dani: int,
+    type: str,
+    is_rating_tj: bool,
+    frame_img: Optional[ImageObject],
+    plate_img: ImageObject,
+    icon_img: ImageObject,
+    b35_parts: list[ImageObject],
+    b15_parts: list[ImageObject],
 ):
-    b35_ra = np.sum(item["ra"] for item in b35)
-    b15_ra = np.sum(item["ra"] for item in b15)
+    b35_ra = sum(item["ra"] for item in b35)
+    b15_ra = sum(item["ra"] for item in b15)
     rating = b35_ra + b15_ra
     if type == "best40":
         rating += 2100
 
     # BG
-    bests = Image.open("./Static/Maimai/Bests/background.png")
+    bests = open_image("./Static/Maimai/Bests/background.png").copy()
 
     # 底板
-    if frame:
-        frame_img = await get_frame(frame)
-        frame_img = resize_image(frame_img, 0.95)
-        bests = paste(bests, frame_img, (48, 45))
+    if frame_img:
+        paste(bests, frame_img, (48, 45))
 
     # 牌子
-    plate_img = await get_plate(plate)
-    bests = paste(bests, plate_img, (60, 60))
+    paste(bests, plate_img, (60, 60))
 
     # 头像
-    icon_img = await get_icon(icon)
-    icon_img = icon_img.resize((94, 94))
-    bests = paste(bests, icon_img, (72, 72))
+    paste(bests, icon_img, (72, 72))
 
     # 姓名框
     namebase_path = maimai_Static / "namebase.png"
-    namebase = Image.open(namebase_path)
-    bests = paste(bests, namebase, (175, 108))
+    namebase = open_image(namebase_path)
+    paste(bests, namebase, (175, 108))
 
     # 段位
     dani_path = maimai_Dani / f"{dani}.png"
-    dani_img = Image.open(dani_path)
-    dani_img = resize_image(dani_img, 0.213)
-    bests = paste(bests, dani_img, (346, 110))
+    dani_img = open_image(dani_path, 0.213)
+    paste(bests, dani_img, (346, 110))
 
     # 阶级
     class_path = maimai_Class / "0.png"
-    cla = Image.open(class_path)
-    cla = resize_image(cla, 0.78)
-    bests = paste(bests, cla, (346, 50))
+    cla = open_image(class_path, 0.78)
+    paste(bests, cla, (346, 50))
 
     # rating推荐
     if type == "b50" and is_rating_tj:
@@ -734,36 +676,35 @@ async def generatebests(
         b15max = b15[0]["ra"] if b15 else 0
         b15min = b15[-1]["ra"] if b15 else 0
         ratingbase = rating_tj(b35max, b35min, b15max, b15min)
-        bests = paste(bests, ratingbase, (60, 197))
+        paste(bests, ratingbase, (60, 197))
 
     # rating框
     ratingbar = compute_ra_old(rating) if type == "best40" else compute_ra(rating)
     ratingbar_path = maimai_Rating / f"UI_CMN_DXRating_{ratingbar:02d}.png"
-    ratingbar = Image.open(ratingbar_path)
-    ratingbar = resize_image(ratingbar, 0.26)
-    bests = paste(bests, ratingbar, (175, 70))
+    ratingbar = open_image(ratingbar_path, 0.26)
+    paste(bests, ratingbar, (175, 70))
 
     # rating数字
     rating_str = str(rating).rjust(5)
-    num1 = Image.open(f"./Static/maimai/number/{rating_str[0]}.png").resize((18, 20))
-    num2 = Image.open(f"./Static/maimai/number/{rating_str[1]}.png").resize((18, 20))
-    num3 = Image.open(f"./Static/maimai/number/{rating_str[2]}.png").resize((18, 20))
-    num4 = Image.open(f"./Static/maimai/number/{rating_str[3]}.png").resize((18, 20))
-    num5 = Image.open(f"./Static/maimai/number/{rating_str[4]}.png").resize((18, 20))
-
-    bests = paste(bests, num1, (253, 78))
-    bests = paste(bests, num2, (267, 78))
-    bests = paste(bests, num3, (281, 78))
-    bests = paste(bests, num4, (294, 78))
-    bests = paste(bests, num5, (308, 78))
+    num1 = open_image(f"./Static/maimai/number/{rating_str[0]}.png", size=(18, 20))
+    num2 = open_image(f"./Static/maimai/number/{rating_str[1]}.png", size=(18, 20))
+    num3 = open_image(f"./Static/maimai/number/{rating_str[2]}.png", size=(18, 20))
+    num4 = open_image(f"./Static/maimai/number/{rating_str[3]}.png", size=(18, 20))
+    num5 = open_image(f"./Static/maimai/number/{rating_str[4]}.png", size=(18, 20))
+
+    paste(bests, num1, (253, 78))
+    paste(bests, num2, (267, 78))
+    paste(bests, num3, (281, 78))
+    paste(bests, num4, (294, 78))
+    paste(bests, num5, (308, 78))
     draw = ImageDraw.Draw(bests)
 
     # 名字
-    ttf = ImageFont.truetype(ttf2_regular_path, size=24)
+    ttf = get_font(ttf2_regular_path, 24)
     draw.text((186, 108), nickname, font=ttf, fill=(0, 0, 0))
 
     # rating合计
-    ttf = ImageFont.truetype(ttf2_bold_path, size=14)
+    ttf = get_font(ttf2_bold_path, 14)
     draw.text(
         (304, 154),
         (
@@ -781,9 +722,8 @@ async def generatebests(
     )
 
     frame_path = "./Static/Maimai/Bests/frame.png"
-    frame_img = Image.open(frame_path)
-    frame_img = resize_image(frame_img, 0.745)
-    bests = paste(bests, frame_img, (40, 36))
+    frame_cover = open_image(frame_path, 0.745)
+    paste(bests, frame_cover, (40, 36))
     draw = ImageDraw.Draw(bests)
 
     # 类型
@@ -801,14 +741,14 @@ async def generatebests(
         "rr50": str(),
     }
     type_name = type_names[type] if type in type_names else "Best 50"
-    ttf = ImageFont.truetype(ttf2_bold_path, size=32)
+    ttf = get_font(ttf2_bold_path, 32)
     draw.text((720, 740), type_name, font=ttf, fill=(0, 109, 103), anchor="mm")
 
     # bests
-    b35_img = await draw_best(b35, type, songList)
-    b15_img = await draw_best(b15, type, songList)
-    bests = paste(bests, b35_img, (25, 795))
-    bests = paste(bests, b15_img, (25, 1985))
+    b35_img = draw_best(b35_parts)
+    b15_img = draw_best(b15_parts)
+    paste(bests, b35_img, (25, 795))
+    paste(bests, b15_img, (25, 1985))
 
     img_byte_arr = BytesIO()
     bests = bests.convert("RGB")
@@ -829,93 +769,126 @@ async def generate_wcb(
     icon: str,
     frame: str,
     plate: str,
-    songList,
+    catalog: SongCatalog,
     level: Optional[str] = None,
     ds: Optional[float] = None,
     gen: Optional[str] = None,
     rate_count: Optional[dict[str, int]] = None,
 ):
-    bg = Image.open("./Static/Maimai/List/background.png")
-
-    # 底板
     if level or ds or gen:
-        frame_img = Image.open("./Static/Maimai/List/frame.png")
+        frame_img = open_image("./Static/Maimai/List/frame.png", 0.95)
     else:
-        frame_img = await get_frame(frame)
-    frame_img = resize_image(frame_img, 0.95)
-    bg = paste(bg, frame_img, (48, 45))
+        frame_img = await get_frame(frame, 0.95)
+    plate_img = await get_plate(plate)
+    icon_img = await get_icon(icon, size=(94, 94))
+    records_parts = await render_parts(
+        input_records, type="wcb", catalog=catalog, begin=(page - 1) * 55
+    )
+
+    # 合成与编码在线程中进行，不阻塞事件循环
+    return await asyncio.to_thread(
+        draw_wcb,
+        page,
+        nickname,
+        dani,
+        rating,
+        all_page_num,
+        catalog,
+        level,
+        ds,
+        gen,
+        rate_count,
+        frame_img,
+        plate_img,
+        icon_img,
+        records_parts,
+    )
+
+
+def draw_wcb(
+    page: int,
+    nickname: str,
+    dani: int,
+    rating: int,
+    all_page_num,
+    catalog: SongCatalog,
+    level: Optional[str],
+    ds: Optional[float],
+    gen: Optional[str],
+    rate_count: Optional[dict[str, int]],
+    frame_img: ImageObject,
+    plate_img: ImageObject,
+    icon_img: ImageObject,
+    records_parts: list[ImageObject],
+):
+    bg = open_image("./Static/Maimai/List/background.png").copy()
+
+    # 底板
+    paste(bg, frame_img, (48, 45))
 
     # 牌子
-    plate_img = await get_plate(plate)
-    bg = paste(bg, plate_img, (60, 60))
+    paste(bg, plate_img, (60, 60))
 
     # 头像
-    icon_img = await get_icon(icon)
-    icon_img = icon_img.resize((94, 94))
-    bg = paste(bg, icon_img, (72, 72))
+    paste(bg, icon_img, (72, 72))
 
     # 姓名框
     namebase_path = maimai_Static / "namebase.png"
-    namebase = Image.open(namebase_path)
-    bg = paste(bg, namebase, (175, 108))
+    namebase = open_image(namebase_path)
+    paste(bg, namebase, (175, 108))
 
     # 段位
     dani_path = maimai_Dani / f"{dani}.png"
-    dani_img = Image.open(dani_path)
-    dani_img = resize_image(dani_img, 0.213)
-    bg = paste(bg, dani_img, (346, 110))
+    dani_img = open_image(dani_path, 0.213)
+    paste(bg, dani_img, (346, 110))
 
     # 阶级
     class_path = maimai_Class / "0.png"
-    cla = Image.open(class_path)
-    cla = resize_image(cla, 0.78)
-    bg = paste(bg, cla, (346, 50))
+    cla = open_image(class_path, 0.78)
+    paste(bg, cla, (346, 50))
 
     # rating框
     ratingbar = compute_ra(rating)
     ratingbar_path = maimai_Rating / f"UI_CMN_DXRating_{ratingbar:02d}.png"
-    ratingbar = Image.open(ratingbar_path)
-    ratingbar = resize_image(ratingbar, 0.26)
-    bg = paste(bg, ratingbar, (175, 70))
+    ratingbar = open_image(ratingbar_path, 0.26)
+    paste(bg, ratingbar, (175, 70))
 
     # rating数字
     rating_str = str(rating).rjust(5)
-    num1 = Image.open(f"./Static/maimai/number/{rating_str[0]}.png").resize((18, 20))
-    num2 = Image.open(f"./Static/maimai/number/{rating_str[1]}.png").resize((18, 20))
-    num3 = Image.open(f"./Static/maimai/number/{rating_str[2]}.png").resize((18, 20))
-    num4 = Image.open(f"./Static/maimai/number/{rating_str[3]}.png").resize((18, 20))
-    num5 = Image.open(f"./Static/maimai/number/{rating_str[4]}.png").resize((18, 20))
-
-    bg = paste(bg, num1, (253, 78))
-    bg = paste(bg, num2, (267, 78))
-    bg = paste(bg, num3, (281, 78))
-    bg = paste(bg, num4, (294, 78))
-    bg = paste(bg, num5, (308, 78))
+    num1 = open_image(f"./Static/maimai/number/{rating_str[0]}.png", size=(18, 20))
+    num2 = open_image(f"./Static/maimai/number/{rating_str[1]}.png", size=(18, 20))
+    num3 = open_image(f"./Static/maimai/number/{rating_str[2]}.png", size=(18, 20))
+    num4 = open_image(f"./Static/maimai/number/{rating_str[3]}.png", size=(18, 20))
+    num5 = open_image(f"./Static/maimai/number/{rating_str[4]}.png", size=(18, 20))
+
+    paste(bg, num1, (253, 78))
+    paste(bg, num2, (267, 78))
+    paste(bg, num3, (281, 78))
+    paste(bg, num4, (294, 78))
+    paste(bg, num5, (308, 78))
     draw = ImageDraw.Draw(bg)
 
     # 名字
-    ttf = ImageFont.truetype(ttf2_regular_path, size=24)
+    ttf = get_font(ttf2_regular_path, 24)
     draw.text((186, 108), nickname, font=ttf, fill=(0, 0, 0))
 
     # 称号
     shougou_path = maimai_Shougou / "Normal.png"
-    shougou = Image.open(shougou_path)
-    shougou = resize_image(shougou, 0.7)
-    bg = paste(bg, shougou, (206, 143))
+    shougou = open_image(shougou_path, 0.7)
+    paste(bg, shougou, (206, 143))
     draw = ImageDraw.Draw(bg)
 
     if level:
         # 绘制的完成表的等级贴图
         level_icon_path = maimai_Level / f"{level}.png"
-        level_icon = Image.open(level_icon_path)
-        level_icon = resize_image(level_icon, 0.7)
-        bg = paste(bg, level_icon, (755 - (len(level) * 8), 45))
+        level_icon = open_image(level_icon_path, 0.7)
+        paste(bg, level_icon, (755 - (len(level) * 8), 45))
         draw = ImageDraw.Draw(bg)
 
     if level or ds or gen:
         # 绘制各达成数目
-        all_count = song_list_filter(songList, level, ds, gen)
-        ttf = ImageFont.truetype(font=ttf_bold_path, size=20)
+        all_count = song_list_filter(catalog, level, ds, gen)
+        ttf = get_font(ttf_bold_path, 20)
         rate_list = ["sssp", "sss", "ssp", "ss", "sp", "s", "clear"]
         fcfs_list = ["app", "ap", "fcp", "fc", "fsdp", "fsd", "fsp", "fs"]
         rate_x = 202
@@ -944,24 +917,18 @@ async def generate_wcb(
             fcfs_x += 102
 
     frame_path = "./Static/Maimai/Bests/frame.png"
-    frame_img = Image.open(frame_path)
-    frame_img = resize_image(frame_img, 0.745)
-    bg = paste(bg, frame_img, (40, 36))
+    frame_cover = open_image(frame_path, 0.745)
+    paste(bg, frame_cover, (40, 36))
     draw = ImageDraw.Draw(bg)
 
     # 页码
     page_text = f"{page} / {all_page_num}"
-    ttf = ImageFont.truetype(font=ttf_black_path, size=70)
+    ttf = get_font(ttf_black_path, 70)
     draw.text((260, 850), page_text, font=ttf, fill=(53, 74, 164), anchor="mm")
 
     # 绘制当前页面的成绩
-    records_parts = await draw_best(
-        input_records,
-        type="wcb",
-        begin=(page - 1) * 55,
-        songList=songList,
-    )
-    bg = paste(bg, records_parts, (25, 795))
+    records_img = draw_best(records_parts)
+    paste(bg, records_img, (25, 795))
 
     img_byte_arr = BytesIO()
     bg = bg.convert("RGB")
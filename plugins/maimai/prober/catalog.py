@@ -0,0 +1,84 @@
+from asyncio import Lock
+from typing import Optional
+
+from util.data import get_music_data_df
+
+
+def sibling_id(song_id: str | int) -> str:
+    # SD 与 DX 谱面的乐曲 id 相差 10000
+    id_int = int(song_id)
+    return str(id_int + 10000) if id_int < 10000 else str(id_int % 10000)
+
+
+class SongCatalog:
+    def __init__(self, songs: list[dict]):
+        self.songs = songs
+        self.by_id: dict[str, dict] = dict()
+        self.by_title: dict[str, list[dict]] = dict()
+        self.by_title_casefold: dict[str, list[dict]] = dict()
+        self.siblings: dict[str, str] = dict()
+        self.note_totals: dict[str, list[int]] = dict()
+
+        for song in songs:
+            song_id = song["id"]
+            self.by_id[song_id] = song
+            self.by_title.setdefault(song["title"], list()).append(song)
+            self.by_title_casefold.setdefault(song["title"].casefold(), list()).append(
+                song
+            )
+            self.note_totals[song_id] = [
+                sum(chart["notes"]) for chart in song["charts"]
+            ]
+
+        for song_id, song in self.by_id.items():
+            if song["basic_info"]["genre"] == "宴会場" or int(song_id) >= 20000:
+                continue
+            other_id = sibling_id(song_id)
+            if other_id in self.by_id:
+                self.siblings[song_id] = other_id
+
+    def __iter__(self):
+        return iter(self.songs)
+
+    def __len__(self) -> int:
+        return len(self.songs)
+
+    def get(self, song_id: str | int) -> Optional[dict]:
+        return self.by_id.get(str(song_id))
+
+    def find_by_title(self, title: str) -> list[dict]:
+        return self.by_title.get(title, list())
+
+    def find_by_title_casefold(self, title: str) -> list[dict]:
+        return self.by_title_casefold.get(title.casefold(), list())
+
+    def get_sibling(self, song_id: str | int) -> Optional[dict]:
+        other_id = self.siblings.get(str(song_id))
+        return self.by_id[other_id] if other_id else None
+
+    def note_total(self, song_id: str | int, level_index: int) -> int:
+        totals = self.note_totals.get(str(song_id))
+        if not totals or level_index >= len(totals):
+            return 0
+        return totals[level_index]
+
+
+_catalog: Optional[SongCatalog] = None
+_catalog_lock = Lock()
+
+
+async def get_song_catalog() -> SongCatalog:
+    global _catalog
+
+    songs = await get_music_data_df()
+    if _catalog is not None and _catalog.songs is songs:
+        return _catalog
+
+    async with _catalog_lock:
+        if _catalog is not None and _catalog.songs is songs:
+            return _catalog
+
+        # 乐曲数据刷新后重建，先完整构建再替换，正在使用旧目录的请求不受影响
+        _catalog = SongCatalog(songs)
+
+    return _catalog
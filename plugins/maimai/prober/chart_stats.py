@@ -0,0 +1,62 @@
+from asyncio import Lock
+from typing import Optional
+
+import numpy as np
+
+from util.data import get_chart_stats
+
+
+class ChartStatsIndex:
+    def __init__(self, stats: dict):
+        self.stats = stats
+        # 乐曲 id -> (该曲首个难度在数组中的位置, 难度数)，谱面 id 即位置加难度序号
+        self.offsets: dict[int, tuple[int, int]] = dict()
+        fit_diffs = list()
+        std_devs = list()
+
+        for song_id, levels in stats["charts"].items():
+            self.offsets[int(song_id)] = (len(fit_diffs), len(levels))
+            for level_data in levels:
+                fit_diffs.append(level_data.get("fit_diff", np.nan))
+                std_devs.append(level_data.get("std_dev", np.nan))
+
+        # 末尾的空位留给不存在的谱面
+        self.missing = len(fit_diffs)
+        self.fit_diffs = np.array(fit_diffs + [np.nan], dtype=np.float64)
+        self.std_devs = np.array(std_devs + [np.nan], dtype=np.float64)
+
+    def chart_id(self, song_id: str | int, level_index: int) -> int:
+        offset, count = self.offsets.get(int(song_id), (0, 0))
+        if not 0 <= level_index < count:
+            return self.missing
+        return offset + level_index
+
+    def fit_diff(self, song_id: str | int, level_index: int, ds: float) -> float:
+        # 没有拟合定数时使用谱面定数
+        value = self.fit_diffs[self.chart_id(song_id, level_index)]
+        return ds if np.isnan(value) else float(value)
+
+    def std_dev(self, song_id: str | int, level_index: int) -> float:
+        value = self.std_devs[self.chart_id(song_id, level_index)]
+        return 0.0 if np.isnan(value) else float(value)
+
+
+_index: Optional[ChartStatsIndex] = None
+_index_lock = Lock()
+
+
+async def get_chart_stats_index() -> ChartStatsIndex:
+    global _index
+
+    stats = await get_chart_stats()
+    if _index is not None and _index.stats is stats:
+        return _index
+
+    async with _index_lock:
+        if _index is not None and _index.stats is stats:
+            return _index
+
+        # 谱面统计刷新后重建，先完整构建再替换
+        _index = ChartStatsIndex(stats)
+
+    return _index
@@ -0,0 +1,181 @@
+import math
+import time
+from typing import Optional
+
+from .GLOBAL_CONSTANT import exclude_list, versions_map
+from .bests_gen import compute_record, get_page_records, ratings
+from .catalog import SongCatalog
+from .diving_fish import RECORDS_TTL, get_player_records
+
+# 完成表每页的成绩数
+ITEMS_PER_PAGE = 55
+
+# 各评级的下限达成率，以及上一级评级的下限达成率
+RATE_MIN_ACC = {rate: value[0] * 100 for rate, value in ratings.items()}
+RATE_MAX_ACC = {
+    rate: list(ratings.values())[i - 1][0] * 100 for i, rate in enumerate(ratings)
+}
+
+
+def get_min_score(notes: list[int]):
+    weight = [1, 2, 3, 1, 5]
+    base_score = 5
+    sum_score = 0
+    for i in range(0, 5):
+        if i == 3 and len(notes) < 5:
+            sum_score += notes[i] * weight[4] * base_score
+            break
+        sum_score += notes[i] * weight[i] * base_score
+    if not sum_score:
+        return math.inf
+    return (1 - ((sum_score - 1) / sum_score)) * 100
+
+
+class ChartIndex:
+    def __init__(self, catalog: SongCatalog):
+        self.catalog = catalog
+        # (乐曲 id, 难度) -> 差一个最小单位时的达成率差值
+        self.min_scores: dict[tuple[str, int], float] = dict()
+        # 版本 -> 属于该版本的乐曲 id
+        self.gen_songs: dict[str, set[str]] = {gen: set() for gen in versions_map}
+
+        for song in catalog:
+            song_id = song["id"]
+            for level_index, chart in enumerate(song["charts"]):
+                notes = chart["notes"]
+                min_score_1 = get_min_score(notes)
+                min_score_2 = 1 / notes[-1] / 2 if notes[-1] > 0 else 0
+                self.min_scores[(song_id, level_index)] = min(min_score_1, min_score_2)
+            for gen, versions in versions_map.items():
+                if song["basic_info"]["from"] in versions:
+                    self.gen_songs[gen].add(song_id)
+
+    def filter(
+        self,
+        records: list,
+        level: Optional[str] = None,
+        ds: Optional[float] = None,
+        gen: Optional[str] = None,
+        is_sun: bool = False,
+        is_lock: bool = False,
+    ) -> tuple[list, bool]:
+        filted_records = list()
+        mask_enabled = False
+        for record in records:
+            if record["level_label"] == "Utage":
+                continue
+            if level and record["level"] != level:
+                continue
+            if ds and record["ds"] != ds:
+                continue
+            song_id = str(record["song_id"])
+            if not self.catalog.get(song_id):
+                continue
+            if (
+                gen
+                and gen in versions_map
+                and (
+                    song_id not in self.gen_songs[gen]
+                    or (gen != "舞" and record["level_index"] == 4)
+                )
+                or (gen in exclude_list and record["song_id"] in exclude_list[gen])
+            ):
+                continue
+            if is_sun or is_lock:
+                if record["dxScore"] == 0:
+                    mask_enabled = True
+                    continue
+                min_score = self.min_scores[(song_id, record["level_index"])]
+                achievements = record["achievements"]
+                if is_sun:
+                    max_acc = RATE_MAX_ACC[record["rate"]]
+                    if not max_acc - min_score <= achievements < max_acc:
+                        continue
+                if is_lock:
+                    min_acc = RATE_MIN_ACC[record["rate"]]
+                    if min_acc + min_score < achievements or achievements < min_acc:
+                        continue
+            filted_records.append(record)
+        filted_records.sort(
+            key=lambda x: (
+                0 if level or ds else float(x["level"].replace("+", ".1")),
+                x["achievements"],
+                x["ra"],
+            ),
+            reverse=True,
+        )
+        return filted_records, mask_enabled
+
+
+_chart_index: Optional[ChartIndex] = None
+
+
+def get_chart_index(catalog: SongCatalog) -> ChartIndex:
+    global _chart_index
+
+    # 曲库刷新后重建
+    if _chart_index is None or _chart_index.catalog is not catalog:
+        _chart_index = ChartIndex(catalog)
+    return _chart_index
+
+
+class CompletionTable:
+    def __init__(
+        self,
+        data: dict,
+        catalog: SongCatalog,
+        level: Optional[str] = None,
+        ds: Optional[float] = None,
+        gen: Optional[str] = None,
+        is_sun: bool = False,
+        is_lock: bool = False,
+    ):
+        self.created_at = time.time()
+        self.catalog = catalog
+        # 只保留玩家信息，成绩只保留筛选后的部分
+        self.player = {k: v for k, v in data.items() if k != "records"}
+        self.record_count = len(data["records"])
+        self.records, self.mask_enabled = get_chart_index(catalog).filter(
+            data["records"], level, ds, gen, is_sun, is_lock
+        )
+        self.page_count = math.ceil(len(self.records) / ITEMS_PER_PAGE)
+        self._rate_count: Optional[dict[str, int]] = None
+
+    @property
+    def rate_count(self) -> dict[str, int]:
+        if self._rate_count is None:
+            self._rate_count = compute_record(records=self.records)
+        return self._rate_count
+
+    def page(self, page: int) -> list:
+        return get_page_records(self.records, page)
+
+
+_tables: dict[tuple, CompletionTable] = dict()
+
+
+async def get_completion_table(
+    qq: str,
+    catalog: SongCatalog,
+    level: Optional[str] = None,
+    ds: Optional[float] = None,
+    gen: Optional[str] = None,
+    is_sun: bool = False,
+    is_lock: bool = False,
+) -> tuple[Optional[CompletionTable], int]:
+    key = (qq, level, ds, gen, is_sun, is_lock)
+    now = time.time()
+    table = _tables.get(key)
+    if table and table.catalog is catalog and now - table.created_at < RECORDS_TTL:
+        # 翻页时直接使用上次的筛选结果
+        return table, 200
+
+    data, status = await get_player_records(qq)
+    if not data:
+        return None, status
+
+    for k in [k for k, t in _tables.items() if now - t.created_at >= RECORDS_TTL]:
+        del _tables[k]
+    table = CompletionTable(data, catalog, level, ds, gen, is_sun, is_lock)
+    _tables[key] = table
+    return table, status
@@ -1,4 +1,6 @@
-from typing import Any
+import time
+from collections import OrderedDict
+from typing import Any, Optional
 
 from sqlalchemy import Boolean, String
 from sqlalchemy.dialects.postgresql import insert
@@ -7,6 +9,7 @@ from sqlalchemy.future import select
 from sqlalchemy.orm import Mapped, mapped_column
 
 from util.database import Base, with_transaction
+from .bests_cache import bests_cache
 
 
 class UserConfig(Base):
@@ -25,50 +28,94 @@ class UserConfig(Base):
     allow_other: Mapped[bool] = mapped_column(Boolean, default=True)
 
 
+DEFAULT_CONFIG = {
+    "frame": "200502",
+    "plate": "101",
+    "icon": "101",
+    "rating_tj": True,
+    "source": "lxns",
+    "lx_personal_token": None,
+    "allow_other": True,
+}
+
+# 变更后需要清除成绩图缓存的设置项
+COSMETIC_KEYS = {"frame", "plate", "icon", "source", "lx_personal_token"}
+
+# 进程内缓存的用户设置条数
+CONFIG_CACHE_SIZE = 4096
+# 缓存的用户设置有效期（秒），兜底其他进程对设置的修改
+CONFIG_CACHE_TTL = 60
+
+
 class UserConfigManager:
+    def __init__(self):
+        # 用户 id -> (缓存时间, 设置)，设置为 None 表示数据库中没有该用户
+        self.cache: OrderedDict[str, tuple[float, Optional[dict]]] = OrderedDict()
+        # 用户 id -> 设置的写入次数，每次提交后递增
+        self.versions: dict[str, int] = dict()
+
+    def _cache_put(self, user_id: str, config: Optional[dict]):
+        self.cache[user_id] = (time.time(), config)
+        self.cache.move_to_end(user_id)
+        while len(self.cache) > CONFIG_CACHE_SIZE:
+            self.cache.popitem(last=False)
+
     @with_transaction
-    async def get_user_config(self, user_id: str, **kwargs) -> dict:
+    async def _load_user_configs(
+        self, user_ids: list[str], **kwargs
+    ) -> dict[str, Optional[dict]]:
         session: AsyncSession = kwargs["session"]
 
-        stmt = select(UserConfig).where(UserConfig.user_id == user_id)
+        stmt = select(UserConfig).where(UserConfig.user_id.in_(user_ids))
         result = await session.execute(stmt)
-        config = result.scalar_one_or_none()
-
-        if config:
-            return {
-                "frame": config.frame,
-                "plate": config.plate,
-                "icon": config.icon,
-                "rating_tj": config.rating_tj,
-                "source": config.source,
-                "lx_personal_token": config.lx_personal_token,
-                "allow_other": config.allow_other,
+        configs = {user_id: None for user_id in user_ids}
+        for config in result.scalars():
+            configs[config.user_id] = {
+                key: getattr(config, key) for key in DEFAULT_CONFIG
             }
-
+        return configs
+
+    async def _get_rows(self, user_ids: list[str]) -> dict[str, Optional[dict]]:
+        rows = dict()
+        missing = list()
+        now = time.time()
+        for user_id in dict.fromkeys(user_ids):
+            entry = self.cache.get(user_id)
+            if entry and now - entry[0] < CONFIG_CACHE_TTL:
+                self.cache.move_to_end(user_id)
+                rows[user_id] = entry[1]
+            else:
+                missing.append(user_id)
+
+        if missing:
+            versions = {user_id: self.versions.get(user_id, 0) for user_id in missing}
+            # 未缓存的用户合并为一次查询
+            for user_id, config in (await self._load_user_configs(missing)).items():
+                # 查询期间有写入提交时，读到的可能是旧值，只返回不缓存
+                if self.versions.get(user_id, 0) == versions[user_id]:
+                    self._cache_put(user_id, config)
+                rows[user_id] = config
+        return rows
+
+    def _invalidate(self, user_id: str):
+        # 提交后递增版本并清除缓存，查询中的旧值不会再被写回缓存
+        self.versions[user_id] = self.versions.get(user_id, 0) + 1
+        self.cache.pop(user_id, None)
+
+    async def get_user_configs(self, user_ids: list[str]) -> dict[str, dict]:
+        rows = await self._get_rows(user_ids)
         return {
-            "frame": "200502",
-            "plate": "101",
-            "icon": "101",
-            "rating_tj": True,
-            "source": "lxns",
-            "lx_personal_token": None,
-            "allow_other": True,
+            user_id: dict(config or DEFAULT_CONFIG) for user_id, config in rows.items()
         }
 
+    async def get_user_config(self, user_id: str) -> dict:
+        return (await self.get_user_configs([user_id]))[user_id]
+
     @with_transaction
-    async def set_user_config(self, user_id: str, config_data: dict, **kwargs) -> None:
+    async def _set_user_config(self, user_id: str, config_data: dict, **kwargs) -> None:
         session: AsyncSession = kwargs["session"]
 
-        default_config = {
-            "frame": "200502",
-            "plate": "101",
-            "icon": "101",
-            "rating_tj": True,
-            "source": "lxns",
-            "lx_personal_token": None,
-            "allow_other": True,
-        }
-        merged_config = {**default_config, **config_data}
+        merged_config = {**DEFAULT_CONFIG, **config_data}
         merged_config["user_id"] = user_id
 
         stmt = insert(UserConfig).values(**merged_config)
@@ -77,23 +124,21 @@ class UserConfigManager:
         stmt = stmt.on_conflict_do_update(index_elements=["user_id"], set_=update_dict)
         await session.execute(stmt)
 
-    @with_transaction
-    async def get_config_value(
-        self, user_id: str, key: str, default=None, **kwargs
-    ) -> Any:
-        session: AsyncSession = kwargs["session"]
-
-        stmt = select(UserConfig).where(UserConfig.user_id == user_id)
-        result = await session.execute(stmt)
-        config = result.scalar_one_or_none()
+    async def set_user_config(self, user_id: str, config_data: dict) -> None:
+        await self._set_user_config(user_id, config_data)
+        self._invalidate(user_id)
+        if COSMETIC_KEYS & config_data.keys():
+            bests_cache.invalidate(user_id)
 
-        if config and hasattr(config, key):
-            return getattr(config, key)
+    async def get_config_value(self, user_id: str, key: str, default=None) -> Any:
+        config = (await self._get_rows([user_id]))[user_id]
+        if config and key in config:
+            return config[key]
 
         return default
 
     @with_transaction
-    async def set_config_value(
+    async def _set_config_value(
         self, user_id: str, key: str, value: Any, **kwargs
     ) -> bool:
         session: AsyncSession = kwargs["session"]
@@ -105,15 +150,7 @@ class UserConfigManager:
         if config and hasattr(config, key) and getattr(config, key) == value:
             return False
 
-        default_config = {
-            "frame": "200502",
-            "plate": "101",
-            "icon": "101",
-            "rating_tj": True,
-            "source": "lxns",
-            "lx_personal_token": None,
-            "allow_other": True,
-        }
+        default_config = dict(DEFAULT_CONFIG)
         default_config[key] = value
         default_config["user_id"] = user_id
 
@@ -124,5 +161,14 @@ class UserConfigManager:
         await session.execute(stmt)
         return True
 
+    async def set_config_value(self, user_id: str, key: str, value: Any) -> bool:
+        if not await self._set_config_value(user_id, key, value):
+            return False
+
+        self._invalidate(user_id)
+        if key in COSMETIC_KEYS:
+            bests_cache.invalidate(user_id)
+        return True
+
 
 user_config_manager = UserConfigManager()
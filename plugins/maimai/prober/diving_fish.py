@@ -1,45 +1,83 @@
-from httpx import AsyncClient, URL
+import asyncio
+import time
+from asyncio import Task
+
+from httpx import URL
 
 from util.config import config
+from util.http_client import http_client
 
 base_url = "https://www.diving-fish.com/api/maimaidxprober/"
 
+# 成绩缓存有效期（秒），连续查询多个成绩图时只拉取一次
+RECORDS_TTL = 60
+
+_records_cache: dict[str, tuple[float, dict]] = dict()
+_records_tasks: dict[str, Task] = dict()
+
 
 async def get_player_data(qq: str):
     payload = {"qq": qq, "b50": True}
-    async with AsyncClient(http2=True, follow_redirects=True) as session:
-        resp = await session.post(URL(f"{base_url}query/player"), json=payload)
-        if resp.is_error:
-            return None, resp.status_code
-        obj = resp.json()
-        return obj, resp.status_code
+    resp = await http_client.post(URL(f"{base_url}query/player"), json=payload)
+    if resp.is_error:
+        return None, resp.status_code
+    obj = resp.json()
+    return obj, resp.status_code
 
 
-async def get_player_records(qq: str):
+async def _fetch_player_records(qq: str):
     headers = {"Developer-Token": config.df_token}
     payload = {"qq": qq}
-    async with AsyncClient(http2=True, follow_redirects=True) as session:
-        resp = await session.get(
-            URL(f"{base_url}dev/player/records"),
-            headers=headers,
-            params=payload,
-        )
-        if resp.is_error:
-            return None, resp.status_code
-        obj = resp.json()
-        return obj, resp.status_code
+    resp = await http_client.get(
+        URL(f"{base_url}dev/player/records"),
+        headers=headers,
+        params=payload,
+    )
+    if resp.is_error:
+        return None, resp.status_code
+    obj = resp.json()
+
+    # 记录本次拉取时间，顺便清理过期的缓存
+    now = time.time()
+    for key in [k for k, (t, _) in _records_cache.items() if now - t >= RECORDS_TTL]:
+        del _records_cache[key]
+    _records_cache[qq] = (now, obj)
+    return obj, resp.status_code
+
+
+def _copy_records(obj: dict) -> dict:
+    # 调用方会就地修改成绩，每次都返回副本
+    return {**obj, "records": [dict(record) for record in obj["records"]]}
+
+
+async def get_player_records(qq: str | int):
+    qq = str(qq)
+    entry = _records_cache.get(qq)
+    if entry and time.time() - entry[0] < RECORDS_TTL:
+        return _copy_records(entry[1]), 200
+
+    # 同一玩家的并发请求只拉取一次
+    task = _records_tasks.get(qq)
+    if not task:
+        task = asyncio.create_task(_fetch_player_records(qq))
+        _records_tasks[qq] = task
+        task.add_done_callback(lambda _: _records_tasks.pop(qq, None))
+
+    obj, status = await asyncio.shield(task)
+    if obj is None:
+        return None, status
+    return _copy_records(obj), status
 
 
 async def get_player_record(qq: str, music_id: str | int):
     headers = {"Developer-Token": config.df_token}
     payload = {"qq": qq, "music_id": music_id}
-    async with AsyncClient(http2=True, follow_redirects=True) as session:
-        resp = await session.post(
-            URL(f"{base_url}dev/player/record"),
-            headers=headers,
-            json=payload,
-        )
-        if resp.is_error:
-            return None, resp.status_code
-        obj = resp.json()
-        return obj, resp.status_code
+    resp = await http_client.post(
+        URL(f"{base_url}dev/player/record"),
+        headers=headers,
+        json=payload,
+    )
+    if resp.is_error:
+        return None, resp.status_code
+    obj = resp.json()
+    return obj, resp.status_code
@@ -1,17 +1,45 @@
-from PIL import Image, ImageDraw
+import math
+import os
+from functools import lru_cache
+from pathlib import Path
+
+from PIL import Image, ImageDraw, ImageFont
 from PIL.Image import Image as ImageObject
+from PIL.ImageFont import FreeTypeFont
+
+
+@lru_cache(maxsize=None)
+def get_font(font: str | os.PathLike[str] | Path, size: int) -> FreeTypeFont:
+    # 字体文件解析开销较大，同一字体与字号在进程内只加载一次
+    return ImageFont.truetype(font, size=size)
 
 
 def paste(
     background: ImageObject, img: ImageObject, pos: tuple[int, int]
 ) -> ImageObject:
-    overlay = Image.new("RGBA", background.size, (0, 0, 0, 0))
-    overlay.paste(img, pos)
-    return Image.alpha_composite(background, overlay)
+    # 仅在目标区域内原地混合，background 必须是可修改的 RGBA 画布
+    x, y = pos
+    if img.mode != "RGBA":
+        img = img.convert("RGBA")
+    # alpha_composite 不接受负坐标，超出画布左上方的部分直接裁掉
+    source = (max(-x, 0), max(-y, 0))
+    if source[0] >= img.width or source[1] >= img.height:
+        return background
+
+    background.alpha_composite(img, (max(x, 0), max(y, 0)), source)
+    return background
 
 
 def text(background: ImageObject, **kwargs) -> ImageObject:
-    overlay = Image.new("RGBA", background.size, (0, 0, 0, 0))
-    overlay_draw = ImageDraw.Draw(overlay)
-    overlay_draw.text(**kwargs)
-    return Image.alpha_composite(background, overlay)
+    # 只为文字所占区域创建图层
+    bbox_kwargs = {k: v for k, v in kwargs.items() if k not in ("fill", "stroke_fill")}
+    left, top, right, bottom = ImageDraw.Draw(background).textbbox(**bbox_kwargs)
+    left, top = math.floor(left), math.floor(top)
+    width, height = math.ceil(right) - left, math.ceil(bottom) - top
+    if width <= 0 or height <= 0:
+        return background
+
+    overlay = Image.new("RGBA", (width, height), (0, 0, 0, 0))
+    x, y = kwargs["xy"]
+    ImageDraw.Draw(overlay).text(**{**kwargs, "xy": (x - left, y - top)})
+    return paste(background, overlay, (left, top))
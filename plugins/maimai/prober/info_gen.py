@@ -2,10 +2,9 @@ import math
 from io import BytesIO
 
 import numpy as np
-from PIL import Image, ImageDraw, ImageFont
+from PIL import ImageDraw
 
-from util.data import get_chart_stats
-from util.resources import get_jacket
+from util.resources import get_jacket, open_image
 from .Config import (
     font_path,
     maimai_MusicType,
@@ -13,8 +12,8 @@ from .Config import (
     maimai_Static,
     maimai_Version,
 )
-from .bests_gen import get_fit_diff
-from .draw import paste
+from .chart_stats import get_chart_stats_index
+from .draw import get_font, paste
 
 ranks = [
     ("sssp", 100.5),
@@ -41,17 +40,6 @@ ttf2_bold_path = font_path / "NotoSansCJKsc-Bold.otf"
 ttf2_regular_path = font_path / "NotoSansCJKsc-Regular.otf"
 
 
-def resize_image(image, scale):
-    # 计算缩放后的目标尺寸
-    width = math.ceil(image.width * scale)
-    height = math.ceil(image.height * scale)
-
-    # 缩放图像
-    resized_image = image.resize((width, height))
-
-    return resized_image
-
-
 def format_songid(id):
     id_str = str(id)
     if len(id_str) == 5 and id_str.startswith("10"):
@@ -66,17 +54,16 @@ def format_songid(id):
 
 async def chart_info(song_data):
     # 底图
-    bg = Image.open("./Static/Maimai/Chart/background.png")
+    bg = open_image("./Static/Maimai/Chart/background.png").copy()
 
     # 歌曲封面
-    cover = await get_jacket(int(song_data["id"]) % 10000)
-    cover = cover.resize((295, 295))
-    bg = paste(bg, cover, (204, 440))
+    cover = await get_jacket(int(song_data["id"]) % 10000, size=(295, 295))
+    paste(bg, cover, (204, 440))
     drawtext = ImageDraw.Draw(bg)
 
     # 绘制标题
     song_title = song_data["title"]
-    ttf = ImageFont.truetype(ttf_bold_path, size=40)
+    ttf = get_font(ttf_bold_path, 40)
     title_position = (545, 626)
     max_width = 565
     ellipsis = "…"
@@ -98,7 +85,7 @@ async def chart_info(song_data):
 
     # 绘制曲师
     song_artist = song_data["basic_info"]["artist"]
-    ttf = ImageFont.truetype(ttf_regular_path, size=30)
+    ttf = get_font(ttf_regular_path, 30)
     artist_position = (545, 694)
     max_width = 565
     ellipsis = "…"
@@ -119,7 +106,7 @@ async def chart_info(song_data):
         )
 
     # id
-    ttf = ImageFont.truetype(ttf_bold_path, size=25)
+    ttf = get_font(ttf_bold_path, 25)
     id_position = (239, 872)
     drawtext.text(
         id_position,
@@ -139,7 +126,7 @@ async def chart_info(song_data):
         fill=(53, 74, 164),
     )
     # 分类
-    ttf = ImageFont.truetype(ttf2_bold_path, size=25)
+    ttf = get_font(ttf2_bold_path, 25)
     song_genre = song_data["basic_info"]["genre"]
     genre_position = (544, 872)
     drawtext.text(
@@ -150,21 +137,19 @@ async def chart_info(song_data):
         fill=(53, 74, 164),
     )
     # 谱面类型
-    ttf = ImageFont.truetype(ttf_bold_path, size=25)
+    ttf = get_font(ttf_bold_path, 25)
     song_type = song_data["type"]
     type_path = maimai_MusicType / f"{song_type}.png"
-    type = Image.open(type_path)
-    type = resize_image(type, 0.7)
-    bg = paste(bg, type, (694, 852))
+    type = open_image(type_path, 0.7)
+    paste(bg, type, (694, 852))
     # version
     song_ver = song_data["basic_info"]["from"]
-    song_ver = Image.open(maimai_Version / f"{song_ver}.png")
-    song_ver = resize_image(song_ver, 0.8)
-    bg = paste(bg, song_ver, (860, 768))
+    song_ver = open_image(maimai_Version / f"{song_ver}.png", 0.8)
+    paste(bg, song_ver, (860, 768))
     drawtext = ImageDraw.Draw(bg)
 
     # 等级
-    ttf = ImageFont.truetype(ttf_black_path, size=50)
+    ttf = get_font(ttf_black_path, 50)
     songs_level = song_data["level"]
     level_color = [
         (14, 117, 54),
@@ -180,8 +165,8 @@ async def chart_info(song_data):
             song_level = song_level.replace("+", str())
             level_label = ["Basic", "Advanced", "Expert", "Master", "ReMASTER"][i]
             plus_path = maimai_Plus / f"{level_label}.png"
-            plus_icon = Image.open(plus_path)
-            bg = paste(bg, plus_icon, (level_x + 33, level_y - 70))
+            plus_icon = open_image(plus_path)
+            paste(bg, plus_icon, (level_x + 33, level_y - 70))
             drawtext = ImageDraw.Draw(bg)
         level_position = (level_x, level_y)
         drawtext.text(
@@ -190,16 +175,16 @@ async def chart_info(song_data):
         level_x += 170
 
     # 定数->ra
-    ttf = ImageFont.truetype(ttf_bold_path, size=16)
+    ttf = get_font(ttf_bold_path, 16)
     songs_ds = song_data["ds"]
     ds_x = 395
     ds_y = 1124
-    charts = await get_chart_stats()
+    stats = await get_chart_stats_index()
     for i, song_ds in enumerate(songs_ds):
         ds_position = (ds_x, ds_y)
         drawtext.text(
             ds_position,
-            f"{song_ds} | {math.trunc(get_fit_diff(song_data['id'], i, song_ds, charts) * 100) / 100:.2f}",
+            f"{song_ds} | {math.trunc(stats.fit_diff(song_data['id'], i, song_ds) * 100) / 100:.2f}",
             anchor="mm",
             font=ttf,
             fill=level_color[i],
@@ -207,12 +192,12 @@ async def chart_info(song_data):
         ds_x += 170
 
     # 物量
-    ttf = ImageFont.truetype(ttf_bold_path, size=40)
+    ttf = get_font(ttf_bold_path, 40)
     song_charts = song_data["charts"]
     notes_x = 395
     for i, chart in enumerate(song_charts):
         notes_y = 1200
-        notes = chart["notes"]
+        notes = list(chart["notes"])
         if len(notes) < 5:
             notes.insert(3, 0)
         total_num = np.sum(notes)
@@ -233,7 +218,7 @@ async def chart_info(song_data):
         notes_x += 170
 
     # 谱师
-    ttf = ImageFont.truetype(ttf_regular_path, size=20)
+    ttf = get_font(ttf_regular_path, 20)
     song_charters = [item["charter"] for item in song_charts[2:]]
     charter_x = 448
     charter_y = 1792
@@ -257,17 +242,16 @@ async def chart_info(song_data):
 async def score_info(data, song_data):
     records = data[song_data["id"]]
     # 底图
-    bg = Image.open("./Static/Maimai/Score/background.png")
+    bg = open_image("./Static/Maimai/Score/background.png").copy()
 
     # 歌曲封面
-    cover = await get_jacket(int(song_data["id"]) % 10000)
-    cover = cover.resize((295, 295))
-    bg = paste(bg, cover, (204, 440))
+    cover = await get_jacket(int(song_data["id"]) % 10000, size=(295, 295))
+    paste(bg, cover, (204, 440))
     drawtext = ImageDraw.Draw(bg)
 
     # 绘制标题
     song_title = song_data["title"]
-    ttf = ImageFont.truetype(ttf_bold_path, size=40)
+    ttf = get_font(ttf_bold_path, 40)
     title_position = (545, 626)
     max_width = 565
     ellipsis = "…"
@@ -289,7 +273,7 @@ async def score_info(data, song_data):
 
     # 绘制曲师
     song_artist = song_data["basic_info"]["artist"]
-    ttf = ImageFont.truetype(ttf_regular_path, size=30)
+    ttf = get_font(ttf_regular_path, 30)
     artist_position = (545, 694)
     max_width = 565
     ellipsis = "…"
@@ -310,7 +294,7 @@ async def score_info(data, song_data):
         )
 
     # id
-    ttf = ImageFont.truetype(ttf_bold_path, size=25)
+    ttf = get_font(ttf_bold_path, 25)
     id_position = (239, 872)
     drawtext.text(
         id_position,
@@ -330,7 +314,7 @@ async def score_info(data, song_data):
         fill=(53, 74, 164),
     )
     # 分类
-    ttf = ImageFont.truetype(ttf2_bold_path, size=25)
+    ttf = get_font(ttf2_bold_path, 25)
     song_genre = song_data["basic_info"]["genre"]
     genre_position = (544, 872)
     drawtext.text(
@@ -341,17 +325,15 @@ async def score_info(data, song_data):
         fill=(53, 74, 164),
     )
     # 谱面类型
-    ttf = ImageFont.truetype(ttf_bold_path, size=25)
+    ttf = get_font(ttf_bold_path, 25)
     song_type = song_data["type"]
     type_path = maimai_MusicType / f"{song_type}.png"
-    type = Image.open(type_path)
-    type = resize_image(type, 0.7)
-    bg = paste(bg, type, (694, 852))
+    type = open_image(type_path, 0.7)
+    paste(bg, type, (694, 852))
     # version
     song_ver = song_data["basic_info"]["from"]
-    song_ver = Image.open(maimai_Version / f"{song_ver}.png")
-    song_ver = resize_image(song_ver, 0.8)
-    bg = paste(bg, song_ver, (860, 768))
+    song_ver = open_image(maimai_Version / f"{song_ver}.png", 0.8)
+    paste(bg, song_ver, (860, 768))
     drawtext = ImageDraw.Draw(bg)
 
     # 绘制成绩
@@ -393,15 +375,15 @@ async def score_info(data, song_data):
         if "+" in level:
             level = level.replace("+", str())
             plus_path = maimai_Plus / f"{level_label}.png"
-            plus_icon = Image.open(plus_path)
-            bg = paste(bg, plus_icon, (plus_x, plus_y))
+            plus_icon = open_image(plus_path)
+            paste(bg, plus_icon, (plus_x, plus_y))
             drawtext = ImageDraw.Draw(bg)
-        ttf = ImageFont.truetype(ttf_black_path, size=50)
+        ttf = get_font(ttf_black_path, 50)
         drawtext.text((level_x, level_y), level, font=ttf, fill=color, anchor="mm")
 
         scores = [d for d in records if d["level_index"] == i]
         if not scores:
-            ttf = ImageFont.truetype(ttf_bold_path, size=20)
+            ttf = get_font(ttf_bold_path, 20)
             drawtext.text(
                 (dsra_x, dsra_y),
                 f"{song_data['ds'][i]}->---",
@@ -425,38 +407,35 @@ async def score_info(data, song_data):
         rate = score["rate"]
 
         # 达成率
-        ttf = ImageFont.truetype(ttf_bold_path, size=43)
+        ttf = get_font(ttf_bold_path, 43)
         drawtext.text(
             (achieve_x, achieve_y), achieve, font=ttf, fill=color, anchor="mm"
         )
 
         # 评价
         rate_path = f"./Static/Maimai/Rate/{rate}.png"
-        rate = Image.open(rate_path)
-        rate = resize_image(rate, 0.5)
-        bg = paste(bg, rate, (rate_x, rate_y))
+        rate = open_image(rate_path, 0.5)
+        paste(bg, rate, (rate_x, rate_y))
         drawtext = ImageDraw.Draw(bg)
 
         # fc & fs
         if fc:
             fc_path = maimai_Static / f"playicon_{fc}.png"
-            fc = Image.open(fc_path)
-            fc = resize_image(fc, 0.33)
-            bg = paste(bg, fc, (fc_x, fc_y))
+            fc = open_image(fc_path, 0.33)
+            paste(bg, fc, (fc_x, fc_y))
             drawtext = ImageDraw.Draw(bg)
 
         if fs:
             fs_path = maimai_Static / f"playicon_{fs}.png"
-            fs = Image.open(fs_path)
-            fs = resize_image(fs, 0.33)
-            bg = paste(bg, fs, (fs_x, fs_y))
+            fs = open_image(fs_path, 0.33)
+            paste(bg, fs, (fs_x, fs_y))
             drawtext = ImageDraw.Draw(bg)
 
         # 定数->ra
         if ra <= 0:
             ra = "---"
 
-        ttf = ImageFont.truetype(ttf_bold_path, size=20)
+        ttf = get_font(ttf_bold_path, 20)
         drawtext.text(
             (dsra_x, dsra_y), f"{ds}->{ra}", font=ttf, fill=color, anchor="mm"
         )
@@ -472,19 +451,18 @@ async def score_info(data, song_data):
 
 async def utage_chart_info(song_data, index=0):
     # 底图
-    bg = Image.open("./Static/Maimai/Chart/background_utage.png")
+    bg = open_image("./Static/Maimai/Chart/background_utage.png").copy()
 
     # 歌曲封面
-    cover = await get_jacket(int(song_data["id"]) % 10000)
-    cover = cover.resize((295, 295))
-    bg = paste(bg, cover, (204, 440))
+    cover = await get_jacket(int(song_data["id"]) % 10000, size=(295, 295))
+    paste(bg, cover, (204, 440))
     drawtext = ImageDraw.Draw(bg)
 
     # 绘制标题
     song_title = song_data["title"]
     if len(song_data["charts"]) > 1:
         song_title = f"[{'左右'[index]}]{song_title}"
-    ttf = ImageFont.truetype(ttf_bold_path, size=40)
+    ttf = get_font(ttf_bold_path, 40)
     title_position = (545, 626)
     max_width = 565
     ellipsis = "…"
@@ -506,7 +484,7 @@ async def utage_chart_info(song_data, index=0):
 
     # 绘制曲师
     song_artist = song_data["basic_info"]["artist"]
-    ttf = ImageFont.truetype(ttf_regular_path, size=30)
+    ttf = get_font(ttf_regular_path, 30)
     artist_position = (545, 694)
     max_width = 565
     ellipsis = "…"
@@ -527,7 +505,7 @@ async def utage_chart_info(song_data, index=0):
         )
 
     # id
-    ttf = ImageFont.truetype(ttf_bold_path, size=25)
+    ttf = get_font(ttf_bold_path, 25)
     id_position = (239, 872)
     drawtext.text(
         id_position,
@@ -548,35 +526,32 @@ async def utage_chart_info(song_data, index=0):
     )
     # 分类
     genre_path = "./Static/maimai/MusicType/Utage.png"
-    genre = Image.open(genre_path)
-    genre = resize_image(genre, 0.5)
-    bg = paste(bg, genre, (462, 830))
+    genre = open_image(genre_path, 0.5)
+    paste(bg, genre, (462, 830))
     # 谱面类型
-    ttf = ImageFont.truetype(ttf_bold_path, size=25)
+    ttf = get_font(ttf_bold_path, 25)
     if song_data["basic_info"]["genre"] != "宴会場":
         song_type = song_data["type"]
         type_path = maimai_MusicType / f"{song_type}.png"
-        type = Image.open(type_path)
-        type = resize_image(type, 0.7)
-        bg = paste(bg, type, (694, 852))
+        type = open_image(type_path, 0.7)
+        paste(bg, type, (694, 852))
     # version
     song_ver = song_data["basic_info"]["from"]
-    song_ver = Image.open(maimai_Version / f"{song_ver}.png")
-    song_ver = resize_image(song_ver, 0.8)
-    bg = paste(bg, song_ver, (860, 768))
+    song_ver = open_image(maimai_Version / f"{song_ver}.png", 0.8)
+    paste(bg, song_ver, (860, 768))
     drawtext = ImageDraw.Draw(bg)
 
     # 等级
-    ttf = ImageFont.truetype(ttf_black_path, size=50)
+    ttf = get_font(ttf_black_path, 50)
     song_level = song_data["level"][0].replace("?", str())
     drawtext.text((650, 1046), song_level, anchor="mm", font=ttf, fill=(131, 19, 158))
 
     # 物量
-    ttf = ImageFont.truetype(ttf_bold_path, size=40)
+    ttf = get_font(ttf_bold_path, 40)
     chart = song_data["charts"][index]
     notes_x = 310
     notes_y = 1258
-    notes = chart["notes"]
+    notes = list(chart["notes"])
     if len(notes) < 5:
         notes.insert(3, 0)
     for note in notes:
@@ -608,7 +583,7 @@ async def utage_chart_info(song_data, index=0):
     )
 
     # 谱师
-    ttf = ImageFont.truetype(ttf_regular_path, size=20)
+    ttf = get_font(ttf_regular_path, 20)
     drawtext.text(
         (730, 1545), chart["charter"], anchor="mm", font=ttf, fill=(131, 19, 158)
     )
@@ -625,17 +600,16 @@ async def utage_chart_info(song_data, index=0):
 async def utage_score_info(data, song_data):
     records = data[song_data["id"]]
     # 底图
-    bg = Image.open("./Static/Maimai/Score/background_utage.png")
+    bg = open_image("./Static/Maimai/Score/background_utage.png").copy()
 
     # 歌曲封面
-    cover = await get_jacket(int(song_data["id"]) % 10000)
-    cover = cover.resize((295, 295))
-    bg = paste(bg, cover, (204, 440))
+    cover = await get_jacket(int(song_data["id"]) % 10000, size=(295, 295))
+    paste(bg, cover, (204, 440))
     drawtext = ImageDraw.Draw(bg)
 
     # 绘制标题
     song_title = song_data["title"]
-    ttf = ImageFont.truetype(ttf_bold_path, size=40)
+    ttf = get_font(ttf_bold_path, 40)
     title_position = (545, 626)
     max_width = 565
     ellipsis = "…"
@@ -657,7 +631,7 @@ async def utage_score_info(data, song_data):
 
     # 绘制曲师
     song_artist = song_data["basic_info"]["artist"]
-    ttf = ImageFont.truetype(ttf_regular_path, size=30)
+    ttf = get_font(ttf_regular_path, 30)
     artist_position = (545, 694)
     max_width = 565
     ellipsis = "…"
@@ -678,7 +652,7 @@ async def utage_score_info(data, song_data):
         )
 
     # id
-    ttf = ImageFont.truetype(ttf_bold_path, size=25)
+    ttf = get_font(ttf_bold_path, 25)
     id_position = (239, 872)
     drawtext.text(
         id_position,
@@ -699,22 +673,19 @@ async def utage_score_info(data, song_data):
     )
     # 分类
     genre_path = "./Static/maimai/MusicType/Utage.png"
-    genre = Image.open(genre_path)
-    genre = resize_image(genre, 0.5)
-    bg = paste(bg, genre, (462, 830))
+    genre = open_image(genre_path, 0.5)
+    paste(bg, genre, (462, 830))
     # 谱面类型
-    ttf = ImageFont.truetype(ttf_bold_path, size=25)
+    ttf = get_font(ttf_bold_path, 25)
     if song_data["basic_info"]["genre"] != "宴会場":
         song_type = song_data["type"]
         type_path = maimai_MusicType / f"{song_type}.png"
-        type = Image.open(type_path)
-        type = resize_image(type, 0.7)
-        bg = paste(bg, type, (694, 852))
+        type = open_image(type_path, 0.7)
+        paste(bg, type, (694, 852))
     # version
     song_ver = song_data["basic_info"]["from"]
-    song_ver = Image.open(maimai_Version / f"{song_ver}.png")
-    song_ver = resize_image(song_ver, 0.8)
-    bg = paste(bg, song_ver, (860, 768))
+    song_ver = open_image(maimai_Version / f"{song_ver}.png", 0.8)
+    paste(bg, song_ver, (860, 768))
     drawtext = ImageDraw.Draw(bg)
 
     # 绘制成绩
@@ -734,11 +705,11 @@ async def utage_score_info(data, song_data):
     color = (131, 19, 158)
 
     # 等级
-    ttf = ImageFont.truetype(ttf_black_path, size=50)
+    ttf = get_font(ttf_black_path, 50)
     drawtext.text((level_x, level_y), level, font=ttf, fill=color, anchor="mm")
 
     if not records:
-        ttf = ImageFont.truetype(ttf_bold_path, size=20)
+        ttf = get_font(ttf_bold_path, 20)
         drawtext.text(
             (dsra_x, dsra_y),
             song_data["ds"][0],
@@ -761,7 +732,7 @@ async def utage_score_info(data, song_data):
     rate = score["rate"]
 
     # 达成率
-    ttf = ImageFont.truetype(ttf_bold_path, size=43)
+    ttf = get_font(ttf_bold_path, 43)
     drawtext.text((achieve_x, achieve_y), achieve, font=ttf, fill=color, anchor="mm")
 
     # 评价
@@ -773,28 +744,25 @@ async def utage_score_info(data, song_data):
             rate = rank
             break
     rate_path = f"./Static/Maimai/Rate/{rate}.png"
-    rate = Image.open(rate_path)
-    rate = resize_image(rate, 0.5)
-    bg = paste(bg, rate, (rate_x, rate_y))
+    rate = open_image(rate_path, 0.5)
+    paste(bg, rate, (rate_x, rate_y))
     drawtext = ImageDraw.Draw(bg)
 
     # fc & fs
     if fc:
         fc_path = maimai_Static / f"playicon_{fc}.png"
-        fc = Image.open(fc_path)
-        fc = resize_image(fc, 0.33)
-        bg = paste(bg, fc, (fc_x, fc_y))
+        fc = open_image(fc_path, 0.33)
+        paste(bg, fc, (fc_x, fc_y))
         drawtext = ImageDraw.Draw(bg)
 
     if fs:
         fs_path = maimai_Static / f"playicon_{fs}.png"
-        fs = Image.open(fs_path)
-        fs = resize_image(fs, 0.33)
-        bg = paste(bg, fs, (fs_x, fs_y))
+        fs = open_image(fs_path, 0.33)
+        paste(bg, fs, (fs_x, fs_y))
         drawtext = ImageDraw.Draw(bg)
 
     # 定数
-    ttf = ImageFont.truetype(ttf_bold_path, size=20)
+    ttf = get_font(ttf_bold_path, 20)
     drawtext.text((dsra_x, dsra_y), str(ds), font=ttf, fill=color, anchor="mm")
 
     img_byte_arr = BytesIO()
@@ -808,19 +776,18 @@ async def utage_score_info(data, song_data):
 
 async def achv_info(song_data, index):
     # 底图
-    bg = Image.open("./Static/Maimai/Achievements/background.png")
+    bg = open_image("./Static/Maimai/Achievements/background.png").copy()
 
     # 歌曲封面
-    cover = await get_jacket(int(song_data["id"]) % 10000)
-    cover = cover.resize((295, 295))
-    bg = paste(bg, cover, (204, 440))
+    cover = await get_jacket(int(song_data["id"]) % 10000, size=(295, 295))
+    paste(bg, cover, (204, 440))
     drawtext = ImageDraw.Draw(bg)
 
     # 绘制标题
     song_title = song_data["title"]
     if song_data["basic_info"]["genre"] == "宴会場" and len(song_data["charts"]) > 1:
         song_title = f"[{'左右'[index]}]{song_title}"
-    ttf = ImageFont.truetype(ttf_bold_path, size=40)
+    ttf = get_font(ttf_bold_path, 40)
     title_position = (545, 626)
     max_width = 565
     ellipsis = "…"
@@ -842,7 +809,7 @@ async def achv_info(song_data, index):
 
     # 绘制曲师
     song_artist = f"曲：{song_data['basic_info']['artist']}"
-    ttf = ImageFont.truetype(ttf2_regular_path, size=30)
+    ttf = get_font(ttf2_regular_path, 30)
     artist_position = (545, 694)
     max_width = 565
     ellipsis = "…"
@@ -863,7 +830,7 @@ async def achv_info(song_data, index):
         )
 
     # id
-    ttf = ImageFont.truetype(ttf_bold_path, size=25)
+    ttf = get_font(ttf_bold_path, 25)
     id_position = (239, 872)
     drawtext.text(
         id_position,
@@ -885,11 +852,10 @@ async def achv_info(song_data, index):
     # 分类
     if song_data["basic_info"]["genre"] == "宴会場":
         genre_path = "./Static/maimai/MusicType/Utage.png"
-        genre = Image.open(genre_path)
-        genre = resize_image(genre, 0.5)
-        bg = paste(bg, genre, (462, 830))
+        genre = open_image(genre_path, 0.5)
+        paste(bg, genre, (462, 830))
     else:
-        ttf = ImageFont.truetype(ttf2_bold_path, size=25)
+        ttf = get_font(ttf2_bold_path, 25)
         song_genre = song_data["basic_info"]["genre"]
         genre_position = (544, 872)
         drawtext.text(
@@ -900,32 +866,30 @@ async def achv_info(song_data, index):
             fill=(53, 74, 164),
         )
     # 谱面类型
-    ttf = ImageFont.truetype(ttf_bold_path, size=25)
+    ttf = get_font(ttf_bold_path, 25)
     if song_data["basic_info"]["genre"] != "宴会場":
         song_type = song_data["type"]
         type_path = maimai_MusicType / f"{song_type}.png"
-        type = Image.open(type_path)
-        type = resize_image(type, 0.7)
-        bg = paste(bg, type, (694, 852))
+        type = open_image(type_path, 0.7)
+        paste(bg, type, (694, 852))
     # version
     song_ver = song_data["basic_info"]["from"]
-    song_ver = Image.open(maimai_Version / f"{song_ver}.png")
-    song_ver = resize_image(song_ver, 0.8)
-    bg = paste(bg, song_ver, (860, 768))
+    song_ver = open_image(maimai_Version / f"{song_ver}.png", 0.8)
+    paste(bg, song_ver, (860, 768))
     drawtext = ImageDraw.Draw(bg)
 
     # 等级
     song_level = song_data["level"][index]
     if song_data["basic_info"]["genre"] == "宴会場":
-        cover = Image.open("./Static/Maimai/Achievements/Level/Utage.png")
-        bg = paste(bg, cover, (164, 952))
+        cover = open_image("./Static/Maimai/Achievements/Level/Utage.png")
+        paste(bg, cover, (164, 952))
         drawtext = ImageDraw.Draw(bg)
         level_color = (131, 19, 158)
         song_level = song_level.replace("?", str())
     else:
         level_label = ["Basic", "Advanced", "Expert", "Master", "ReMASTER"][index]
-        cover = Image.open(f"./Static/Maimai/Achievements/Level/{level_label}.png")
-        bg = paste(bg, cover, (164, 971))
+        cover = open_image(f"./Static/Maimai/Achievements/Level/{level_label}.png")
+        paste(bg, cover, (164, 971))
         drawtext = ImageDraw.Draw(bg)
         level_color = [
             (14, 117, 54),
@@ -937,17 +901,17 @@ async def achv_info(song_data, index):
         if "+" in song_level:
             song_level = song_level.replace("+", str())
             plus_path = maimai_Plus / f"{level_label}.png"
-            plus_icon = Image.open(plus_path)
-            bg = paste(bg, plus_icon, (302, 953))
+            plus_icon = open_image(plus_path)
+            paste(bg, plus_icon, (302, 953))
             drawtext = ImageDraw.Draw(bg)
-    ttf = ImageFont.truetype(ttf_black_path, size=36)
+    ttf = get_font(ttf_black_path, 36)
     drawtext.text((245, 1004), song_level, anchor="mm", font=ttf, fill=level_color)
 
     # 分数
     score_color = [(231, 144, 21), (227, 60, 117), (38, 143, 17), (130, 144, 203)]
-    ttf = ImageFont.truetype(ttf_bold_path, size=36)
+    ttf = get_font(ttf_bold_path, 36)
     chart = song_data["charts"][index]
-    notes = chart["notes"]
+    notes = list(chart["notes"])
     if len(notes) < 5:
         notes.insert(3, 0)
     type_weight = [1, 2, 3, 1, 5]
@@ -993,7 +957,7 @@ async def achv_info(song_data, index):
         score_y += 80
 
     # 物量
-    ttf = ImageFont.truetype(ttf_bold_path, size=40)
+    ttf = get_font(ttf_bold_path, 40)
     notes_x = 251
     notes_y = 1778
     for note in notes:
@@ -1010,7 +974,7 @@ async def achv_info(song_data, index):
 
     # 谱师
     song_charters = f"谱：{chart['charter']}"
-    ttf = ImageFont.truetype(ttf2_regular_path, size=30)
+    ttf = get_font(ttf2_regular_path, 30)
     artist_position = (545, 729)
     max_width = 565
     ellipsis = "…"
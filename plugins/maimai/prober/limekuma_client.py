@@ -1,18 +1,131 @@
-from typing import Optional
-
+import asyncio
+import os
+import tempfile
+from itertools import cycle
+from pathlib import Path
+from typing import AsyncIterator, Optional
+
+import aiofiles
 import grpc
+import orjson as json
 from google.protobuf import wrappers_pb2
+from nonebot import get_driver
 
 from util.config import config
+from util.resources import CACHE_ROOT
 from .proto import kumabot_pb2
 from .proto import kumabot_pb2_grpc
 
+# 连接失败等情况下由 gRPC 自动重试，流式调用只会在收到首个响应前重试
+SERVICE_CONFIG = {
+    "loadBalancingConfig": [{"round_robin": dict()}],
+    "methodConfig": [
+        {
+            "name": [{"service": "kumabot.BestsApi"}, {"service": "kumabot.ListApi"}],
+            "retryPolicy": {
+                "maxAttempts": 3,
+                "initialBackoff": "0.5s",
+                "maxBackoff": "5s",
+                "backoffMultiplier": 2,
+                "retryableStatusCodes": ["UNAVAILABLE"],
+            },
+        }
+    ],
+}
+
+CHANNEL_OPTIONS = [
+    ("grpc.keepalive_time_ms", 30000),
+    ("grpc.keepalive_timeout_ms", 10000),
+    ("grpc.keepalive_permit_without_calls", 1),
+    ("grpc.http2.max_pings_without_data", 0),
+    ("grpc.enable_retries", 1),
+    ("grpc.service_config", json.dumps(SERVICE_CONFIG).decode()),
+]
+
+
+class ChannelManager:
+    def __init__(self):
+        self.channels: dict[str, grpc.aio.Channel] = dict()
+        self.targets = None
+
+    def _get_targets(self) -> list[str]:
+        # backend.url 可以是单个地址，也可以是多个后端地址的列表
+        if isinstance(config.backend_url, str):
+            return [config.backend_url]
+        return list(config.backend_url)
+
+    def get_channel(self, target: Optional[str] = None) -> grpc.aio.Channel:
+        if target is None:
+            if self.targets is None:
+                self.targets = cycle(self._get_targets())
+            # 在多个后端之间轮询
+            target = next(self.targets)
+
+        if channel := self.channels.get(target):
+            return channel
+
+        channel = grpc.aio.insecure_channel(target, options=CHANNEL_OPTIONS)
+        self.channels[target] = channel
+        return channel
+
+    async def start(self):
+        for target in self._get_targets():
+            # 提前建立连接，不等待连接完成
+            self.get_channel(target).get_state(try_to_connect=True)
+
+    async def close(self):
+        channels = list(self.channels.values())
+        self.channels.clear()
+        await asyncio.gather(
+            *(channel.close(grace=5) for channel in channels), return_exceptions=True
+        )
+
+
+channel_manager = ChannelManager()
+
+SPOOL_PATH = CACHE_ROOT / "LimeKuma"
+
+
+async def collect_image(
+    gen: AsyncIterator[kumabot_pb2.ImageResponse], spool: bool = False
+) -> bytes | Path:
+    if not spool:
+        # 收齐所有分块后只拼接一次
+        return b"".join([response.data async for response in gen])
+
+    # 边接收边写入临时文件，发送时以 file:// URI 交给 OneBot 读取
+    os.makedirs(SPOOL_PATH, exist_ok=True)
+    fd, name = tempfile.mkstemp(suffix=".img", dir=SPOOL_PATH)
+    os.close(fd)
+    # OneBot 实现可能以其他用户运行
+    os.chmod(name, 0o644)
+    path = Path(name)
+    try:
+        async with aiofiles.open(path, "wb") as f:
+            async for response in gen:
+                await f.write(response.data)
+    except BaseException:
+        os.remove(path)
+        raise
+    return path
+
+
+driver = get_driver()
+
+
+@driver.on_startup
+async def _():
+    await channel_manager.start()
+
+
+@driver.on_shutdown
+async def _():
+    await channel_manager.close()
+
 
 class BestsApiClient:
     def __init__(self, server_address: Optional[str] = None):
-        self.server_address = (
-            config.backend_url if not server_address else server_address
-        )
+        self.server_address = server_address
         self.channel = None
         self.stub = None
 
@@ -24,12 +137,14 @@ class BestsApiClient:
         await self.close()
 
     async def connect(self):
-        self.channel = grpc.aio.insecure_channel(self.server_address)
+        # 复用常驻连接，不在每次请求时建立
+        self.channel = channel_manager.get_channel(self.server_address)
         self.stub = kumabot_pb2_grpc.BestsApiStub(self.channel)
 
     async def close(self):
-        if self.channel:
-            await self.channel.close()
+        # 连接由 channel_manager 统一关闭
+        self.channel = None
+        self.stub = None
 
     async def get_from_lxns(
         self,
@@ -51,7 +166,9 @@ class BestsApiClient:
                 wrappers_pb2.StringValue(value=personal_token)
             )
 
-        async for response in self.stub.GetFromLxns(request):
+        async for response in self.stub.GetFromLxns(
+            request, timeout=config.backend_timeout
+        ):
             yield response
 
     async def get_anime_from_lxns(
@@ -74,7 +191,9 @@ class BestsApiClient:
                 wrappers_pb2.StringValue(value=personal_token)
             )
 
-        async for response in self.stub.GetAnimeFromLxns(request):
+        async for response in self.stub.GetAnimeFromLxns(
+            request, timeout=config.backend_timeout
+        ):
             yield response
 
     async def get_from_diving_fish(
@@ -97,7 +216,9 @@ class BestsApiClient:
         if icon is not None:
             request.icon = icon
 
-        async for response in self.stub.GetFromDivingFish(request):
+        async for response in self.stub.GetFromDivingFish(
+            request, timeout=config.backend_timeout
+        ):
             yield response
 
     async def get_anime_from_diving_fish(
@@ -120,15 +241,15 @@ class BestsApiClient:
         if icon is not None:
             request.icon = icon
 
-        async for response in self.stub.GetAnimeFromDivingFish(request):
+        async for response in self.stub.GetAnimeFromDivingFish(
+            request, timeout=config.backend_timeout
+        ):
             yield response
 
 
 class ListApiClient:
     def __init__(self, server_address: Optional[str] = None):
-        self.server_address = (
-            config.backend_url if not server_address else server_address
-        )
+        self.server_address = server_address
         self.channel = None
         self.stub = None
 
@@ -140,12 +261,14 @@ class ListApiClient:
         await self.close()
 
     async def connect(self):
-        self.channel = grpc.aio.insecure_channel(self.server_address)
+        # 复用常驻连接，不在每次请求时建立
+        self.channel = channel_manager.get_channel(self.server_address)
         self.stub = kumabot_pb2_grpc.ListApiStub(self.channel)
 
     async def close(self):
-        if self.channel:
-            await self.channel.close()
+        # 连接由 channel_manager 统一关闭
+        self.channel = None
+        self.stub = None
 
     async def get_from_lxns(
         self,
@@ -162,7 +285,9 @@ class ListApiClient:
         if page is not None:
             request.page = page
 
-        async for response in self.stub.GetFromLxns(request):
+        async for response in self.stub.GetFromLxns(
+            request, timeout=config.backend_timeout
+        ):
             yield response
 
     async def get_from_diving_fish(
@@ -190,5 +315,7 @@ class ListApiClient:
         if icon is not None:
             request.icon = icon
 
-        async for response in self.stub.GetFromDivingFish(request):
+        async for response in self.stub.GetFromDivingFish(
+            request, timeout=config.backend_timeout
+        ):
             yield response
@@ -0,0 +1,25 @@
+from typing import Optional
+
+from httpx import URL
+
+from util.config import config
+from util.http_client import http_client
+
+base_url = "https://maimai.lxns.net/api/v0/"
+
+
+async def get_player_data(qq: str, personal_token: Optional[str] = None):
+    if personal_token:
+        headers = {"X-User-Token": personal_token}
+        resp = await http_client.get(
+            URL(f"{base_url}user/maimai/player"), headers=headers
+        )
+    else:
+        headers = {"Authorization": config.lx_token}
+        resp = await http_client.get(
+            URL(f"{base_url}maimai/player/qq/{qq}"), headers=headers
+        )
+    if resp.is_error:
+        return None, resp.status_code
+    obj = resp.json()
+    return obj, resp.status_code
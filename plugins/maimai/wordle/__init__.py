@@ -1,4 +1,3 @@
-import asyncio
 import math
 import re
 from io import BytesIO
@@ -8,14 +7,10 @@ import numpy as np
 import soundfile
 from nonebot import on_message, on_regex
 from nonebot.adapters.onebot.v11 import Bot, GroupMessageEvent, MessageSegment
-from rapidfuzz import fuzz, process
 
-from util.data import (
-    get_alias_list_lxns,
-    get_alias_list_xray,
-    get_alias_list_ycn,
-    get_music_data_lxns,
-)
+from util.alias import get_alias_index
+from util.data import get_music_data_lxns
+from util.exceptions import WriteBufferError
 from util.resources import get_jacket, get_music
 from util.stars import stars
 from .database import openchars
@@ -56,64 +51,14 @@ async def find_songid_by_alias(name, song_list):
     if matched_ids:
         return matched_ids
 
-    alias_map = dict()
-
-    async def process_lxns(alias_map: dict[str, list[int]]):
-        alias_list = await get_alias_list_lxns()
-        for info in alias_list["aliases"]:
-            song_id = info["song_id"]
-            for alias in info["aliases"]:
-                alias_map.setdefault(alias, list())
-                if song_id in alias_map[alias]:
-                    continue
-                alias_map[alias].append(song_id)
-
-    async def process_xray(alias_map: dict[str, list[int]]):
-        alias_list = await get_alias_list_xray()
-        for song_id, info in alias_list.items():
-            if len(song_id) == 5:
-                song_id = song_id[-4:]
-            song_id = int(song_id)
-            for alias in info:
-                alias_map.setdefault(alias, list())
-                if song_id in alias_map[alias]:
-                    continue
-                alias_map[alias].append(song_id)
-
-    async def process_ycn(alias_map: dict[str, list[int]]):
-        alias_list = await get_alias_list_ycn()
-        for info in alias_list["content"]:
-            if 10000 < info["SongID"] < 20000:
-                song_id = info["SongID"] % 10000
-            else:
-                song_id = info["SongID"]
-            for alias in info["Alias"]:
-                alias_map.setdefault(alias, list())
-                if song_id in alias_map[alias]:
-                    continue
-                alias_map[alias].append(song_id)
-
-    await asyncio.gather(
-        process_lxns(alias_map), process_xray(alias_map), process_ycn(alias_map)
-    )
-
-    results = process.extract(
-        name, alias_map.keys(), scorer=fuzz.QRatio, score_cutoff=100
-    )
-    filtered = {
-        id for ids in [alias_map[alias] for alias, _, _ in results] for id in ids
-    }
-    matched_ids = list(filtered)
-    if len(matched_ids) > 0:
-        return matched_ids
-
-    results = process.extract(
-        name, alias_map.keys(), scorer=fuzz.WRatio, score_cutoff=80
-    )
-    filtered = {
-        id for ids in [alias_map[alias] for alias, _, _ in results] for id in ids
-    }
-    matched_ids = list(filtered)
+    alias_index = await get_alias_index()
+    for song_id in alias_index.search(name):
+        song_id = int(song_id)
+        # 统一为落雪的乐曲 id
+        if 10000 < song_id < 100000:
+            song_id %= 10000
+        if song_id not in matched_ids:
+            matched_ids.append(song_id)
 
     # 芝士排序
     # sorted_matched_ids = sorted(matched_ids, key=int)
@@ -506,12 +451,12 @@ async def _(event: GroupMessageEvent):
 
 @rank.handle()
 async def _(bot: Bot, event: GroupMessageEvent):
-    scores = await ranking.avg_scores()
-    leaderboard = [
-        (qq, achi, _times)
-        for qq, achi, _times in scores
-        if await times.check_available(qq)
-    ]
+    try:
+        scores = await ranking.avg_scores()
+        available = await times.available_users([qq for qq, _, _ in scores])
+    except WriteBufferError:
+        await rank.finish("迪拉熊还没记完刚刚的成绩，过一会儿再来看排行榜吧~")
+    leaderboard = [(qq, achi, _times) for qq, achi, _times in scores if qq in available]
     leaderboard_output = list()
     current_score, current_index = 0, 0
     for i, (qq, achi, _times) in enumerate(leaderboard, start=1):
@@ -525,7 +470,7 @@ async def _(bot: Bot, event: GroupMessageEvent):
         if len(leaderboard_output) > 9:
             break
 
-    avg = np.sum(d[1] for d in scores) / len(scores) if len(scores) > 0 else 0
+    avg = sum(d[1] for d in scores) / len(scores) if len(scores) > 0 else 0
     msg = "\r\n".join(leaderboard_output)
     msg = (
         "开字母准确率排行榜前10名是——\r\n"
@@ -542,12 +487,14 @@ async def _(bot: Bot, event: GroupMessageEvent):
 @rankth.handle()
 async def _(bot: Bot, event: GroupMessageEvent):
     user_id = event.get_user_id()
-    scores = await ranking.avg_scores()
-    leaderboard = [
-        (qq, achi, _times)
-        for qq, achi, _times in scores
-        if await times.check_available(qq)
-    ]
+    try:
+        scores = await ranking.avg_scores()
+        available = await times.available_users([qq for qq, _, _ in scores])
+    except WriteBufferError:
+        await rankth.finish(
+            "迪拉熊还没记完刚刚的成绩，过一会儿再来看排行榜吧~", at_sender=True
+        )
+    leaderboard = [(qq, achi, _times) for qq, achi, _times in scores if qq in available]
     leaderboard_output = list()
     index = -1
     for i, (qq, achi, _times) in enumerate(leaderboard):
@@ -583,7 +530,12 @@ async def _(bot: Bot, event: GroupMessageEvent):
             leaderboard_output.append(rank_str)
     else:
         leaderboard_output.append("你还没有上榜mai~")
-        achi, _times = await ranking.get_score(user_id)
+        try:
+            achi, _times = await ranking.get_score(user_id)
+        except WriteBufferError:
+            await rankth.finish(
+                "迪拉熊还没记完刚刚的成绩，过一会儿再来看排行榜吧~", at_sender=True
+            )
         leaderboard_output.append(
             f"？. {math.trunc(achi * 1000000) / 1000000:.4%} × {_times}"
         )
@@ -5,6 +5,7 @@ from sqlalchemy.future import select
 from sqlalchemy.orm import Mapped, mapped_column
 
 from util.database import Base, with_transaction
+from util.write_buffer import write_buffer
 
 
 class WordleScore(Base):
@@ -45,7 +46,6 @@ class Ranking:
 
         return score
 
-    @with_transaction
     async def add_score(
         self,
         user_id: str,
@@ -54,24 +54,28 @@ class Ranking:
         pt_times: int,
         ad_times: int,
         is_guesser: bool,
-        **kwargs,
     ) -> None:
-        session: AsyncSession = kwargs["session"]
-
         score = self._compute_score(oc_times, it_times, pt_times, ad_times, is_guesser)
-        stmt = insert(WordleScore).values(
-            user_id=user_id,
-            oc_times=oc_times,
-            it_times=it_times,
-            pt_times=pt_times,
-            ad_times=ad_times,
-            is_guesser=is_guesser,
-            score=score,
+        write_buffer.put(
+            "wordle_scores",
+            {
+                "user_id": user_id,
+                "oc_times": oc_times,
+                "it_times": it_times,
+                "pt_times": pt_times,
+                "ad_times": ad_times,
+                "is_guesser": is_guesser,
+                "score": score,
+            },
         )
-        await session.execute(stmt)
 
+    @staticmethod
+    async def _write_scores(items: list[dict], session: AsyncSession) -> None:
+        await session.execute(insert(WordleScore).values(items))
+
+    # 刚写入的成绩可能尚未同步到只读副本，从主库读取
     @with_transaction
-    async def avg_scores(self, **kwargs) -> list[tuple[str, float, int]]:
+    async def _avg_scores(self, **kwargs) -> list[tuple[str, float, int]]:
         session: AsyncSession = kwargs["session"]
 
         stmt = (
@@ -94,8 +98,13 @@ class Ranking:
 
         return achis
 
+    async def avg_scores(self) -> list[tuple[str, float, int]]:
+        # 先写入缓冲中的成绩再查询
+        await write_buffer.flush("wordle_scores")
+        return await self._avg_scores()
+
     @with_transaction
-    async def get_score(self, user_id: str, **kwargs) -> tuple[float, int]:
+    async def _get_score(self, user_id: str, **kwargs) -> tuple[float, int]:
         session: AsyncSession = kwargs["session"]
 
         stmt = select(
@@ -111,5 +120,10 @@ class Ranking:
 
         return (0.0, 0)
 
+    async def get_score(self, user_id: str) -> tuple[float, int]:
+        await write_buffer.flush("wordle_scores")
+        return await self._get_score(user_id)
+
 
 ranking = Ranking()
+write_buffer.register("wordle_scores", ranking._write_scores)
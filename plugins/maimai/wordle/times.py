@@ -1,12 +1,13 @@
 from datetime import date, datetime, timedelta, timezone
 
-from sqlalchemy import DateTime, String
+from sqlalchemy import DateTime, String, func
 from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.orm import Mapped, mapped_column
 
 from util.database import Base, with_transaction
+from util.write_buffer import write_buffer
 
 
 class WordleTimes(Base):
@@ -22,31 +23,52 @@ class WordleTimes(Base):
 
 
 class Times:
-    @with_transaction
-    async def add(self, user_id: str, time: int, **kwargs) -> None:
-        session: AsyncSession = kwargs["session"]
+    async def add(self, user_id: str, time: int) -> None:
+        write_buffer.put("wordle_times", {"user_id": user_id, "time": time})
 
-        now = datetime.fromtimestamp(time, timezone(timedelta(hours=8)))
-        stmt = insert(WordleTimes).values(user_id=user_id, created_at=now)
+    @staticmethod
+    async def _write_times(items: list[dict], session: AsyncSession) -> None:
+        tz = timezone(timedelta(hours=8))
+        stmt = insert(WordleTimes).values(
+            [
+                {
+                    "user_id": item["user_id"],
+                    "created_at": datetime.fromtimestamp(item["time"], tz),
+                }
+                for item in items
+            ]
+        )
         await session.execute(stmt)
 
     @with_transaction
-    async def check_available(self, user_id: str, **kwargs) -> bool:
+    async def _available_users(self, user_ids: list[str], **kwargs) -> set[str]:
         session: AsyncSession = kwargs["session"]
 
         today = date.today()
         week_ago = today - timedelta(days=7)
 
         stmt = (
-            select(WordleTimes)
-            .where(WordleTimes.user_id == user_id, WordleTimes.created_at >= week_ago)
-            .order_by(WordleTimes.created_at.desc())
+            select(WordleTimes.user_id)
+            .where(
+                WordleTimes.user_id.in_(user_ids), WordleTimes.created_at >= week_ago
+            )
+            .group_by(WordleTimes.user_id)
+            .having(func.count(WordleTimes.id) > 9)
         )
 
         result = await session.execute(stmt)
-        records = result.scalars().all()
+        return set(result.scalars().all())
+
+    async def available_users(self, user_ids: list[str]) -> set[str]:
+        # 先写入缓冲中的记录，再用一次查询筛出近一周结算超过 9 次的用户
+        await write_buffer.flush("wordle_times")
+        if not user_ids:
+            return set()
+        return await self._available_users(user_ids)
 
-        return len(records) > 9
+    async def check_available(self, user_id: str) -> bool:
+        return user_id in await self.available_users([user_id])
 
 
 times = Times()
+write_buffer.register("wordle_times", times._write_times)
@@ -162,10 +162,12 @@ async def generate_success_state(group_id: str) -> str:
 
 def get_version_name(s: int, song_list: dict) -> str:
     versions = song_list["versions"]
-    versions.append({"version": sys.maxsize})
-    for i in range(len(versions) - 1):
-        v = versions[i]
-        if v["version"] <= s < versions[i + 1]["version"]:
+    for i, v in enumerate(versions):
+        # 乐曲数据为共享缓存，不能在原列表上追加哨兵
+        next_version = (
+            versions[i + 1]["version"] if i + 1 < len(versions) else sys.maxsize
+        )
+        if v["version"] <= s < next_version:
             return v["title"]
 
     return str(s)
@@ -0,0 +1,128 @@
+import asyncio
+import os
+from asyncio import Lock, Task
+from typing import Optional
+
+from httpx import HTTPError
+from nonebot import get_bot, get_driver, logger, on_regex
+
+from util.config import config
+from util.data import (
+    get_frame_list_lxns,
+    get_icon_list_lxns,
+    get_music_data_lxns,
+    get_plate_list_lxns,
+    music_data_lxns,
+)
+from util.permission import ADMIN
+from util.resources import CACHE_ROOT, download_asset
+
+# 每批提交的下载数，实际并发受资源下载器限制
+BATCH_SIZE = 32
+# 每下载多少个资源汇报一次进度
+REPORT_INTERVAL = 500
+
+prefetch = on_regex(r"^\s*预取资源\s*$", permission=ADMIN)
+
+prefetch_lock = Lock()
+startup_task: Optional[Task] = None
+
+driver = get_driver()
+
+
+async def report(msg: str):
+    logger.info(msg)
+    try:
+        bot = get_bot()
+    except ValueError:
+        # 启动时还没有连接上的Bot，只记录日志
+        return
+
+    await bot.send_msg(group_id=config.dev_group, message=msg)
+
+
+async def collect_missing(songs: dict) -> list[tuple[str, str, int]]:
+    icons, plates, frames = await asyncio.gather(
+        get_icon_list_lxns(), get_plate_list_lxns(), get_frame_list_lxns()
+    )
+
+    assets = [
+        ("Jacket", "jacket", song_id)
+        for song_id in sorted({song["id"] % 10000 for song in songs["songs"]})
+    ]
+    assets.extend(("Icon", "icon", icon["id"]) for icon in icons["icons"])
+    assets.extend(("Plate", "plate", plate["id"]) for plate in plates["plates"])
+    assets.extend(("Frame", "frame", frame["id"]) for frame in frames["frames"])
+
+    # 已存在的文件均为完整写入，直接跳过即可断点续传
+    return [
+        (key, kind, res_id)
+        for key, kind, res_id in assets
+        if not os.path.exists(CACHE_ROOT / key / f"{res_id}.png")
+    ]
+
+
+async def run_prefetch(songs: Optional[dict] = None) -> Optional[tuple[int, int]]:
+    # 返回成功数与失败数，未能执行时返回 None
+    if prefetch_lock.locked():
+        return None
+
+    async with prefetch_lock:
+        try:
+            if songs is None:
+                songs = await get_music_data_lxns()
+            missing = await collect_missing(songs)
+        except HTTPError as e:
+            await report(f"资源预取失败：无法获取资源列表（{e}）")
+            return None
+
+        if not missing:
+            return 0, 0
+
+        await report(f"开始预取资源，共{len(missing)}个")
+        done = 0
+        failed = 0
+        for i in range(0, len(missing), BATCH_SIZE):
+            batch = missing[i : i + BATCH_SIZE]
+            results = await asyncio.gather(
+                *(download_asset(*asset) for asset in batch), return_exceptions=True
+            )
+            failed += sum(isinstance(result, Exception) for result in results)
+            last_done, done = done, done + len(batch)
+            if done < len(missing) and (
+                done // REPORT_INTERVAL > last_done // REPORT_INTERVAL
+            ):
+                await report(f"资源预取进度：{done}/{len(missing)}")
+
+        await report(f"资源预取完成，成功{done - failed}个，失败{failed}个")
+        return done - failed, failed
+
+
+@driver.on_startup
+async def _():
+    global startup_task
+
+    # 不阻塞启动流程
+    startup_task = asyncio.create_task(run_prefetch())
+
+
+@music_data_lxns.on_refresh
+async def _(songs: dict):
+    await run_prefetch(songs)
+
+
+@prefetch.handle()
+async def _():
+    if prefetch_lock.locked():
+        await prefetch.finish("迪拉熊正在预取资源哦~请稍等mai~")
+
+    await prefetch.send("迪拉熊开始预取资源啦~")
+    result = await run_prefetch()
+    if result is None:
+        await prefetch.finish("迪拉熊没能拿到资源列表mai~（详情见日志）")
+
+    succeeded, failed = result
+    if not succeeded and not failed:
+        await prefetch.finish("资源都已经是最新的啦~")
+
+    await prefetch.send(f"迪拉熊预取完资源啦~成功{succeeded}个，失败{failed}个")
@@ -3,12 +3,13 @@ import re
 from pathlib import Path
 
 import aiofiles
-from httpx import AsyncClient, URL
+from httpx import URL
 from nonebot import on_regex
 from nonebot.adapters.onebot.v11 import Bot, GroupMessageEvent, MessageEvent
 from xxhash import xxh32_hexdigest
 
 from util.config import config
+from util.http_client import http_client
 from util.permission import ADMIN
 
 tts_dev = on_regex(
@@ -69,13 +70,12 @@ async def text_to_speech(text: str) -> tuple[bytes, str]:
         "language_boost": "auto",
     }
 
-    async with AsyncClient(http2=True, follow_redirects=True) as session:
-        resp = await session.post(
-            URL("https://api.minimaxi.com/v1/t2a_v2"), json=payload, headers=headers
-        )
-        if resp.is_error:
-            resp.raise_for_status()
-        audio_info = resp.json()
+    resp = await http_client.post(
+        URL("https://api.minimaxi.com/v1/t2a_v2"), json=payload, headers=headers
+    )
+    if resp.is_error:
+        resp.raise_for_status()
+    audio_info = resp.json()
 
     data = audio_info.get("data", dict())
     if not (audio := data.get("audio")):
@@ -1,4 +1,6 @@
+import time
 from datetime import timedelta, timezone
+from typing import Optional
 
 from nonebot import on_regex
 from nonebot.adapters.onebot.v11 import GroupMessageEvent
@@ -8,6 +10,17 @@ from util.stars import stars
 
 query = on_regex(r"^查星星$")
 query_detail = on_regex(r"^查?星星明细$")
+query_detail_more = on_regex(r"^查?更早的?星星明细$")
+query_summary = on_regex(r"^查?星星统计$")
+
+# 每页明细条数
+DETAIL_PAGE_SIZE = 10
+
+# 翻页游标的有效期（秒）
+DETAIL_CURSOR_TTL = 600
+
+# qq -> (写入时间, 上一页最后一条明细的 id)，按写入时间先后排列
+detail_cursors: dict[str, tuple[float, int]] = dict()
 
 replies_posi: list = [
     lambda _: "可以给迪拉熊吃几颗吗mai？（可怜）",
@@ -48,11 +61,28 @@ async def _(event: GroupMessageEvent):
     )
 
 
-@query_detail.handle()
-async def _(event: GroupMessageEvent):
-    qq = event.get_user_id()
-    details = await stars.list_actions(qq, 10)
-    details_text = "\r\n".join(
+def set_cursor(qq: str, action_id: int):
+    now = time.monotonic()
+    # 重新插入到末尾，保持按写入时间排列
+    detail_cursors.pop(qq, None)
+    detail_cursors[qq] = (now, action_id)
+    # 从最早写入的游标开始清理过期的
+    while detail_cursors:
+        oldest = next(iter(detail_cursors))
+        if now - detail_cursors[oldest][0] < DETAIL_CURSOR_TTL:
+            break
+        del detail_cursors[oldest]
+
+
+def get_cursor(qq: str) -> Optional[int]:
+    cursor = detail_cursors.get(qq)
+    if cursor is None or time.monotonic() - cursor[0] >= DETAIL_CURSOR_TTL:
+        return None
+    return cursor[1]
+
+
+def format_details(details: list[dict]) -> str:
+    return "\r\n".join(
         f"{
             detail['created_at']
             .astimezone(timezone(timedelta(hours=8)))
@@ -60,6 +90,61 @@ async def _(event: GroupMessageEvent):
         } {detail['change']}★ {detail['cause']}"
         for detail in details
     )
-    await query.send(
-        f"你最近{len(details)}次的明细是——\r\n{details_text}", at_sender=True
+
+
+@query_detail.handle()
+async def _(event: GroupMessageEvent):
+    qq = event.get_user_id()
+    details = await stars.list_actions(qq, DETAIL_PAGE_SIZE)
+    details_text = format_details(details)
+    msg = f"你最近{len(details)}次的明细是——\r\n{details_text}"
+    if len(details) >= DETAIL_PAGE_SIZE:
+        set_cursor(qq, details[-1]["id"])
+        msg += "\r\n发送“更早的星星明细”可以继续往前看哦~"
+    await query.send(msg, at_sender=True)
+
+
+@query_detail_more.handle()
+async def _(event: GroupMessageEvent):
+    qq = event.get_user_id()
+    before_id = get_cursor(qq)
+    if before_id is None:
+        await query_detail_more.finish(
+            "先发送“星星明细”看看最近的明细吧~", at_sender=True
+        )
+
+    details = await stars.list_actions(qq, DETAIL_PAGE_SIZE, before_id)
+    if not details:
+        detail_cursors.pop(qq, None)
+        await query_detail_more.finish("已经没有更早的明细了mai~", at_sender=True)
+
+    details_text = format_details(details)
+    msg = f"再往前{len(details)}次的明细是——\r\n{details_text}"
+    if len(details) >= DETAIL_PAGE_SIZE:
+        set_cursor(qq, details[-1]["id"])
+        msg += "\r\n发送“更早的星星明细”可以继续往前看哦~"
+    else:
+        detail_cursors.pop(qq, None)
+    await query_detail_more.send(msg, at_sender=True)
+
+
+@query_summary.handle()
+async def _(event: GroupMessageEvent):
+    qq = event.get_user_id()
+    daily = await stars.daily_changes(qq, 7, event.time)
+    causes = await stars.cause_totals(qq, 5)
+    if not causes:
+        await query_summary.finish("你还没有★的明细mai~", at_sender=True)
+
+    daily_text = (
+        "\r\n".join(f"{day:%-m/%-d} {change:+}★" for day, change in daily)
+        if daily
+        else "没有变动"
+    )
+    causes_text = "\r\n".join(
+        f"{cause} {count}次 共{total:+}★" for cause, total, count in causes
+    )
+    await query_summary.send(
+        f"你最近7天的★变动是——\r\n{daily_text}\r\n最常见的★来源是——\r\n{causes_text}",
+        at_sender=True,
     )
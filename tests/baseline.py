@@ -0,0 +1,372 @@
+import math
+from typing import Optional
+
+import numpy as np
+
+from plugins.maimai.prober.GLOBAL_CONSTANT import exclude_list, versions_map
+from plugins.maimai.prober.bests_gen import ratings
+
+# 改写前逐条处理成绩的实现，用作新实现的对照
+# 乐曲列表与谱面统计改为参数传入，其余逻辑保持原样
+
+
+def find_song_by_id(song_id, songList):
+    for song in songList:
+        if song_id == song["id"]:
+            return song
+
+    return
+
+
+def get_fit_diff(song_id: str, level_index: int, ds: float, charts) -> float:
+    if song_id not in charts["charts"]:
+        return ds
+    level_data = charts["charts"][song_id][level_index]
+    if "fit_diff" not in level_data:
+        return ds
+    fit_diff = level_data["fit_diff"]
+    return fit_diff
+
+
+def dxscore_proc(dxscore, sum_dxscore):
+    percentage = (dxscore / sum_dxscore) * 100
+
+    if percentage < 85.0:
+        return 0, 0
+    if percentage < 90.0:
+        return 1, 1
+    if percentage < 93.0:
+        return 1, 2
+    if percentage < 95.0:
+        return 2, 3
+    if percentage < 97.0:
+        return 2, 4
+    return 3, 5
+
+
+def get_ra_in(rate: str) -> float:
+    return ratings[rate][1]
+
+
+def get_ra_in_old(rate: str) -> float:
+    return ratings[rate][2]
+
+
+def records_to_bests(
+    records: Optional[list],
+    songList,
+    charts,
+    fc_rules: Optional[list] = None,
+    rate_rules: Optional[list] = None,
+    is_fit: bool = False,
+    is_sd: bool = False,
+    is_dxs: bool = False,
+    is_all: bool = False,
+    is_old: bool = False,
+    dx_star_count: Optional[str] = None,
+    rating: int = 0,
+):
+    sd = list()
+    dx = list()
+    mask_enabled = False
+
+    def default_k(x):
+        return (x["ra"], x["ds"], x["achievements"])
+
+    if not records:
+        for song in songList:
+            if len(song["id"]) > 5:
+                continue
+            for i, j in enumerate(song["ds"]):
+                record = {
+                    "achievements": 101,
+                    "ds": j,
+                    "dxScore": np.sum(song["charts"][i]["notes"]) * 3,
+                    "fc": "fsdp",
+                    "fs": "app",
+                    "level": str(),
+                    "level_index": i,
+                    "level_label": [
+                        "Basic",
+                        "Advanced",
+                        "Expert",
+                        "Master",
+                        "ReMASTER",
+                    ][i],
+                    "ra": math.trunc(j * 22.512),
+                    "rate": "sssp",
+                    "song_id": int(song["id"]),
+                    "title": song["title"],
+                    "type": song["type"],
+                }
+                if song["basic_info"]["is_new"]:
+                    dx.append(record)
+                else:
+                    sd.append(record)
+        sd.sort(key=default_k, reverse=True)
+        dx.sort(key=default_k, reverse=True)
+        if rating:
+            while (
+                sum(d["ra"] for d in sd[:35]) + sum(d["ra"] for d in dx[:15]) > rating
+            ):
+                if (dx and sd and dx[0]["ra"] > sd[0]["ra"]) or (dx and not sd):
+                    b = dx
+                elif sd:
+                    b = sd
+                else:
+                    continue
+                b.pop(0)
+        return sd[:35], dx[:15], False
+    for record in records:
+        if record["level_label"] == "Utage":
+            continue
+        if fc_rules and record["fc"] not in fc_rules:
+            continue
+        if rate_rules and record["rate"] not in rate_rules:
+            continue
+        song_id = str(record["song_id"])
+        song_data = [d for d in songList if d["id"] == song_id][0]
+        is_new = song_data["basic_info"]["is_new"]
+        fit_diff = get_fit_diff(song_id, record["level_index"], record["ds"], charts)
+        if is_fit:
+            if record["achievements"] > 0 and record["dxScore"] == 0:
+                mask_enabled = True
+                continue
+            record["s_ra"] = record["ds"]
+            record["ds"] = math.trunc(fit_diff * 100) / 100
+            record["ra"] = math.trunc(
+                fit_diff
+                * (record["achievements"] if record["achievements"] < 100.5 else 100.5)
+                * get_ra_in(record["rate"])
+                / 100
+            )
+        if is_sd:
+            record["diff"] = (
+                charts["charts"][song_id][record["level_index"]]["std_dev"]
+                if song_id in charts["charts"]
+                else 0.0
+            )
+        if is_dxs:
+            if record["achievements"] > 0 and record["dxScore"] == 0:
+                mask_enabled = True
+                continue
+            if not dx_star_count:
+                song_data = find_song_by_id(song_id, songList)
+                if not song_data:
+                    continue
+                record["achievements"] = (
+                    record["dxScore"]
+                    / (np.sum(song_data["charts"][record["level_index"]]["notes"]) * 3)
+                    * 101
+                )
+                record["ra"] = math.trunc(
+                    record["ds"]
+                    * record["achievements"]
+                    * get_ra_in(record["rate"])
+                    / 100
+                )
+            else:
+                sum_dxscore = (
+                    np.sum(song_data["charts"][record["level_index"]]["notes"]) * 3
+                )
+                _, stars = dxscore_proc(record["dxScore"], sum_dxscore)
+                if str(stars) not in dx_star_count:
+                    continue
+        if is_old:
+            if record["achievements"] > 0 and record["dxScore"] == 0:
+                mask_enabled = True
+                continue
+            record["ra"] = math.trunc(
+                record["ds"]
+                * (record["achievements"] if record["achievements"] < 100.5 else 100.5)
+                * get_ra_in_old(record["rate"])
+                / 100
+            )
+        if record["ra"] == 0 or record["achievements"] > 101:
+            continue
+        if is_new or is_all:
+            b = dx
+        else:
+            b = sd
+        b.append(record)
+    if is_all:
+        all_records = sorted(dx, key=default_k, reverse=True)
+        dx = list()
+        for record in [
+            i
+            for i in all_records
+            if i["ra"]
+            >= all_records[49 if len(all_records) > 50 else len(all_records) - 1]["ra"]
+        ]:
+            song_id = str(record["song_id"])
+            song_data = [d for d in songList if d["id"] == song_id][0]
+            is_new = song_data["basic_info"]["is_new"]
+            if is_new:
+                if len(dx) < 15:
+                    dx.append(record)
+                    all_records.remove(record)
+            elif len(sd) < 35:
+                sd.append(record)
+                all_records.remove(record)
+            if len(dx) >= 15 and len(sd) >= 35:
+                break
+        else:
+            for i in all_records:
+                if len(sd) < 35:
+                    b = sd
+                elif len(dx) < 15:
+                    b = dx
+                else:
+                    break
+                b.append(i)
+        return sd, dx, mask_enabled
+    if is_sd:
+
+        def k(x):
+            return (x["ra"] * (1 + x["diff"] / 10), x["ds"], x["achievements"])
+    else:
+        k = default_k
+    b35 = sorted(sd, key=k, reverse=True)[: 25 if is_old else 35]
+    b15 = sorted(dx, key=k, reverse=True)[:15]
+    return b35, b15, mask_enabled
+
+
+def compare_bests(sender_records, target_records, songList, charts):
+    handle_type = len(sender_records) > len(target_records)
+    sd = list()
+    dx = list()
+    mask_enabled = False
+    b35, b15, mask_enabled = records_to_bests(sender_records, songList, charts)
+    if not b35 and not b15:
+        return sd, dx, mask_enabled
+    sd_min = b35[-1]["ra"] if b35 else -1
+    dx_min = b15[-1]["ra"] if b15 else -1
+    for record in target_records if handle_type else sender_records:
+        if record["level_label"] == "Utage":
+            continue
+        if record["ra"] == 0 or record["achievements"] > 101:
+            continue
+        if record["achievements"] > 0 and record["dxScore"] == 0:
+            mask_enabled = True
+            continue
+        other_record = [
+            d
+            for d in (sender_records if handle_type else target_records)
+            if d["song_id"] == record["song_id"]
+            and d["level_index"] == record["level_index"]
+        ]
+        if not other_record:
+            continue
+        other_record = other_record[0]
+        if other_record["ra"] == 0 or other_record["achievements"] > 101:
+            continue
+        if other_record["achievements"] > 0 and other_record["dxScore"] == 0:
+            mask_enabled = True
+            continue
+        song_id = str(record["song_id"])
+        song_data = [d for d in songList if d["id"] == song_id][0]
+        is_new = song_data["basic_info"]["is_new"]
+        if handle_type:
+            record["preferred"] = record["ra"] >= (dx_min if is_new else sd_min)
+            record["s_ra"] = other_record["ra"]
+            if is_new:
+                dx.append(record)
+            else:
+                sd.append(record)
+        else:
+            other_record["preferred"] = other_record["ra"] >= (
+                dx_min if is_new else sd_min
+            )
+            other_record["s_ra"] = record["ra"]
+            if is_new:
+                dx.append(other_record)
+            else:
+                sd.append(other_record)
+
+    def k(x):
+        return (x["preferred"], x["ra"] - x["s_ra"], x["ds"], x["achievements"])
+
+    b35 = sorted(sd, key=k, reverse=True)[:35]
+    b15 = sorted(dx, key=k, reverse=True)[:15]
+    return b35, b15, mask_enabled
+
+
+def get_min_score(notes: list[int]):
+    weight = [1, 2, 3, 1, 5]
+    base_score = 5
+    sum_score = 0
+    for i in range(0, 5):
+        if i == 3 and len(notes) < 5:
+            sum_score += notes[i] * weight[4] * base_score
+            break
+        sum_score += notes[i] * weight[i] * base_score
+    return (1 - ((sum_score - 1) / sum_score)) * 100
+
+
+def records_filter(
+    records: list,
+    level: Optional[str] = None,
+    ds: Optional[float] = None,
+    gen: Optional[str] = None,
+    is_sun: bool = False,
+    is_lock: bool = False,
+    songList=None,
+):
+    filted_records = list()
+    mask_enabled = False
+    for record in records:
+        if record["level_label"] == "Utage":
+            continue
+        if level and record["level"] != level:
+            continue
+        if ds and record["ds"] != ds:
+            continue
+        song_data = find_song_by_id(str(record["song_id"]), songList)
+        if not song_data:
+            continue
+        if (
+            gen
+            and gen in versions_map
+            and (
+                (song_data["basic_info"]["from"] not in versions_map[gen])
+                or (gen != "舞" and record["level_index"] == 4)
+            )
+            or (gen in exclude_list and record["song_id"] in exclude_list[gen])
+        ):
+            continue
+        min_score_1 = get_min_score(song_data["charts"][record["level_index"]]["notes"])
+        min_score_2 = song_data["charts"][record["level_index"]]["notes"][-1]
+        min_score_2 = 1 / min_score_2 / 2 if min_score_2 > 0 else 0
+        min_score = min(min_score_1, min_score_2)
+        if is_sun:
+            if record["dxScore"] == 0:
+                mask_enabled = True
+                continue
+            passed = False
+            ra_kv = list(ratings.items())
+            ra_k = list(ratings.keys())
+            max_acc = ra_kv[ra_k.index(record["rate"]) - 1][1][0] * 100
+            min_acc = max_acc - min_score
+            if min_acc <= record["achievements"] < max_acc:
+                passed = True
+            if not passed:
+                continue
+        if is_lock:
+            if record["dxScore"] == 0:
+                mask_enabled = True
+                continue
+            ra_in = ratings[record["rate"]][0]
+            min_acc = ra_in * 100
+            max_acc = min_acc + min_score
+            if max_acc < record["achievements"] or record["achievements"] < min_acc:
+                continue
+        filted_records.append(record)
+    filted_records.sort(
+        key=lambda x: (
+            0 if level or ds else float(x["level"].replace("+", ".1")),
+            x["achievements"],
+            x["ra"],
+        ),
+        reverse=True,
+    )
+    return filted_records, mask_enabled
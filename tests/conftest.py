@@ -0,0 +1,38 @@
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+import nonebot
+import pytest
+
+ROOT_PATH = Path(__file__).resolve().parent.parent
+# 写入数据库的测试需要 PostgreSQL，未设置时跳过
+DATABASE_URL = os.environ.get("KUMA_TEST_DATABASE_URL")
+
+# 在临时目录中运行，缓存与数据文件不会写入仓库
+WORK_PATH = Path(tempfile.mkdtemp(prefix="kumabot-tests-"))
+conf = (ROOT_PATH / "example.conf").read_text(encoding="utf-8")
+# 未设置时仍需要能解析的地址，不会实际连接
+url = DATABASE_URL or "postgresql+psycopg://localhost/kumabot_test"
+conf += f"""
+database.url = "{url}"
+llm.vision {{ model = "", prompt = "" }}
+"""
+(WORK_PATH / "kuma.conf").write_text(conf, encoding="utf-8")
+os.chdir(WORK_PATH)
+sys.path.insert(0, str(ROOT_PATH))
+
+nonebot.init()
+
+
+def pytest_unconfigure(config):
+    shutil.rmtree(WORK_PATH, ignore_errors=True)
+
+
+@pytest.fixture
+def database_url():
+    if not DATABASE_URL:
+        pytest.skip("未设置 KUMA_TEST_DATABASE_URL")
+    return DATABASE_URL
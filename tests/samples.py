@@ -0,0 +1,145 @@
+import math
+import random
+
+from plugins.maimai.prober.GLOBAL_CONSTANT import versions_map
+from plugins.maimai.prober.bests_gen import ratings
+
+LEVEL_LABELS = ["Basic", "Advanced", "Expert", "Master", "ReMASTER"]
+# 取值较少的定数与达成率，让分数、定数与达成率大量并列
+DS_CHOICES = [7.0, 10.5, 12.0, 12.6, 12.7, 13.0, 13.4, 13.7, 14.0, 14.6, 15.0]
+ACHIEVEMENT_CHOICES = [
+    0.0,
+    79.9,
+    94.5,
+    97.0,
+    98.0,
+    99.0,
+    99.5,
+    100.0,
+    100.2,
+    100.5,
+    100.8,
+    101.0,
+    101.5,
+]
+FC_CHOICES = ["", "fc", "fcp", "ap", "app"]
+FS_CHOICES = ["", "fs", "fsp", "fsd", "fsdp"]
+VERSIONS = [version for versions in versions_map.values() for version in versions]
+
+
+def level_of(ds: float) -> str:
+    return f"{int(ds)}+" if ds - int(ds) >= 0.6 else str(int(ds))
+
+
+def rate_of(achievements: float) -> str:
+    for rate, (min_acc, _, _) in ratings.items():
+        if achievements >= min_acc * 100:
+            return rate
+    return "d"
+
+
+def make_songs(rng: random.Random, count: int = 80) -> list[dict]:
+    songs = list()
+    for i in range(1, count + 1):
+        # 一部分乐曲同时有 SD 与 DX 谱面，DX 谱面的 id 加 10000
+        for song_id, song_type in ((i, "SD"), (i + 10000, "DX")):
+            if song_type == "DX" and rng.random() < 0.5:
+                continue
+            chart_count = rng.choice([4, 5])
+            ds = sorted(rng.choice(DS_CHOICES) for _ in range(chart_count))
+            note_count = 4 if song_type == "SD" else 5
+            songs.append(
+                {
+                    "id": str(song_id),
+                    "title": f"Song {song_id}",
+                    "type": song_type,
+                    "ds": ds,
+                    "level": [level_of(d) for d in ds],
+                    "charts": [
+                        {"notes": [rng.randint(1, 400) for _ in range(note_count)]}
+                        for _ in ds
+                    ],
+                    "basic_info": {
+                        "title": f"Song {song_id}",
+                        "genre": "maimai",
+                        "from": rng.choice(VERSIONS),
+                        "is_new": song_type == "DX" and rng.random() < 0.6,
+                    },
+                }
+            )
+    # 宴谱的 id 超过五位
+    songs.append(
+        {
+            "id": "100001",
+            "title": "[宴]Song",
+            "type": "DX",
+            "ds": [13.0],
+            "level": ["13?"],
+            "charts": [{"notes": [100, 10, 10, 10, 10]}],
+            "basic_info": {
+                "title": "[宴]Song",
+                "genre": "宴会場",
+                "from": VERSIONS[-1],
+                "is_new": True,
+            },
+        }
+    )
+    return songs
+
+
+def make_stats(rng: random.Random, songs: list[dict]) -> dict:
+    charts = dict()
+    for song in songs:
+        # 部分乐曲没有统计数据，部分谱面没有拟合定数
+        if rng.random() < 0.2:
+            continue
+        levels = list()
+        for ds in song["ds"]:
+            level_data = {"std_dev": round(rng.uniform(0, 1), 4)}
+            if rng.random() < 0.8:
+                level_data["fit_diff"] = round(ds + rng.uniform(-0.5, 0.5), 4)
+            levels.append(level_data)
+        charts[song["id"]] = levels
+    return {"charts": charts}
+
+
+def make_record(rng: random.Random, song: dict, level_index: int) -> dict:
+    ds = song["ds"][level_index]
+    achievements = rng.choice(ACHIEVEMENT_CHOICES)
+    rate = rate_of(achievements)
+    note_total = sum(song["charts"][level_index]["notes"]) * 3
+    # 部分成绩没有 DX 分数，无法得知真实达成率
+    dx_score = 0 if rng.random() < 0.1 else rng.randint(note_total * 4 // 5, note_total)
+    return {
+        "achievements": achievements,
+        "ds": ds,
+        "dxScore": dx_score,
+        "fc": rng.choice(FC_CHOICES),
+        "fs": rng.choice(FS_CHOICES),
+        "level": song["level"][level_index],
+        "level_index": level_index,
+        "level_label": LEVEL_LABELS[level_index],
+        "ra": math.trunc(ds * min(achievements, 100.5) * ratings[rate][1] / 100),
+        "rate": rate,
+        "song_id": int(song["id"]),
+        "title": song["title"],
+        "type": song["type"],
+    }
+
+
+def make_records(
+    rng: random.Random, songs: list[dict], share: float = 0.6
+) -> list[dict]:
+    records = list()
+    for song in songs:
+        if len(song["id"]) > 5:
+            if rng.random() < share:
+                record = make_record(rng, song, 0)
+                record["level_label"] = "Utage"
+                records.append(record)
+            continue
+        for level_index in range(len(song["ds"])):
+            if rng.random() < share:
+                records.append(make_record(rng, song, level_index))
+    rng.shuffle(records)
+    return records
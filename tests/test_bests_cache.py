@@ -0,0 +1,122 @@
+import asyncio
+import os
+import time
+
+import pytest
+
+from plugins.maimai.prober import bests_cache
+from plugins.maimai.prober.bests_cache import BestsCache, get_bests_image
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(bests_cache, "BESTS_CACHE_PATH", tmp_path / "Bests")
+    monkeypatch.setattr(bests_cache, "SPOOL_PATH", tmp_path / "LimeKuma")
+    return BestsCache()
+
+
+def key(qq: str, fingerprint: str = "f") -> tuple:
+    return (qq, "b50", "diving-fish", "200502", "101", "1", fingerprint)
+
+
+def test_memory_hit_and_expiry(cache):
+    async def main():
+        assert await cache.get(key("1")) is None
+        assert await cache.put(key("1"), b"image") == b"image"
+        assert await cache.get(key("1")) == b"image"
+
+        # 过期的图片不再返回
+        cache.images[key("1")] = (time.time() - bests_cache.BESTS_CACHE_TTL, b"image")
+        assert await cache.get(key("1")) is None
+        assert cache.size == 0
+        assert (cache.hits, cache.misses) == (1, 2)
+
+    asyncio.run(main())
+
+
+def test_spilled_image_sent_from_own_link(cache, monkeypatch):
+    monkeypatch.setattr(bests_cache, "BESTS_CACHE_MAX_BYTES", 10)
+
+    async def main():
+        await cache.put(key("1"), b"12345678")
+        await cache.put(key("2"), b"abcdefgh")
+        # 超出内存上限时，最早的图片写入磁盘
+        assert key("1") not in cache.images
+        assert cache.size == 8
+
+        img = await cache.get(key("1"))
+        assert img.parent == bests_cache.SPOOL_PATH
+        # 发送前缓存文件被清除，硬链接的文件仍然完整
+        cache.invalidate("1")
+        assert img.read_bytes() == b"12345678"
+        assert await cache.get(key("1")) is None
+        assert await cache.get(key("2")) == b"abcdefgh"
+
+    asyncio.run(main())
+
+
+def test_put_file_keeps_original(cache, tmp_path):
+    original = tmp_path / "ani50.img"
+    original.write_bytes(b"gif")
+
+    async def main():
+        assert await cache.put(key("1"), original) == original
+
+        # 调用方发送后删除原文件，缓存中的图片不受影响
+        os.remove(original)
+        img = await cache.get(key("1"))
+        assert img != original
+        assert img.read_bytes() == b"gif"
+
+    asyncio.run(main())
+
+
+def test_disk_trimmed_to_size(cache, tmp_path, monkeypatch):
+    monkeypatch.setattr(bests_cache, "BESTS_CACHE_MAX_DISK_BYTES", 10)
+
+    async def main():
+        for i in range(3):
+            path = tmp_path / f"{i}.img"
+            path.write_bytes(b"123456")
+            # 硬链接与原文件共用修改时间
+            modified_at = time.time() - 10 + i
+            os.utime(path, (modified_at, modified_at))
+            await cache.put(key(str(i)), path)
+
+        # 超出磁盘上限时删除最早的文件
+        assert await cache.get(key("0")) is None
+        assert await cache.get(key("1")) is None
+        assert (await cache.get(key("2"))).read_bytes() == b"123456"
+
+    asyncio.run(main())
+
+
+def test_get_bests_image_checks_cache_before_rendering(cache, monkeypatch):
+    fingerprints = {"1": "a", "2": None}
+    renders = list()
+
+    async def get_records_fingerprint(qq, source, personal_token=None):
+        return fingerprints[qq]
+
+    async def render_bests(anime, qq, *args):
+        renders.append(qq)
+        return f"image {qq} {len(renders)}".encode()
+
+    monkeypatch.setattr(bests_cache, "bests_cache", cache)
+    monkeypatch.setattr(bests_cache, "get_records_fingerprint", get_records_fingerprint)
+    monkeypatch.setattr(bests_cache, "_render_bests", render_bests)
+
+    async def main():
+        args = ("diving-fish", None, "200502", "101", "1")
+        assert await get_bests_image(False, "1", *args) == b"image 1 1"
+        assert await get_bests_image(False, "1", *args) == b"image 1 1"
+        assert renders == ["1"]
+
+        # 成绩有变化或是动图时重新渲染，无法获取指纹时不使用缓存
+        fingerprints["1"] = "b"
+        assert await get_bests_image(False, "1", *args) == b"image 1 2"
+        assert await get_bests_image(True, "1", *args) == b"image 1 3"
+        assert await get_bests_image(False, "2", *args) == b"image 2 4"
+        assert await get_bests_image(False, "2", *args) == b"image 2 5"
+
+    asyncio.run(main())
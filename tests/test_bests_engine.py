@@ -0,0 +1,151 @@
+import copy
+import random
+
+import numpy as np
+import pytest
+
+from plugins.maimai.prober.bests_engine import (
+    BestsComparer,
+    RatingSolver,
+    RecordTable,
+    select_bests,
+    top_n,
+)
+from plugins.maimai.prober.catalog import SongCatalog
+from plugins.maimai.prober.chart_stats import ChartStatsIndex
+
+import baseline
+from samples import make_records, make_songs, make_stats
+
+SEEDS = range(6)
+OPTIONS = [
+    dict(),
+    dict(fc_rules=["ap", "app"]),
+    dict(rate_rules=["sss", "sssp", "app"]),
+    dict(is_fit=True),
+    dict(is_sd=True),
+    dict(is_dxs=True),
+    dict(is_dxs=True, dx_star_count="45"),
+    dict(is_old=True),
+    dict(is_all=True),
+    dict(is_fit=True, is_all=True),
+    dict(is_old=True, is_sd=True),
+]
+
+
+def sample(seed: int, share: float = 0.6):
+    rng = random.Random(seed)
+    songs = make_songs(rng)
+    stats = make_stats(rng, songs)
+    records = make_records(rng, songs, share)
+    return songs, stats, records
+
+
+def select(songs, stats, records, **options):
+    table = RecordTable(
+        records,
+        SongCatalog(songs),
+        ChartStatsIndex(stats),
+        with_notes=options.get("is_dxs", False),
+    )
+    return select_bests(table, **options)
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+@pytest.mark.parametrize("options", OPTIONS, ids=str)
+def test_select_bests_matches_baseline(seed, options):
+    songs, stats, records = sample(seed)
+    expected = baseline.records_to_bests(
+        copy.deepcopy(records), songs, stats, **options
+    )
+
+    assert select(songs, stats, records, **options) == expected
+
+
+@pytest.mark.parametrize("share", [0.02, 0.1])
+@pytest.mark.parametrize("options", [dict(), dict(is_all=True)], ids=str)
+def test_select_bests_with_few_records(share, options):
+    # 成绩不足 b35 与 b15 的数量时，以及 all 模式下不足 50 条时
+    songs, stats, records = sample(7, share)
+    expected = baseline.records_to_bests(
+        copy.deepcopy(records), songs, stats, **options
+    )
+
+    assert select(songs, stats, records, **options) == expected
+
+
+def test_select_bests_keeps_records_unchanged():
+    songs, stats, records = sample(8)
+    original = copy.deepcopy(records)
+
+    select(songs, stats, records, is_fit=True, is_sd=True)
+
+    assert records == original
+
+
+@pytest.mark.parametrize("n", [0, 1, 5, 35, 200])
+def test_top_n_matches_sorted(n):
+    rng = np.random.default_rng(n)
+    # 大量并列的分数，并列时应保持原顺序
+    primary = rng.integers(200, 205, 100).astype(np.float64)
+    ds = rng.choice([13.0, 13.5], 100)
+    achievements = rng.choice([100.0, 100.5], 100)
+    expected = sorted(
+        range(100),
+        key=lambda i: (primary[i], ds[i], achievements[i]),
+        reverse=True,
+    )[:n]
+
+    assert top_n(primary, ds, achievements, n).tolist() == expected
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_rating_solver_matches_baseline(seed):
+    rng = random.Random(seed)
+    songs = make_songs(rng)
+    solver = RatingSolver(SongCatalog(songs))
+    full = solver.totals[0]
+    # 包括不限制、超过理论值、恰好等于某一步总分与低于所有组合的目标
+    for rating in [0, 1, 100, int(full) + 1, int(full), int(solver.totals[7])] + [
+        rng.randint(1, int(full)) for _ in range(20)
+    ]:
+        sd, dx, _ = baseline.records_to_bests(None, songs, None, rating=rating)
+
+        assert solver.solve(rating) == (sd, dx), rating
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+@pytest.mark.parametrize("target_share", [0.3, 0.6, 0.9])
+def test_bests_comparer_matches_baseline(seed, target_share):
+    songs, stats, sender_records = sample(seed)
+    rng = random.Random(seed + 100)
+    target_records = make_records(rng, songs, target_share)
+    # 同一谱面重复出现的成绩
+    target_records += copy.deepcopy(target_records[:5])
+    expected = baseline.compare_bests(
+        copy.deepcopy(sender_records), copy.deepcopy(target_records), songs, stats
+    )
+
+    b35, b15, _ = select(songs, stats, sender_records)
+    comparer = BestsComparer(sender_records, SongCatalog(songs), b35, b15)
+
+    assert comparer.compare(target_records) == expected
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_bests_comparer_with_same_record_count(seed):
+    # 数量相同时遍历发起者一方，被比较者的重复成绩只取第一条
+    songs, stats, sender_records = sample(seed)
+    rng = random.Random(seed + 200)
+    target_records = make_records(rng, songs, 1)
+    rng.shuffle(target_records)
+    target_records = target_records[: len(sender_records) - 5]
+    target_records += copy.deepcopy(target_records[:5])
+    expected = baseline.compare_bests(
+        copy.deepcopy(sender_records), copy.deepcopy(target_records), songs, stats
+    )
+
+    b35, b15, _ = select(songs, stats, sender_records)
+    comparer = BestsComparer(sender_records, SongCatalog(songs), b35, b15)
+
+    assert comparer.compare(target_records) == expected
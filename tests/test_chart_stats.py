@@ -0,0 +1,63 @@
+import asyncio
+import random
+
+import numpy as np
+
+from plugins.maimai.prober import chart_stats
+from plugins.maimai.prober.chart_stats import ChartStatsIndex, get_chart_stats_index
+
+import baseline
+from samples import make_songs, make_stats
+
+
+def test_lookups_match_baseline():
+    rng = random.Random(0)
+    songs = make_songs(rng)
+    stats = make_stats(rng, songs)
+    index = ChartStatsIndex(stats)
+
+    for song in songs:
+        song_id = song["id"]
+        for level_index, ds in enumerate(song["ds"]):
+            assert index.fit_diff(song_id, level_index, ds) == baseline.get_fit_diff(
+                song_id, level_index, ds, stats
+            )
+            levels = stats["charts"].get(song_id)
+            expected = levels[level_index]["std_dev"] if levels else 0.0
+            assert index.std_dev(int(song_id), level_index) == expected
+
+
+def test_missing_charts():
+    index = ChartStatsIndex({"charts": {"8": [{"fit_diff": 12.3}, {}]}})
+
+    # 没有数据的难度、超出范围的难度与不存在的乐曲
+    assert index.fit_diff(8, 1, 12.0) == 12.0
+    assert index.fit_diff(8, 2, 13.0) == 13.0
+    assert index.fit_diff(8, -1, 13.0) == 13.0
+    assert index.fit_diff(9, 0, 14.0) == 14.0
+    assert index.std_dev(8, 0) == 0.0
+    assert index.chart_id(9, 0) == index.missing
+    assert np.isnan(index.fit_diffs[index.missing])
+
+
+def test_index_rebuilt_when_stats_change(monkeypatch):
+    current = {"charts": {"8": [{"fit_diff": 12.3, "std_dev": 0.5}]}}
+
+    async def get_chart_stats():
+        return current
+
+    monkeypatch.setattr(chart_stats, "get_chart_stats", get_chart_stats)
+    monkeypatch.setattr(chart_stats, "_index", None)
+
+    async def main():
+        nonlocal current
+
+        first = await get_chart_stats_index()
+        assert await get_chart_stats_index() is first
+
+        current = {"charts": {"8": [{"fit_diff": 12.6, "std_dev": 0.5}]}}
+        second = await get_chart_stats_index()
+        assert second is not first
+        assert second.fit_diff(8, 0, 12.0) == 12.6
+
+    asyncio.run(main())
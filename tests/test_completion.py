@@ -0,0 +1,80 @@
+import asyncio
+import copy
+import random
+
+import pytest
+
+from plugins.maimai.prober import completion
+from plugins.maimai.prober.bests_gen import ratings
+from plugins.maimai.prober.catalog import SongCatalog
+from plugins.maimai.prober.completion import ChartIndex, get_completion_table
+
+import baseline
+from samples import make_records, make_songs, rate_of
+
+QUERIES = [
+    dict(),
+    dict(level="13+"),
+    dict(ds=13.7),
+    dict(gen="真"),
+    dict(gen="舞"),
+    dict(gen="桃"),
+    dict(is_sun=True),
+    dict(is_lock=True),
+    dict(level="14", is_sun=True),
+    dict(gen="超", is_lock=True),
+]
+
+
+def sample(seed: int):
+    rng = random.Random(seed)
+    songs = make_songs(rng)
+    records = make_records(rng, songs)
+    thresholds = [value[0] * 100 for value in ratings.values()]
+    for record in records:
+        # 一部分成绩落在评级边界附近，覆盖寸止与锁血的判断
+        if rng.random() < 0.5:
+            offset = rng.choice([-0.01, -0.001, -0.0001, 0, 0.0001, 0.001, 0.01])
+            record["achievements"] = max(rng.choice(thresholds) + offset, 0)
+            record["rate"] = rate_of(record["achievements"])
+    return songs, records
+
+
+@pytest.mark.parametrize("seed", range(4))
+@pytest.mark.parametrize("query", QUERIES, ids=str)
+def test_filter_matches_baseline(seed, query):
+    songs, records = sample(seed)
+    expected = baseline.records_filter(copy.deepcopy(records), songList=songs, **query)
+
+    assert ChartIndex(SongCatalog(songs)).filter(records, **query) == expected
+
+
+def test_completion_table_reuses_filtered_records(monkeypatch):
+    songs, records = sample(0)
+    catalog = SongCatalog(songs)
+    calls = list()
+
+    async def get_player_records(qq):
+        calls.append(qq)
+        return {"nickname": "kuma", "rating": 0, "records": records}, 200
+
+    monkeypatch.setattr(completion, "get_player_records", get_player_records)
+    monkeypatch.setattr(completion, "_tables", dict())
+
+    async def main():
+        table, status = await get_completion_table("1", catalog, level="13+")
+        assert status == 200
+        assert table.player == {"nickname": "kuma", "rating": 0}
+        assert table.record_count == len(records)
+        assert table.page(1) == table.records[: completion.ITEMS_PER_PAGE]
+
+        # 翻页时不再重新获取与筛选，条件或曲库不同时重新筛选
+        assert (await get_completion_table("1", catalog, level="13+"))[0] is table
+        assert len(calls) == 1
+        assert (await get_completion_table("1", catalog, level="14"))[0] is not table
+        assert (await get_completion_table("1", SongCatalog(songs), level="13+"))[
+            0
+        ] is not table
+        assert len(calls) == 3
+
+    asyncio.run(main())
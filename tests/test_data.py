@@ -0,0 +1,142 @@
+import asyncio
+from datetime import date, datetime, timedelta
+
+import orjson as json
+import pytest
+from httpx import ConnectError, Request, Response
+
+from util import data
+from util.data import DataFeed
+
+URL = "https://example.com/music_data"
+
+
+class FakeClient:
+    def __init__(self):
+        self.responses = list()
+        self.requests = list()
+
+    async def get(self, url, params=None, headers=None):
+        self.requests.append(headers)
+        # 让出控制权，模拟网络请求期间其他请求读取数据
+        await asyncio.sleep(0)
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        response.request = Request("GET", url)
+        return response
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    client = FakeClient()
+    monkeypatch.setattr(data, "http_client", client)
+    monkeypatch.setattr(data, "CACHE_ROOT_PATH", tmp_path)
+    return client
+
+
+def write_cache(feed: DataFeed, day: date, content):
+    feed.cache_dir.mkdir(parents=True, exist_ok=True)
+    (feed.cache_dir / f"{day.isoformat()}.json").write_bytes(json.dumps(content))
+
+
+def test_cold_start_fetches_and_notifies(client):
+    feed = DataFeed("Music", URL)
+    refreshed = list()
+
+    @feed.on_refresh
+    async def _(content):
+        refreshed.append(content)
+
+    client.responses.append(Response(200, content=b"[1]", headers={"ETag": "a"}))
+
+    async def main():
+        assert await feed.get() == [1]
+        await asyncio.sleep(0)
+
+    asyncio.run(main())
+    assert refreshed == [[1]]
+    assert feed.etag == "a"
+    assert feed.expires_at > datetime.now()
+    assert (feed.cache_dir / f"{date.today().isoformat()}.json").exists()
+
+
+def test_todays_cache_used_without_request(client):
+    feed = DataFeed("Music", URL)
+    write_cache(feed, date.today(), [1])
+
+    async def main():
+        assert await feed.get() == [1]
+        assert await feed.get() == [1]
+
+    asyncio.run(main())
+    assert client.requests == list()
+    assert feed.refresh_task is None
+
+
+def test_stale_cache_served_while_refreshing(client):
+    feed = DataFeed("Music", URL)
+    yesterday = date.today() - timedelta(days=1)
+    write_cache(feed, yesterday, [1])
+    client.responses.append(Response(200, content=b"[2]"))
+
+    async def main():
+        # 过期时先返回旧数据，多个请求只触发一次后台刷新
+        results = await asyncio.gather(*(feed.get() for _ in range(5)))
+        assert results == [[1]] * 5
+        await feed.refresh_task
+        assert await feed.get() == [2]
+
+    asyncio.run(main())
+    assert len(client.requests) == 1
+    assert feed.cache_dir.joinpath(f"{date.today().isoformat()}.json").exists()
+    assert not feed.cache_dir.joinpath(f"{yesterday.isoformat()}.json").exists()
+
+
+def test_not_modified_keeps_data(client):
+    feed = DataFeed("Music", URL)
+    client.responses.append(Response(200, content=b"[1]", headers={"ETag": "a"}))
+    client.responses.append(Response(304))
+
+    async def main():
+        old = await feed.get()
+        feed.expires_at = datetime.now()
+        await feed.get()
+        await feed.refresh_task
+        assert await feed.get() is old
+
+    asyncio.run(main())
+    assert client.requests[1] == {"If-None-Match": "a"}
+    assert feed.expires_at > datetime.now()
+
+
+def test_failed_refresh_retries_later(client):
+    feed = DataFeed("Music", URL)
+    write_cache(feed, date.today() - timedelta(days=1), [1])
+    client.responses.append(ConnectError("offline"))
+
+    async def main():
+        assert await feed.get() == [1]
+        await feed.refresh_task
+        assert await feed.get() == [1]
+
+    asyncio.run(main())
+    # 失败后按重试间隔再次刷新，而不是每次请求都刷新
+    assert len(client.requests) == 1
+    assert feed.expires_at <= datetime.now() + data.RETRY_INTERVAL
+
+
+def test_corrupt_cache_discarded(client):
+    feed = DataFeed("Music", URL)
+    write_cache(feed, date.today() - timedelta(days=1), [1])
+    (feed.cache_dir / f"{date.today().isoformat()}.json").write_bytes(b"[1")
+    client.responses.append(Response(200, content=b"[2]"))
+
+    async def main():
+        # 损坏的缓存文件被删除，改用更早的缓存
+        assert await feed.get() == [1]
+        await feed.refresh_task
+
+    asyncio.run(main())
+    today_file = feed.cache_dir / f"{date.today().isoformat()}.json"
+    assert today_file.read_bytes() == b"[2]"
@@ -0,0 +1,63 @@
+import asyncio
+import os
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from util.config import config
+from util.render import RenderExecutor
+
+# 运行时只在启动时 fork，测试中此前的用例可能已经启动了线程
+pytestmark = pytest.mark.filterwarnings(
+    "ignore:This process .* is multi-threaded:DeprecationWarning"
+)
+
+
+def get_pid(value: int) -> tuple[int, int]:
+    return os.getpid(), value * 2
+
+
+def crash():
+    os._exit(1)
+
+
+@pytest.fixture
+def executor(monkeypatch):
+    monkeypatch.setattr(config, "render_workers", 2)
+    executor = RenderExecutor()
+    yield executor
+    executor.close()
+
+
+def test_runs_in_worker_process(executor):
+    async def main():
+        pid, value = await executor.run(get_pid, value=21)
+        assert pid != os.getpid()
+        assert value == 42
+
+    asyncio.run(main())
+
+
+def test_runs_in_thread_without_workers(executor, monkeypatch):
+    monkeypatch.setattr(config, "render_workers", 0)
+
+    async def main():
+        assert await executor.run(get_pid, 21) == (os.getpid(), 42)
+        assert executor.executor is None
+
+    asyncio.run(main())
+
+
+def test_broken_pool_falls_back_to_thread(executor):
+    async def main():
+        # 工作进程异常退出时本次渲染失败，不在主进程中重试
+        with pytest.raises(BrokenProcessPool):
+            await executor.run(crash)
+        assert executor.disabled
+        assert executor.executor is None
+
+        # 此后不再创建进程池，改为在线程中渲染
+        assert await executor.run(get_pid, 21) == (os.getpid(), 42)
+        assert executor.executor is None
+
+    asyncio.run(main())
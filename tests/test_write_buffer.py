@@ -0,0 +1,200 @@
+import asyncio
+import os
+
+import orjson
+import pytest
+from sqlalchemy import delete, text
+from sqlalchemy.exc import DataError, OperationalError
+
+from util.exceptions import WriteBufferError
+from util.write_buffer import WriteBuffer, WriteBufferBatch
+
+
+class Database:
+    # 代替数据库写入，按批次记录写入的数据
+    def __init__(self, buffer: WriteBuffer):
+        self.buffer = buffer
+        self.batches: dict[str, list] = dict()
+        self.errors: list[Exception] = list()
+
+    async def write(self, batch_id: str, items: list, **kwargs):
+        if self.errors:
+            raise self.errors.pop(0)
+        self.batches[batch_id] = items
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    buffer = WriteBuffer(tmp_path)
+    buffer.register("a", None)
+    buffer._replay()
+    database = Database(buffer)
+    monkeypatch.setattr(buffer, "_write", database.write)
+    # 失败后立即重试
+    monkeypatch.setattr(WriteBuffer, "_retry_at", staticmethod(lambda attempts: 0))
+    return database
+
+
+def restart(database: Database, *names: str) -> Database:
+    buffer = WriteBuffer(database.buffer.journal_path.parent)
+    for name in names:
+        buffer.register(name, None)
+    buffer._replay()
+    new_database = Database(buffer)
+    buffer._write = new_database.write
+    return new_database
+
+
+def write_lines(path, items: list):
+    path.write_bytes(b"".join(orjson.dumps(item) + b"\n" for item in items))
+
+
+def test_put_journals_then_flush_writes(database):
+    buffer = database.buffer
+
+    async def main():
+        for i in range(3):
+            buffer.put("a", {"i": i})
+        await buffer.journal_task
+        # 写入前已追加到 journal
+        assert len(buffer.journal_path.read_bytes().splitlines()) == 3
+
+        await buffer.flush("a")
+
+    asyncio.run(main())
+    assert list(database.batches.values()) == [[("a", {"i": i}) for i in range(3)]]
+    assert not buffer.journal_path.exists()
+    assert list(buffer.batch_path.iterdir()) == list()
+
+
+def test_replay_recovers_journal_and_batches(database):
+    buffer = database.buffer
+    write_lines(buffer.batch_path / "sealed.jsonl", [["a", {"i": 0}]])
+    os.utime(buffer.batch_path / "sealed.jsonl", (0, 0))
+    write_lines(buffer.journal_path, [["a", {"i": 1}], ["a", {"i": 2}]])
+    # 崩溃时写了一半的行
+    with open(buffer.journal_path, "ab") as f:
+        f.write(b'["a", {"i"')
+
+    database = restart(database, "a")
+    asyncio.run(database.buffer.flush())
+
+    # 按封存顺序写入，上次未封存的日志作为最后一个批次
+    assert database.batches.pop("sealed") == [("a", {"i": 0})]
+    assert list(database.batches.values()) == [[("a", {"i": 1}), ("a", {"i": 2})]]
+    assert list(buffer.batch_path.iterdir()) == list()
+
+
+def test_unknown_names_kept_for_later(database):
+    buffer = database.buffer
+    write_lines(buffer.batch_path / "old.jsonl", [["a", {"i": 0}], ["b", {"i": 1}]])
+
+    # 没有写入函数的数据不随批次写入，移入死信文件
+    database = restart(database, "a")
+    asyncio.run(database.buffer.flush())
+    assert database.batches == {"old": [("a", {"i": 0})]}
+    assert (buffer.dead_letter_path / "old.jsonl").exists()
+
+    # 重新注册后再次启动时补写
+    database = restart(database, "a", "b")
+    asyncio.run(database.buffer.flush())
+    assert list(database.batches.values()) == [[("b", {"i": 1})]]
+    assert list(buffer.dead_letter_path.iterdir()) == list()
+
+
+def test_bad_batch_dead_lettered(database):
+    buffer = database.buffer
+    database.errors = [DataError("INSERT", dict(), Exception("bad"))] * 3
+
+    async def main():
+        buffer.put("a", {"i": 0})
+        for _ in range(2):
+            with pytest.raises(WriteBufferError):
+                await buffer.flush("a")
+        # 多次失败后移入死信文件，不再阻塞读取
+        await buffer.flush("a")
+
+    asyncio.run(main())
+    assert database.batches == dict()
+    assert buffer.batches == dict()
+    assert len(list(buffer.dead_letter_path.iterdir())) == 1
+
+
+def test_connection_error_keeps_batches(database):
+    buffer = database.buffer
+    database.errors = [OperationalError("INSERT", dict(), Exception("down"))] * 3
+
+    async def main():
+        buffer.put("a", {"i": 0})
+        await buffer.flush()
+        buffer.put("a", {"i": 1})
+        # 未写入的数据不能当作已经写入，其他名称的读取不受影响
+        with pytest.raises(WriteBufferError):
+            await buffer.flush("a")
+        await buffer.flush("b")
+
+    asyncio.run(main())
+    assert len(list(buffer.batch_path.iterdir())) == 2
+    asyncio.run(buffer.flush("a"))
+    assert len(database.batches) == 2
+    assert list(buffer.batch_path.iterdir()) == list()
+
+
+def test_batches_written_exactly_once(database_url, tmp_path):
+    from util.database import close_database, engine
+
+    async def main():
+        async with engine.begin() as conn:
+            await conn.run_sync(WriteBufferBatch.__table__.create, checkfirst=True)
+            await conn.execute(text("CREATE TABLE write_buffer_test (i integer)"))
+
+        failures = [ValueError("handler failed")]
+        batch_id = None
+
+        async def handler(items, session):
+            await session.execute(
+                text("INSERT INTO write_buffer_test (i) VALUES (:i)"), items
+            )
+            # 写入函数在插入后失败时，整个批次连同批次记录一起回滚
+            if failures:
+                raise failures.pop()
+
+        try:
+            buffer = WriteBuffer(tmp_path)
+            buffer.register("test", handler)
+            buffer._replay()
+            for i in range(3):
+                buffer.put("test", {"i": i})
+            await buffer._seal_pending()
+            (batch_id,) = buffer.batches
+            batch_file = buffer.batch_path / f"{batch_id}.jsonl"
+            content = batch_file.read_bytes()
+
+            await buffer.flush()
+            assert buffer.batches[batch_id][1] == 1
+            buffer.batches[batch_id] = (buffer.batches[batch_id][0], 1, 0)
+            await buffer.flush("test")
+            assert not batch_file.exists()
+
+            # 提交后、删除批次文件前崩溃，重启时同一批次不会再次写入
+            batch_file.write_bytes(content)
+            buffer = WriteBuffer(tmp_path)
+            buffer.register("test", handler)
+            buffer._replay()
+            await buffer.flush("test")
+            assert not batch_file.exists()
+
+            async with engine.connect() as conn:
+                result = await conn.execute(
+                    text("SELECT count(*) FROM write_buffer_test")
+                )
+                assert result.scalar_one() == 3
+        finally:
+            async with engine.begin() as conn:
+                await conn.execute(text("DROP TABLE IF EXISTS write_buffer_test"))
+                await conn.execute(
+                    delete(WriteBufferBatch).where(WriteBufferBatch.id == batch_id)
+                )
+            await close_database()
+
+    asyncio.run(main())
@@ -0,0 +1,104 @@
+import asyncio
+import unicodedata
+from asyncio import Lock
+from typing import Optional
+
+from rapidfuzz import fuzz, process
+
+from .data import get_alias_list_lxns, get_alias_list_xray, get_alias_list_ycn
+
+
+def normalize_alias(alias: str) -> str:
+    # 全角半角统一后再忽略大小写
+    return unicodedata.normalize("NFKC", alias).casefold().strip()
+
+
+class AliasIndex:
+    def __init__(self, alias_map: dict[str, list[str]], sources: tuple):
+        self.sources = sources
+        self.alias_map = alias_map
+        self.choices = list(alias_map.keys())
+
+    def __len__(self) -> int:
+        return len(self.choices)
+
+    def search(self, name: str) -> list[str]:
+        key = normalize_alias(name)
+        if not key:
+            return list()
+
+        # 精确匹配
+        if key in self.alias_map:
+            return list(self.alias_map[key])
+
+        # 模糊匹配
+        results = process.extract(
+            key,
+            self.choices,
+            scorer=fuzz.WRatio,
+            processor=None,
+            score_cutoff=80,
+        )
+        matched_ids = dict()
+        for alias, _, _ in results:
+            for song_id in self.alias_map[alias]:
+                matched_ids[song_id] = None
+
+        return list(matched_ids)
+
+
+def _add_alias(alias_map: dict[str, list[str]], alias: str, song_id: str):
+    key = normalize_alias(alias)
+    if not key:
+        return
+    alias_map.setdefault(key, list())
+    if song_id in alias_map[key]:
+        return
+    alias_map[key].append(song_id)
+
+
+def build_alias_map(lxns: dict, xray: dict, ycn: dict) -> dict[str, list[str]]:
+    alias_map = dict()
+
+    for info in lxns["aliases"]:
+        song_id = str(info["song_id"])
+        for alias in info["aliases"]:
+            _add_alias(alias_map, alias, song_id)
+
+    for song_id, info in xray.items():
+        for alias in info:
+            _add_alias(alias_map, alias, str(song_id))
+
+    for info in ycn["content"]:
+        song_id = str(info["SongID"])
+        for alias in info["Alias"]:
+            _add_alias(alias_map, alias, song_id)
+
+    return alias_map
+
+
+_index: Optional[AliasIndex] = None
+_index_lock = Lock()
+
+
+def _is_current(index: Optional[AliasIndex], sources: tuple) -> bool:
+    return index is not None and all(a is b for a, b in zip(index.sources, sources))
+
+
+async def get_alias_index() -> AliasIndex:
+    global _index
+
+    sources = await asyncio.gather(
+        get_alias_list_lxns(), get_alias_list_xray(), get_alias_list_ycn()
+    )
+    if _is_current(_index, sources):
+        return _index
+
+    async with _index_lock:
+        if _is_current(_index, sources):
+            return _index
+
+        # 任一别名源刷新后重建，先完整构建再替换，正在查询的请求不受影响
+        _index = AliasIndex(build_alias_map(*sources), tuple(sources))
+
+    return _index
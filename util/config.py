@@ -22,6 +22,11 @@ class Config:
         self.token: Optional[str] = None
         # database
         self.database_url: Optional[str] = None
+        self.database_read_url: Optional[str] = None
+        self.database_pool_size: Optional[int] = None
+        self.database_max_overflow: Optional[int] = None
+        self.database_pre_ping: Optional[bool] = None
+        self.database_prepared_statements: Optional[bool] = None
         # group
         self.dev_group: Optional[int] = None
         self.special_group: Optional[int] = None
@@ -35,7 +40,11 @@ class Config:
         # admin
         self.admin_accounts: Optional[list[int]] = None
         # backend
-        self.backend_url: Optional[str] = None
+        self.backend_url: Optional[str | list[str]] = None
+        self.backend_timeout: Optional[float] = None
+        # render
+        self.render_workers: Optional[int] = None
+        self.render_timeout: Optional[float] = None
         # llm
         self.llm_api_key: Optional[str] = None
         self.llm_model: Optional[str] = None
@@ -57,6 +66,14 @@ class Config:
         self.listen_port = data["nonebot"]["listen_port"]
         self.token = data["nonebot"]["token"]
         self.database_url = data["database"]["url"]
+        # 旧配置文件中可能没有以下配置项，缺失时使用默认值
+        self.database_read_url = data.get("database.read_url", "")
+        self.database_pool_size = data.get("database.pool_size", 5)
+        self.database_max_overflow = data.get("database.max_overflow", 10)
+        self.database_pre_ping = data.get("database.pre_ping", True)
+        self.database_prepared_statements = data.get(
+            "database.prepared_statements", True
+        )
         self.dev_group = data["group"]["dev"]
         self.special_group = data["group"]["special"]
         self.nsfw_allowed = data["bots"]["nsfw_allowed"]
@@ -65,6 +82,9 @@ class Config:
         self.lx_token = data["prober"]["lxns_token"]
         self.admin_accounts = data["admin"]["accounts"]
         self.backend_url = data["backend"]["url"]
+        self.backend_timeout = data.get("backend.timeout", 60)
+        self.render_workers = data.get("render.workers", 4)
+        self.render_timeout = data.get("render.timeout", 30)
         self.llm_api_key = data["llm"]["api_key"]
         self.llm_model = data["llm"]["model"]
         self.vision_llm_model = data["llm"]["vision"]["model"]
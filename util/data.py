@@ -1,106 +1,209 @@
+import asyncio
 import os
-from asyncio import Lock
-from datetime import date
+from asyncio import Lock, Task
+from datetime import date, datetime, timedelta
 from pathlib import Path
-from typing import Optional
+from typing import Any, Awaitable, Callable, Optional
 
 import aiofiles
 import orjson as json
-from httpx import AsyncClient, HTTPError, URL
-
-music_data_lock = Lock()
-music_data_lxns_lock = Lock()
-chart_stats_lock = Lock()
-alias_list_lxns_lock = Lock()
-alias_list_ycn_lock = Lock()
-alias_list_xray_lock = Lock()
+from httpx import HTTPError, URL
+from nonebot import logger
 
+from .http_client import http_client
 
 CACHE_ROOT_PATH = Path("Cache") / "Data"
 
-
-async def _get_data(
-    key: str | os.PathLike[str] | Path, url: str | URL, params: Optional[dict] = None
-):
-    cache_dir = CACHE_ROOT_PATH / key
-    cache_path = cache_dir / f"{date.today().isoformat()}.json"
-    if os.path.exists(cache_path):
-        async with aiofiles.open(cache_path) as fd:
+# 数据过期后的重新验证间隔
+DATA_TTL = timedelta(hours=6)
+# 刷新失败后的重试间隔
+RETRY_INTERVAL = timedelta(minutes=5)
+
+
+class DataFeed:
+    def __init__(
+        self,
+        key: str | os.PathLike[str] | Path,
+        url: str | URL,
+        params: Optional[dict] = None,
+        ttl: timedelta = DATA_TTL,
+    ):
+        self.cache_dir = CACHE_ROOT_PATH / key
+        self.url = url
+        self.params = params
+        self.ttl = ttl
+        self.lock = Lock()
+        self.data: Any = None
+        self.expires_at: Optional[datetime] = None
+        self.etag: Optional[str] = None
+        self.last_modified: Optional[str] = None
+        self.refresh_task: Optional[Task] = None
+        self.listeners: list[Callable[[Any], Awaitable[None]]] = list()
+        self.listener_tasks: set[Task] = set()
+
+    def on_refresh(self, func: Callable[[Any], Awaitable[None]]):
+        self.listeners.append(func)
+        return func
+
+    async def get(self):
+        if self.data is None:
+            async with self.lock:
+                if self.data is None:
+                    await self._load()
+
+        if datetime.now() >= self.expires_at and (
+            not self.refresh_task or self.refresh_task.done()
+        ):
+            # 先返回旧数据，由单个后台任务负责刷新
+            self.refresh_task = asyncio.create_task(self._refresh())
+
+        return self.data
+
+    def _cache_files(self) -> list[str]:
+        os.makedirs(self.cache_dir, exist_ok=True)
+        return sorted(f for f in os.listdir(self.cache_dir) if f.endswith(".json"))
+
+    def _next_expiry(self, ttl: timedelta) -> datetime:
+        now = datetime.now()
+        tomorrow = datetime.combine(
+            date.today() + timedelta(days=1), datetime.min.time()
+        )
+        return min(now + ttl, tomorrow)
+
+    async def _read_file(self, file: str):
+        async with aiofiles.open(self.cache_dir / file, "rb") as fd:
+            return json.loads(await fd.read())
+
+    async def _write_file(self, content: bytes):
+        cache_path = self.cache_dir / f"{date.today().isoformat()}.json"
+        tmp_path = cache_path.with_suffix(".tmp")
+        async with aiofiles.open(tmp_path, "wb") as fd:
+            await fd.write(content)
+        os.replace(tmp_path, cache_path)
+        for file in self._cache_files():
+            if file != cache_path.name:
+                os.remove(self.cache_dir / file)
+
+    async def _load(self):
+        # 优先使用本地缓存，避免冷启动时阻塞在网络请求上
+        for file in reversed(self._cache_files()):
             try:
-                return json.loads(await fd.read())
+                self.data = await self._read_file(file)
             except json.JSONDecodeError:
-                pass
-        os.remove(cache_path)
-        return await _get_data(key, url, params)
-
-    files = os.listdir(cache_dir)
-    async with AsyncClient(http2=True, follow_redirects=True) as session:
+                os.remove(self.cache_dir / file)
+                continue
+
+            if file == f"{date.today().isoformat()}.json":
+                self.expires_at = self._next_expiry(self.ttl)
+            else:
+                self.expires_at = datetime.now()
+            return
+
+        await self._fetch()
+
+    async def _fetch(self):
+        headers = dict()
+        if self.data is not None:
+            if self.etag:
+                headers["If-None-Match"] = self.etag
+            if self.last_modified:
+                headers["If-Modified-Since"] = self.last_modified
+
+        resp = await http_client.get(self.url, params=self.params, headers=headers)
+
+        if resp.status_code == 304:
+            files = self._cache_files()
+            today_file = f"{date.today().isoformat()}.json"
+            if files and files[-1] != today_file:
+                os.replace(self.cache_dir / files[-1], self.cache_dir / today_file)
+            self.expires_at = self._next_expiry(self.ttl)
+            return
+
+        resp.raise_for_status()
+        data = json.loads(resp.content)
+        await self._write_file(resp.content)
+        self.etag = resp.headers.get("ETag")
+        self.last_modified = resp.headers.get("Last-Modified")
+        self.expires_at = self._next_expiry(self.ttl)
+        # 整体替换引用，持有旧数据的调用方不受影响
+        self.data = data
+
+        for listener in self.listeners:
+            task = asyncio.create_task(listener(data))
+            self.listener_tasks.add(task)
+            task.add_done_callback(self.listener_tasks.discard)
+
+    async def _refresh(self):
         try:
-            resp = await session.get(url)
-        except HTTPError:
-            if not files:
-                raise
+            await self._fetch()
+        except (HTTPError, json.JSONDecodeError, OSError) as e:
+            # 写缓存失败同样稍后重试，避免后台刷新就此停止
+            logger.warning(f"刷新 {self.url} 失败：{e!r}")
+            self.expires_at = self._next_expiry(RETRY_INTERVAL)
+
+
+music_data = DataFeed(
+    "MusicData", URL("https://www.diving-fish.com/api/maimaidxprober/music_data")
+)
+music_data_lxns = DataFeed(
+    "MusicDataLxns",
+    URL("https://maimai.lxns.net/api/v0/maimai/song/list"),
+    {"notes": "true"},
+)
+chart_stats = DataFeed(
+    "ChartStats", URL("https://www.diving-fish.com/api/maimaidxprober/chart_stats")
+)
+icon_list_lxns = DataFeed(
+    "Collection/Icon", URL("https://maimai.lxns.net/api/v0/maimai/icon/list")
+)
+plate_list_lxns = DataFeed(
+    "Collection/Plate", URL("https://maimai.lxns.net/api/v0/maimai/plate/list")
+)
+frame_list_lxns = DataFeed(
+    "Collection/Frame", URL("https://maimai.lxns.net/api/v0/maimai/frame/list")
+)
+alias_list_lxns = DataFeed(
+    "Alias/Lxns", URL("https://maimai.lxns.net/api/v0/maimai/alias/list")
+)
+alias_list_ycn = DataFeed(
+    "Alias/YuzuChaN", URL("https://www.yuzuchan.moe/api/maimaidx/maimaidxalias")
+)
+alias_list_xray = DataFeed(
+    "Alias/Xray", URL("https://download.xraybot.site/maimai/alias.json")
+)
 
-            async with aiofiles.open(cache_dir / files[-1]) as fd:
-                return json.loads(await fd.read())
 
-        if resp.is_error:
-            if not files:
-                return await _get_data(key, url, params)
+async def get_music_data_df():
+    return await music_data.get()
 
-            async with aiofiles.open(cache_dir / files[-1]) as fd:
-                return json.loads(await fd.read())
 
-        result = resp.json()
-        async with aiofiles.open(cache_path, "wb") as fd:
-            await fd.write(json.dumps(result))
-        for file in files:
-            os.remove(cache_dir / file)
+async def get_music_data_lxns():
+    return await music_data_lxns.get()
 
-        return result
 
+async def get_chart_stats():
+    return await chart_stats.get()
 
-async def get_music_data_df():
-    async with music_data_lock:
-        return await _get_data(
-            "MusicData",
-            URL("https://www.diving-fish.com/api/maimaidxprober/music_data"),
-        )
 
+async def get_icon_list_lxns():
+    return await icon_list_lxns.get()
 
-async def get_music_data_lxns():
-    async with music_data_lxns_lock:
-        return await _get_data(
-            "MusicDataLxns",
-            URL("https://maimai.lxns.net/api/v0/maimai/song/list"),
-            {"notes": "true"},
-        )
 
+async def get_plate_list_lxns():
+    return await plate_list_lxns.get()
 
-async def get_chart_stats():
-    async with chart_stats_lock:
-        return await _get_data(
-            "ChartStats",
-            URL("https://www.diving-fish.com/api/maimaidxprober/chart_stats"),
-        )
+
+async def get_frame_list_lxns():
+    return await frame_list_lxns.get()
 
 
 async def get_alias_list_lxns():
-    async with alias_list_lxns_lock:
-        return await _get_data(
-            "Alias/Lxns", URL("https://maimai.lxns.net/api/v0/maimai/alias/list")
-        )
+    return await alias_list_lxns.get()
 
 
 async def get_alias_list_ycn():
-    async with alias_list_ycn_lock:
-        return await _get_data(
-            "Alias/YuzuChaN", URL("https://www.yuzuchan.moe/api/maimaidx/maimaidxalias")
-        )
+    return await alias_list_ycn.get()
 
 
 async def get_alias_list_xray():
-    async with alias_list_xray_lock:
-        return await _get_data(
-            "Alias/Xray", URL("https://download.xraybot.site/maimai/alias.json")
-        )
+    return await alias_list_xray.get()
@@ -1,27 +1,68 @@
+from functools import wraps
+
+from nonebot import get_driver
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase
-from sqlalchemy.pool import NullPool
 
 from .config import config
 
-engine = create_async_engine(config.database_url, echo=False, poolclass=NullPool)
+
+def _create_engine(url: str):
+    is_psycopg = make_url(url).get_driver_name() == "psycopg"
+    connect_args = dict()
+    if is_psycopg and not config.database_prepared_statements:
+        # 经事务级连接池连接时，同一会话可能落在不同的服务端连接上
+        connect_args["prepare_threshold"] = None
+
+    new_engine = create_async_engine(
+        url,
+        echo=False,
+        pool_size=config.database_pool_size,
+        max_overflow=config.database_max_overflow,
+        pool_pre_ping=config.database_pre_ping,
+        connect_args=connect_args,
+    )
+
+    return new_engine
+
+
+engine = _create_engine(config.database_url)
+# 未配置只读副本时，只读事务同样使用主库
+read_engine = (
+    _create_engine(config.database_read_url) if config.database_read_url else engine
+)
 
 AsyncSessionLocal = async_sessionmaker(
     engine, class_=AsyncSession, expire_on_commit=False
 )
+ReadSessionLocal = async_sessionmaker(
+    read_engine, class_=AsyncSession, expire_on_commit=False
+)
 
 
 class Base(DeclarativeBase):
     pass
 
 
-def with_transaction(func):
+def with_transaction(func=None, *, read_only: bool = False):
+    if func is None:
+        return lambda f: with_transaction(f, read_only=read_only)
+
+    @wraps(func)
     async def wrapper(*args, **kwargs):
-        session = AsyncSessionLocal()
+        # 已经处于外层事务中时直接复用，由外层负责提交与关闭
+        if kwargs.get("session") is not None:
+            return await func(*args, **kwargs)
+
+        session = ReadSessionLocal() if read_only else AsyncSessionLocal()
         kwargs["session"] = session
         try:
             result = await func(*args, **kwargs)
-            await session.commit()
+            if read_only:
+                await session.rollback()
+            else:
+                await session.commit()
             return result
         except Exception:
             try:
@@ -38,10 +79,34 @@ def with_transaction(func):
     return wrapper
 
 
+def _create_indexes(conn):
+    # create_all 不会为已存在的表补建新增的索引
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+
+
 async def init_database():
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(_create_indexes)
 
 
 async def close_database():
     await engine.dispose()
+    if read_engine is not engine:
+        await read_engine.dispose()
+
+
+driver = get_driver()
+
+
+@driver.on_startup
+async def _():
+    # 启动时补建缺失的表与索引，已存在的不会改动
+    await init_database()
+
+
+@driver.on_shutdown
+async def _():
+    await close_database()
@@ -4,3 +4,7 @@ class ContinuedException(Exception):
 
 class ProcessedException(Exception):
     pass
+
+
+class WriteBufferError(Exception):
+    pass
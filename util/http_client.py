@@ -0,0 +1,124 @@
+import asyncio
+
+from httpx import (
+    AsyncClient,
+    Limits,
+    Response,
+    Timeout,
+    TransportError,
+    URL,
+)
+from nonebot import get_driver
+
+# 可以安全重试的请求方法
+IDEMPOTENT_METHODS = ("GET", "HEAD", "OPTIONS")
+# 可以重试的响应状态码
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+
+class HostPolicy:
+    def __init__(
+        self,
+        max_connections: int = 16,
+        max_keepalive_connections: int = 8,
+        keepalive_expiry: float = 60,
+        timeout: float = 10,
+        connect_timeout: float = 5,
+        retries: int = 2,
+        backoff: float = 0.5,
+    ):
+        self.limits = Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.timeout = Timeout(timeout, connect=connect_timeout)
+        self.retries = retries
+        self.backoff = backoff
+
+
+# 所有未单独配置的主机共用，连接数上限相应放宽
+DEFAULT_POLICY = HostPolicy(max_connections=64, max_keepalive_connections=16)
+
+HOST_POLICIES = {
+    "www.diving-fish.com": HostPolicy(timeout=15),
+    "maimai.lxns.net": HostPolicy(timeout=15),
+    "www.yuzuchan.moe": HostPolicy(),
+    "download.xraybot.site": HostPolicy(),
+    "api.bilibili.com": HostPolicy(),
+    # 语音合成耗时较长且按字数计费，不重试
+    "api.minimaxi.com": HostPolicy(timeout=60, retries=0),
+}
+
+
+class HttpClientManager:
+    def __init__(self):
+        self.clients: dict[str, AsyncClient] = dict()
+
+    def get_client(self, host: str) -> AsyncClient:
+        # 未单独配置的主机（如用户发来的任意链接）共用一个客户端，避免客户端无限增多
+        key = host if host in HOST_POLICIES else str()
+        if (client := self.clients.get(key)) and not client.is_closed:
+            return client
+
+        policy = HOST_POLICIES.get(host, DEFAULT_POLICY)
+        client = AsyncClient(
+            http2=True,
+            follow_redirects=True,
+            limits=policy.limits,
+            timeout=policy.timeout,
+        )
+        self.clients[key] = client
+        return client
+
+    async def request(self, method: str, url: str | URL, **kwargs) -> Response:
+        url = URL(url)
+        client = self.get_client(url.host)
+        policy = HOST_POLICIES.get(url.host, DEFAULT_POLICY)
+        retries = policy.retries if method.upper() in IDEMPOTENT_METHODS else 0
+
+        attempt = 0
+        while True:
+            try:
+                resp = await client.request(method, url, **kwargs)
+                if resp.status_code not in RETRY_STATUS_CODES or attempt >= retries:
+                    return resp
+            except TransportError:
+                if attempt >= retries:
+                    raise
+
+            # 指数退避
+            await asyncio.sleep(policy.backoff * 2**attempt)
+            attempt += 1
+
+    async def get(self, url: str | URL, **kwargs) -> Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str | URL, **kwargs) -> Response:
+        return await self.request("POST", url, **kwargs)
+
+    async def start(self):
+        for host in HOST_POLICIES:
+            self.get_client(host)
+
+    async def close(self):
+        clients = list(self.clients.values())
+        self.clients.clear()
+        await asyncio.gather(
+            *(client.aclose() for client in clients), return_exceptions=True
+        )
+
+
+http_client = HttpClientManager()
+
+driver = get_driver()
+
+
+@driver.on_startup
+async def _():
+    await http_client.start()
+
+
+@driver.on_shutdown
+async def _():
+    await http_client.close()
@@ -0,0 +1,77 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from multiprocessing import get_context
+from typing import Callable, Optional
+
+from nonebot import get_driver, logger
+
+from .config import config
+
+
+def _warm_up():
+    return
+
+
+class RenderExecutor:
+    def __init__(self):
+        self.executor: Optional[ProcessPoolExecutor] = None
+        # 进程池损坏后不再 fork 新的进程池
+        self.disabled = False
+
+    def start(self):
+        if self.executor or self.disabled or config.render_workers <= 0:
+            return
+
+        # 插件模块无法在全新的解释器中导入，只能 fork
+        # 只在启动时创建一次，之后进程中已有持锁的渲染线程与 gRPC 线程，
+        # 再 fork 可能把被持有的锁复制进子进程而死锁
+        self.executor = ProcessPoolExecutor(
+            max_workers=config.render_workers, mp_context=get_context("fork")
+        )
+        self.executor.submit(_warm_up)
+
+    async def run(self, func: Callable, *args, **kwargs):
+        # 超时由调用方按整张图片计算，排队等待的时间不应算在单个分块上
+        call = partial(func, *args, **kwargs)
+
+        self.start()
+        if not (executor := self.executor):
+            # 未启用或已停用渲染进程时在线程中渲染
+            return await asyncio.to_thread(call)
+
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(executor, call)
+        except BrokenProcessPool:
+            # 工作进程异常退出，进程池已不可用，此后改为在线程中渲染
+            # 正在进行的渲染不在主进程重试，以免同样的原因拖垮主进程
+            if self.executor is executor:
+                logger.warning("渲染进程池已损坏，改为在线程中渲染")
+                self.disabled = True
+                self.close()
+            raise
+
+    def close(self):
+        if not self.executor:
+            return
+
+        executor = self.executor
+        self.executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+render_executor = RenderExecutor()
+
+driver = get_driver()
+
+
+@driver.on_startup
+async def _():
+    render_executor.start()
+
+
+@driver.on_shutdown
+async def _():
+    render_executor.close()
@@ -1,46 +1,175 @@
+import asyncio
+import math
 import os
+import threading
+from asyncio import Semaphore, Task
+from collections import OrderedDict
 from pathlib import Path
+from typing import Optional
 
-import aiofiles
-from PIL import Image, UnidentifiedImageError
-from PIL.ImageFile import ImageFile
+from PIL import Image
+from PIL.Image import Image as ImageObject
 from cloudscraper import CloudScraper
 from soundfile import LibsndfileError, SoundFile
 
 CACHE_ROOT = Path("Cache")
 
+# 同时进行的下载数上限
+MAX_CONCURRENT_DOWNLOADS = 8
+
+# 解码后图片缓存的内存上限
+IMAGE_CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+_download_semaphore = Semaphore(MAX_CONCURRENT_DOWNLOADS)
+_downloads: dict[Path, Task] = dict()
+_local = threading.local()
+
+
+def _get_scraper() -> CloudScraper:
+    # 每个工作线程复用一个会话，保持与资源站的连接
+    if not (scraper := getattr(_local, "scraper", None)):
+        scraper = _local.scraper = CloudScraper()
+    return scraper
+
+
+def _download(path: Path, url: str):
+    resp = _get_scraper().get(url, timeout=5)
+    resp.raise_for_status()
+
+    os.makedirs(path.parent, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.tmp")
+    with open(tmp_path, "wb") as fd:
+        fd.write(resp.content)
+    os.replace(tmp_path, path)
+
+
+async def _fetch_res(path: Path, url: str):
+    async with _download_semaphore:
+        if os.path.exists(path):
+            return
+        await asyncio.to_thread(_download, path, url)
+
 
 async def _check_res(path: str | os.PathLike[str] | Path, url: str):
+    path = Path(path)
     if os.path.exists(path):
         return
 
-    with CloudScraper() as scraper:
-        resp = scraper.get(url, timeout=5)
+    # 同一资源的并发请求共用一次下载
+    if not (task := _downloads.get(path)):
+        task = asyncio.create_task(_fetch_res(path, url))
+        _downloads[path] = task
+        task.add_done_callback(lambda _: _downloads.pop(path, None))
 
-        resp.raise_for_status()
-        async with aiofiles.open(path, "wb") as fd:
-            await fd.write(resp.content)
+    await asyncio.shield(task)
 
 
-async def _get_image(key: str, value: str | int, url: str) -> ImageFile:
+async def download_asset(
+    key: str, kind: str, res_id: str | int, suffix: str = "png"
+) -> bool:
+    # 仅确保资源已缓存到本地，返回是否进行了下载
+    path = CACHE_ROOT / key / f"{res_id}.{suffix}"
+    if os.path.exists(path):
+        return False
+
+    await _check_res(path, f"https://assets2.lxns.net/maimai/{kind}/{res_id}.{suffix}")
+    return True
+
+
+def _image_bytes(image: ImageObject) -> int:
+    return image.width * image.height * len(image.getbands())
+
+
+class ImageCache:
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.images: OrderedDict[tuple, ImageObject] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        # 合成在线程中进行，需要加锁
+        self.lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.images)
+
+    def get(self, key: tuple) -> Optional[ImageObject]:
+        with self.lock:
+            if (image := self.images.get(key)) is None:
+                self.misses += 1
+                return None
+
+            self.images.move_to_end(key)
+            self.hits += 1
+            return image
+
+    def put(self, key: tuple, image: ImageObject):
+        size = _image_bytes(image)
+        if size > self.max_bytes:
+            return
+
+        with self.lock:
+            if key in self.images:
+                self.size -= _image_bytes(self.images.pop(key))
+
+            self.images[key] = image
+            self.size += size
+            while self.size > self.max_bytes:
+                _, old = self.images.popitem(last=False)
+                self.size -= _image_bytes(old)
+
+    def discard(self, path: str | os.PathLike[str] | Path):
+        path = os.path.normpath(path)
+        with self.lock:
+            for key in [key for key in self.images if key[0] == path]:
+                self.size -= _image_bytes(self.images.pop(key))
+
+
+image_cache = ImageCache(IMAGE_CACHE_MAX_BYTES)
+
+
+def open_image(
+    path: str | os.PathLike[str] | Path,
+    scale: Optional[float] = None,
+    size: Optional[tuple[int, int]] = None,
+) -> ImageObject:
+    # 返回的图片为共享缓存，需要原地修改时请先 copy()
+    path = os.path.normpath(path)
+    key = (path, size or scale)
+    if (image := image_cache.get(key)) is not None:
+        return image
+
+    if size or scale:
+        image = open_image(path)
+        if scale:
+            size = (math.ceil(image.width * scale), math.ceil(image.height * scale))
+        image = image.resize(size)
+    else:
+        image = Image.open(path)
+        image.load()
+
+    image_cache.put(key, image)
+    return image
+
+
+async def _get_image(
+    key: str,
+    value: str | int,
+    url: str,
+    scale: Optional[float] = None,
+    size: Optional[tuple[int, int]] = None,
+) -> ImageObject:
     path = CACHE_ROOT / key / f"{value}.png"
     await _check_res(path, url)
     try:
-        image = Image.open(path)
-    except UnidentifiedImageError:
-        os.remove(path)
-        return await _get_image(key, value, url)
+        return open_image(path, scale, size)
     except FileNotFoundError:
-        return await _get_image(key, value, url)
-
-    try:
-        image.verify()
+        return await _get_image(key, value, url, scale, size)
     except OSError:
+        # 文件损坏，删除后重新下载
+        image_cache.discard(path)
         os.remove(path)
-        return await _get_image(key, value, url)
-
-    image.close()
-    return Image.open(path)
+        return await _get_image(key, value, url, scale, size)
 
 
 async def _get_audio(key: str, value: str | int, url: str) -> SoundFile:
@@ -55,24 +184,40 @@ async def _get_audio(key: str, value: str | int, url: str) -> SoundFile:
     return audio
 
 
-async def get_icon(res_id: str | int) -> ImageFile:
+async def get_icon(
+    res_id: str | int,
+    scale: Optional[float] = None,
+    size: Optional[tuple[int, int]] = None,
+) -> ImageObject:
     url = f"https://assets2.lxns.net/maimai/icon/{res_id}.png"
-    return await _get_image("Icon", res_id, url)
+    return await _get_image("Icon", res_id, url, scale, size)
 
 
-async def get_plate(res_id: str | int) -> ImageFile:
+async def get_plate(
+    res_id: str | int,
+    scale: Optional[float] = None,
+    size: Optional[tuple[int, int]] = None,
+) -> ImageObject:
     url = f"https://assets2.lxns.net/maimai/plate/{res_id}.png"
-    return await _get_image("Plate", res_id, url)
+    return await _get_image("Plate", res_id, url, scale, size)
 
 
-async def get_frame(res_id: str | int) -> ImageFile:
+async def get_frame(
+    res_id: str | int,
+    scale: Optional[float] = None,
+    size: Optional[tuple[int, int]] = None,
+) -> ImageObject:
     url = f"https://assets2.lxns.net/maimai/frame/{res_id}.png"
-    return await _get_image("Frame", res_id, url)
+    return await _get_image("Frame", res_id, url, scale, size)
 
 
-async def get_jacket(song_id: str | int) -> ImageFile:
+async def get_jacket(
+    song_id: str | int,
+    scale: Optional[float] = None,
+    size: Optional[tuple[int, int]] = None,
+) -> ImageObject:
     url = f"https://assets2.lxns.net/maimai/jacket/{song_id}.png"
-    return await _get_image("Jacket", song_id, url)
+    return await _get_image("Jacket", song_id, url, scale, size)
 
 
 async def get_music(song_id: str | int) -> SoundFile:
@@ -1,8 +1,25 @@
-from datetime import datetime, timedelta, timezone
+from datetime import date, datetime, timedelta, timezone
 from typing import Any, Literal, Optional
 
 from numpy import random
-from sqlalchemy import Boolean, DateTime, Integer, String, update
+from sqlalchemy import (
+    Boolean,
+    Date,
+    DateTime,
+    Index,
+    Integer,
+    String,
+    case,
+    desc,
+    false,
+    func,
+    literal,
+    literal_column,
+    or_,
+    true,
+    union_all,
+    update,
+)
 from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
@@ -28,7 +45,8 @@ class StarAction(Base):
     __tablename__ = "star_actions"
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
-    qq: Mapped[str] = mapped_column(String(10), nullable=False, index=True)
+    # 按 qq 的查询都由下面两个以 qq 开头的复合索引覆盖
+    qq: Mapped[str] = mapped_column(String(10), nullable=False)
     before_balance: Mapped[int] = mapped_column(Integer, nullable=False)
     after_balance: Mapped[int] = mapped_column(Integer, nullable=False)
     cause: Mapped[str] = mapped_column(String(128), nullable=False)
@@ -38,8 +56,46 @@ class StarAction(Base):
         default=lambda: datetime.now(timezone(timedelta(hours=8))),
     )
 
+    __table_args__ = (
+        # 签到判断与按天统计按时间范围取
+        Index("ix_star_actions_qq_created_at", "qq", "created_at"),
+        # 明细翻页按 id 倒序取，每页只回表十来行，不附带其余列
+        Index("ix_star_actions_qq_id", "qq", desc("id")),
+    )
+
+
+class StarRewardDay(Base):
+    __tablename__ = "star_reward_days"
+
+    qq: Mapped[str] = mapped_column(String(10), primary_key=True)
+    # 最近一次领取签到奖励的日期（UTC+8）
+    last_day: Mapped[date] = mapped_column(Date, nullable=False)
+
 
 class Stars:
+    @with_transaction
+    async def _claim_first_reward(self, qq: str, time: int, **kwargs) -> bool:
+        session: AsyncSession = kwargs["session"]
+
+        # 标记只由 give_rewards 写入，每天只有第一次领取奖励算作签到
+        # 与余额是否实际增加无关，无限余额或已达上限的用户同样每天一次
+        today = datetime.fromtimestamp(time, timezone(timedelta(hours=8))).date()
+        stmt = insert(StarRewardDay).values(qq=qq, last_day=today)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["qq"],
+            set_={"last_day": stmt.excluded.last_day},
+            where=StarRewardDay.last_day < stmt.excluded.last_day,
+        ).returning(literal_column("xmax = 0", Boolean))
+        result = await session.execute(stmt)
+        row = result.first()
+        if row is None:
+            return False
+        if not row[0]:
+            return True
+
+        # 首次写入标记时，当天可能已经按明细领取过
+        return await self._is_first_reward_today(qq, time, session=session)
+
     @with_transaction
     async def _is_first_reward_today(self, qq: str, time: int, **kwargs) -> bool:
         session: AsyncSession = kwargs["session"]
@@ -78,186 +134,193 @@ class Stars:
             return "inf"
         return int(balance) if balance is not None else INITIAL_STAR_BALANCE
 
-    @with_transaction
-    async def _get_user_balance_info(self, qq: str, **kwargs) -> tuple[bool, int]:
-        session: AsyncSession = kwargs["session"]
-
-        stmt = select(StarBalance.balance, StarBalance.is_infinite).where(
-            StarBalance.qq == qq
-        )
-        result = await session.execute(stmt)
-        row = result.first()
-        if not row:
-            return False, INITIAL_STAR_BALANCE
-        balance, is_infinite = row
-        return is_infinite, balance if balance is not None else INITIAL_STAR_BALANCE
-
-    @with_transaction
-    async def _ensure_user_exists(self, qq: str, **kwargs) -> None:
-        session: AsyncSession = kwargs["session"]
+    def _changes_stmt(self, qq: str, changes: list[tuple[int, str]], time: int):
+        # 合并为一条语句：锁定并读取原余额、写入新余额、逐笔记录明细
+        # 多笔变动按顺序截断到上限，仅在单笔变动或全部为收入时与逐笔执行一致
+        total = sum(num for num, _ in changes)
+        now = datetime.fromtimestamp(time, timezone(timedelta(hours=8)))
 
-        ins_stmt = insert(StarBalance).values(
-            qq=qq, balance=INITIAL_STAR_BALANCE, is_infinite=False
+        old = (
+            select(StarBalance.balance)
+            .where(StarBalance.qq == qq)
+            .with_for_update()
+            .cte("old")
         )
-        ins_stmt = ins_stmt.on_conflict_do_nothing(index_elements=["qq"])
-        await session.execute(ins_stmt)
-
-    @with_transaction
-    async def _deduct_balance(self, qq: str, amount: int, **kwargs) -> Optional[int]:
-        session: AsyncSession = kwargs["session"]
-
-        ins_stmt = insert(StarBalance).values(
-            qq=qq, balance=INITIAL_STAR_BALANCE, is_infinite=False
+        # 让写入依赖于 old，保证先锁定读取再更新
+        one = select(literal(1).label("one")).subquery("one")
+        source = select(
+            literal(qq, String),
+            literal(min(INITIAL_STAR_BALANCE + total, MAX_STAR_BALANCE), Integer),
+            false(),
+        ).select_from(one.outerjoin(old, true()))
+        if INITIAL_STAR_BALANCE + total < 0:
+            # 新用户的初始余额不够扣除时不插入，整条语句不返回行
+            source = source.where(old.c.balance.is_not(None))
+
+        upsert_stmt = insert(StarBalance).from_select(
+            ["qq", "balance", "is_infinite"], source
         )
-        ins_stmt = ins_stmt.on_conflict_do_nothing(index_elements=["qq"])
-        await session.execute(ins_stmt)
-
-        upd_stmt = (
-            update(StarBalance)
-            .where(StarBalance.qq == qq, StarBalance.balance > 0)
-            .values(balance=StarBalance.balance - amount)
-            .returning(StarBalance.balance)
-        )
-        upd_result = await session.execute(upd_stmt)
-        upd_row = upd_result.first()
-        return int(upd_row[0]) if upd_row else None
-
-    @with_transaction
-    async def _add_balance(self, qq: str, amount: int, **kwargs) -> int:
-        session: AsyncSession = kwargs["session"]
-
-        ins_stmt = insert(StarBalance).values(
-            qq=qq, balance=INITIAL_STAR_BALANCE, is_infinite=False
+        upsert_stmt = upsert_stmt.on_conflict_do_update(
+            index_elements=["qq"],
+            set_={
+                "balance": case(
+                    (StarBalance.is_infinite, StarBalance.balance),
+                    else_=func.least(StarBalance.balance + total, MAX_STAR_BALANCE),
+                )
+            },
+            # 余额不足以扣除时不更新，整条语句不返回行
+            where=or_(StarBalance.is_infinite, StarBalance.balance + total >= 0)
+            if total < 0
+            else None,
         )
-        ins_stmt = ins_stmt.on_conflict_do_nothing(index_elements=["qq"])
-        await session.execute(ins_stmt)
-
-        upd_stmt = (
-            update(StarBalance)
-            .where(StarBalance.qq == qq)
-            .values(balance=StarBalance.balance + amount)
-            .returning(StarBalance.balance)
+        upserted = upsert_stmt.returning(
+            StarBalance.balance,
+            StarBalance.is_infinite,
+            literal_column("xmax = 0", Boolean).label("inserted"),
+        ).cte("upserted")
+
+        # 并发插入冲突时 old 为空，只能由变动后的余额反推
+        before_balance = case(
+            (old.c.balance.is_not(None), old.c.balance),
+            (upserted.c.inserted, INITIAL_STAR_BALANCE),
+            else_=upserted.c.balance - total,
         )
-        upd_result = await session.execute(upd_stmt)
-        upd_row = upd_result.first()
-
-        if upd_row:
-            after_balance = int(upd_row[0])
-            if after_balance > MAX_STAR_BALANCE:
-                after_balance = MAX_STAR_BALANCE
-                limit_upd_stmt = (
-                    update(StarBalance)
-                    .where(StarBalance.qq == qq)
-                    .values(balance=MAX_STAR_BALANCE)
-                )
-                await session.execute(limit_upd_stmt)
-            return after_balance
-        else:
-            new_balance = INITIAL_STAR_BALANCE + amount
-            if new_balance > MAX_STAR_BALANCE:
-                new_balance = MAX_STAR_BALANCE
-
-            ins_stmt = insert(StarBalance).values(
-                qq=qq, balance=new_balance, is_infinite=False
+        rows = list()
+        offset = 0
+        for num, cause in changes:
+            step_before = case(
+                (upserted.c.is_infinite, before_balance),
+                else_=func.least(before_balance + offset, MAX_STAR_BALANCE),
             )
-            ins_stmt = ins_stmt.on_conflict_do_update(
-                index_elements=["qq"],
-                set_={"balance": StarBalance.balance + ins_stmt.excluded.balance},
+            offset += num
+            step_after = case(
+                (upserted.c.is_infinite, before_balance),
+                else_=func.least(before_balance + offset, MAX_STAR_BALANCE),
             )
-            await session.execute(ins_stmt)
-
-            sel_stmt = select(StarBalance.balance).where(StarBalance.qq == qq)
-            sel_result = await session.execute(sel_stmt)
-            sel_row = sel_result.first()
-            after_balance = (
-                int(sel_row[0]) if sel_row and sel_row[0] is not None else new_balance
+            rows.append(
+                select(
+                    literal(qq, String),
+                    step_before,
+                    step_after,
+                    literal(cause, String),
+                    literal(now, DateTime(timezone=True)),
+                ).select_from(upserted.outerjoin(old, true()))
             )
 
-            if after_balance > MAX_STAR_BALANCE:
-                after_balance = MAX_STAR_BALANCE
-                limit_upd_stmt = (
-                    update(StarBalance)
-                    .where(StarBalance.qq == qq)
-                    .values(balance=MAX_STAR_BALANCE)
-                )
-                await session.execute(limit_upd_stmt)
-
-            return after_balance
+        action_stmt = insert(StarAction).from_select(
+            ["qq", "before_balance", "after_balance", "cause", "created_at"],
+            union_all(*rows) if len(rows) > 1 else rows[0],
+        )
+        action = action_stmt.returning(StarAction.after_balance).cte("action")
+        return select(action.c.after_balance)
 
     @with_transaction
-    async def _record_action(
-        self,
-        qq: str,
-        before_balance: int,
-        after_balance: int,
-        cause: str,
-        time: int,
-        **kwargs,
-    ) -> None:
+    async def _apply_changes(
+        self, qq: str, changes: list[tuple[int, str]], time: int, **kwargs
+    ) -> bool:
         session: AsyncSession = kwargs["session"]
 
-        now = datetime.fromtimestamp(time, timezone(timedelta(hours=8)))
-        action_stmt = insert(StarAction).values(
-            qq=qq,
-            before_balance=before_balance,
-            after_balance=after_balance,
-            cause=cause,
-            created_at=now,
-        )
-        await session.execute(action_stmt)
-
-    async def apply_change(self, qq: str, num: int, cause: str, time: int) -> bool:
-        if num == 0:
+        changes = [(num, cause) for num, cause in changes if num != 0]
+        if not changes:
             return True
 
-        is_infinite, current_balance = await self._get_user_balance_info(qq)
+        result = await session.execute(self._changes_stmt(qq, changes, time))
+        return result.first() is not None
 
-        if is_infinite:
-            await self._record_action(qq, current_balance, current_balance, cause, time)
-            return True
-
-        if num < 0:
-            await self._ensure_user_exists(qq)
-            after_balance = await self._deduct_balance(qq, abs(num))
-            if after_balance is None:
-                return False
-            before_balance = after_balance + num
-        else:
-            after_balance = await self._add_balance(qq, num)
-            before_balance = after_balance - num
-
-        await self._record_action(qq, before_balance, after_balance, cause, time)
-        return True
+    async def apply_change(
+        self, qq: str, num: int, cause: str, time: int, **kwargs
+    ) -> bool:
+        return await self._apply_changes(qq, [(num, cause)], time, **kwargs)
 
     @with_transaction
     async def list_actions(
-        self, qq: str, num: Optional[int] = None, **kwargs
+        self,
+        qq: str,
+        num: Optional[int] = None,
+        before_id: Optional[int] = None,
+        **kwargs,
     ) -> list[dict[str, Any]]:
         session: AsyncSession = kwargs["session"]
 
         stmt = (
-            select(StarAction).where(StarAction.qq == qq).order_by(StarAction.id.desc())
+            select(
+                StarAction.id,
+                (StarAction.after_balance - StarAction.before_balance).label("change"),
+                StarAction.cause,
+                StarAction.created_at,
+            )
+            .where(StarAction.qq == qq)
+            .order_by(StarAction.id.desc())
         )
+        # 以上一页最后一条的 id 为界继续向前翻
+        if before_id is not None:
+            stmt = stmt.where(StarAction.id < before_id)
         if num is not None:
             stmt = stmt.limit(num)
 
         result = await session.execute(stmt)
-        records = result.scalars().all()
 
         actions: list[dict[str, Any]] = list()
-        for rec in records:
+        for action_id, change, cause, created_at in result.all():
             actions.append(
                 {
-                    "id": rec.id,
-                    "qq": rec.qq,
-                    "change": rec.after_balance - rec.before_balance,
-                    "cause": rec.cause,
-                    "created_at": rec.created_at,
+                    "id": action_id,
+                    "qq": qq,
+                    "change": change,
+                    "cause": cause,
+                    "created_at": created_at,
                 }
             )
 
         return actions
 
+    @with_transaction
+    async def daily_changes(
+        self, qq: str, days: int, time: int, **kwargs
+    ) -> list[tuple[date, int]]:
+        session: AsyncSession = kwargs["session"]
+
+        tz = timezone(timedelta(hours=8))
+        now = datetime.fromtimestamp(time, tz)
+        start = datetime(now.year, now.month, now.day, tzinfo=tz) - timedelta(
+            days=days - 1
+        )
+        day = func.date(func.timezone("Asia/Shanghai", StarAction.created_at))
+
+        stmt = (
+            select(
+                day.label("day"),
+                func.sum(StarAction.after_balance - StarAction.before_balance),
+            )
+            .where(StarAction.qq == qq, StarAction.created_at >= start)
+            .group_by("day")
+            .order_by(desc("day"))
+        )
+        result = await session.execute(stmt)
+        return [(row[0], int(row[1])) for row in result.all()]
+
+    @with_transaction
+    async def cause_totals(
+        self, qq: str, num: Optional[int] = None, **kwargs
+    ) -> list[tuple[str, int, int]]:
+        session: AsyncSession = kwargs["session"]
+
+        stmt = (
+            select(
+                StarAction.cause,
+                func.sum(StarAction.after_balance - StarAction.before_balance),
+                func.count(),
+            )
+            .where(StarAction.qq == qq)
+            .group_by(StarAction.cause)
+            .order_by(func.count().desc())
+        )
+        if num is not None:
+            stmt = stmt.limit(num)
+
+        result = await session.execute(stmt)
+        return [(row[0], int(row[1]), int(row[2])) for row in result.all()]
+
     @with_transaction
     async def set_inf_balance(self, qq: str, enable: bool, **kwargs) -> bool:
         session: AsyncSession = kwargs["session"]
@@ -284,19 +347,25 @@ class Stars:
         await session.execute(ins_stmt)
         return True
 
+    @with_transaction
     async def give_rewards(
-        self, qq: str, min: int, max: int, cause: str, time: int
+        self, qq: str, min: int, max: int, cause: str, time: int, **kwargs
     ) -> tuple[int, int, int, int]:
+        session: AsyncSession = kwargs["session"]
+
         rng = random.default_rng()
         star = int(rng.integers(min, max))
         method = rng.choice(range(0b0000_0100), p=[0.91, 0.05, 0.03, 0.01])
-        is_first_reward_today = await self._is_first_reward_today(qq, time)
+        is_first_reward_today = await self._claim_first_reward(
+            qq, time, session=session
+        )
         reward = 0
         extend = 0
 
+        changes = list()
         if is_first_reward_today:
             reward = int(rng.integers(50, 100))
-            await self.apply_change(qq, reward, "签到", time)
+            changes.append((reward, "签到"))
             method |= 0b0001_0000
 
         if method == 0b0000_0001:
@@ -306,7 +375,9 @@ class Stars:
         elif method == 0b0000_0011:
             extend = int(rng.integers(100, 200))
 
-        await self.apply_change(qq, star + extend, cause, time)
+        # 签到奖励与本次奖励在同一条语句中入账
+        changes.append((star + extend, cause))
+        await self._apply_changes(qq, changes, time, session=session)
         return star, method, extend, reward
 
 
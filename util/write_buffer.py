@@ -0,0 +1,309 @@
+import asyncio
+import os
+import time
+from asyncio import Lock, Task
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Optional
+from uuid import uuid4
+
+import orjson
+from nonebot import get_driver, logger
+from sqlalchemy import DateTime, String, delete
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import DataError, IntegrityError, InterfaceError, OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .database import Base, with_transaction
+from .exceptions import WriteBufferError
+
+# 定时写入的间隔（秒）
+FLUSH_INTERVAL = 1
+# 待写入条数达到该值时立即写入
+FLUSH_SIZE = 256
+# 数据本身无法写入的批次失败达到该次数后移入死信文件，下次启动时重新写入
+MAX_ATTEMPTS = 3
+# 其余失败按指数退避重试，重试间隔的上限（秒）
+MAX_RETRY_DELAY = 300
+# 已写入批次记录的保留时间
+BATCH_RECORD_TTL = timedelta(days=7)
+
+WRITE_BUFFER_PATH = Path("Data") / "WriteBuffer"
+
+Handler = Callable[[list[dict[str, Any]], AsyncSession], Awaitable[None]]
+
+
+class WriteBufferBatch(Base):
+    __tablename__ = "write_buffer_batches"
+
+    id: Mapped[str] = mapped_column(String(32), primary_key=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        nullable=False,
+        default=lambda: datetime.now(timezone(timedelta(hours=8))),
+    )
+
+
+def _append_lines(path: Path, lines: list[bytes]):
+    with open(path, "ab") as f:
+        f.writelines(lines)
+
+
+def _seal(journal_path: Path, batch_file: Path, lines: list[bytes]):
+    # 已落盘的日志整体改名为批次文件，再补上还没落盘的行
+    if journal_path.exists():
+        os.replace(journal_path, batch_file)
+    _append_lines(batch_file, lines)
+
+
+def _read_items(path: Path) -> list[tuple[str, dict[str, Any]]]:
+    items = list()
+    for line in path.read_bytes().splitlines():
+        try:
+            name, item = orjson.loads(line)
+        except orjson.JSONDecodeError:
+            # 崩溃时写了一半的行
+            continue
+        items.append((name, item))
+    return items
+
+
+class WriteBuffer:
+    def __init__(self, path: Path):
+        # 待写入的数据先追加到 journal，写入数据库前封存为批次文件
+        self.journal_path = path / "journal.jsonl"
+        self.batch_path = path / "Batches"
+        self.dead_letter_path = path / "DeadLetter"
+        # 名称 -> 批量写入函数
+        self.handlers: dict[str, Handler] = dict()
+        # 尚未封存为批次的 (名称, 数据)
+        self.pending: list[tuple[str, dict[str, Any]]] = list()
+        # 尚未追加到 journal 的行
+        self.journal_lines: list[bytes] = list()
+        # 批次 id -> (数据, 失败次数, 下次重试时间)，按封存顺序写入
+        self.batches: dict[str, tuple[list[tuple[str, dict[str, Any]]], int, float]] = (
+            dict()
+        )
+        self.lock = Lock()
+        self.journal_lock = Lock()
+        self.task: Optional[Task] = None
+        self.journal_task: Optional[Task] = None
+        self.flush_task: Optional[Task] = None
+
+    def register(self, name: str, handler: Handler):
+        self.handlers[name] = handler
+
+    def put(self, name: str, item: dict[str, Any]):
+        self.pending.append((name, item))
+        # 日志在线程中批量追加，进程崩溃时未写入的数据可以在下次启动时恢复
+        self.journal_lines.append(orjson.dumps([name, item]) + b"\n")
+        if self.journal_task is None or self.journal_task.done():
+            self.journal_task = asyncio.create_task(self._write_journal())
+            self.journal_task.add_done_callback(self._check_task)
+
+        if len(self.pending) >= FLUSH_SIZE and (
+            self.flush_task is None or self.flush_task.done()
+        ):
+            self.flush_task = asyncio.create_task(self.flush())
+            self.flush_task.add_done_callback(self._check_task)
+
+    @staticmethod
+    def _check_task(task: Task):
+        if not task.cancelled() and (e := task.exception()):
+            logger.opt(exception=e).error("写入缓冲的后台任务失败")
+
+    async def _write_journal(self):
+        async with self.journal_lock:
+            while self.journal_lines:
+                lines = self.journal_lines
+                self.journal_lines = list()
+                await asyncio.to_thread(_append_lines, self.journal_path, lines)
+
+    async def _seal_pending(self):
+        async with self.journal_lock:
+            if not self.pending:
+                return
+
+            # 同步取出，之后 put 的数据进入新的 journal
+            items = self.pending
+            lines = self.journal_lines
+            self.pending = list()
+            self.journal_lines = list()
+            batch_id = uuid4().hex
+            try:
+                await asyncio.to_thread(
+                    _seal,
+                    self.journal_path,
+                    self.batch_path / f"{batch_id}.jsonl",
+                    lines,
+                )
+            except OSError:
+                self.pending = items + self.pending
+                self.journal_lines = lines + self.journal_lines
+                raise
+            self.batches[batch_id] = (items, 0, 0)
+
+    @with_transaction
+    async def _write(
+        self, batch_id: str, items: list[tuple[str, dict[str, Any]]], **kwargs
+    ):
+        session: AsyncSession = kwargs["session"]
+
+        # 批次记录与数据在同一事务中提交，崩溃后重放时跳过已提交的批次
+        stmt = (
+            insert(WriteBufferBatch)
+            .values(id=batch_id)
+            .on_conflict_do_nothing(index_elements=["id"])
+            .returning(WriteBufferBatch.id)
+        )
+        result = await session.execute(stmt)
+        if result.first() is None:
+            return
+
+        groups: dict[str, list[dict[str, Any]]] = dict()
+        for name, item in items:
+            groups.setdefault(name, list()).append(item)
+        for name, group in groups.items():
+            await self.handlers[name](group, session)
+
+    def _dead_letter(self, batch_id: str, items: list[tuple[str, dict[str, Any]]]):
+        path = self.dead_letter_path / f"{batch_id}.jsonl"
+        _append_lines(
+            path, [orjson.dumps([name, item]) + b"\n" for name, item in items]
+        )
+        (self.batch_path / f"{batch_id}.jsonl").unlink(missing_ok=True)
+
+    async def flush(self, *names: str):
+        # 指定名称时，其中仍有数据未能写入则抛出 WriteBufferError
+        async with self.lock:
+            try:
+                await self._seal_pending()
+            except OSError as e:
+                logger.error(f"封存待写入数据失败：{e!r}")
+
+            now = time.monotonic()
+            for batch_id, (items, attempts, retry_at) in list(self.batches.items()):
+                if retry_at > now:
+                    continue
+
+                try:
+                    await self._write(batch_id, items)
+                except (OperationalError, InterfaceError) as e:
+                    # 数据库连接问题，保留所有批次等待下次写入
+                    logger.warning(f"写入缓冲数据失败，稍后重试：{e!r}")
+                    break
+                except (DataError, IntegrityError) as e:
+                    attempts += 1
+                    if attempts >= MAX_ATTEMPTS:
+                        logger.error(
+                            f"批次 {batch_id} 多次写入失败，已移入死信文件：{e!r}"
+                        )
+                        del self.batches[batch_id]
+                        await asyncio.to_thread(self._dead_letter, batch_id, items)
+                        continue
+
+                    logger.warning(f"批次 {batch_id} 写入失败（{attempts}）：{e!r}")
+                    self.batches[batch_id] = (items, attempts, self._retry_at(attempts))
+                    continue
+                except Exception as e:
+                    # 表结构或写入函数的问题修复前一直保留，按退避间隔重试
+                    attempts += 1
+                    logger.opt(exception=e).error(
+                        f"批次 {batch_id} 写入失败（{attempts}），稍后重试"
+                    )
+                    self.batches[batch_id] = (items, attempts, self._retry_at(attempts))
+                    continue
+
+                del self.batches[batch_id]
+                await asyncio.to_thread(
+                    (self.batch_path / f"{batch_id}.jsonl").unlink, missing_ok=True
+                )
+
+            # 读取前指定名称写入时，未能写入的数据不能当作已经写入
+            remaining = [name for name, _ in self.pending]
+            for items, _, _ in self.batches.values():
+                remaining.extend(name for name, _ in items)
+            if not set(names).isdisjoint(remaining):
+                raise WriteBufferError(f"{'、'.join(names)} 仍有数据未写入")
+
+    @staticmethod
+    def _retry_at(attempts: int) -> float:
+        return time.monotonic() + min(FLUSH_INTERVAL * 2**attempts, MAX_RETRY_DELAY)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(FLUSH_INTERVAL)
+            await self.flush()
+
+    def _split_unknown(self, file: Path) -> list[tuple[str, dict[str, Any]]]:
+        items = _read_items(file)
+        unknown = [(name, item) for name, item in items if name not in self.handlers]
+        if not unknown:
+            return items
+
+        # 已经移除的写入类型移入死信文件，不随批次标记为已写入
+        logger.warning(f"批次 {file.stem} 中有 {len(unknown)} 条未知类型的数据")
+        with open(self.dead_letter_path / file.name, "wb") as f:
+            f.writelines(orjson.dumps([name, item]) + b"\n" for name, item in unknown)
+        known = [(name, item) for name, item in items if name in self.handlers]
+        temp = file.with_suffix(".tmp")
+        with open(temp, "wb") as f:
+            f.writelines(orjson.dumps([name, item]) + b"\n" for name, item in known)
+        os.replace(temp, file)
+        return known
+
+    def _replay(self):
+        os.makedirs(self.batch_path, exist_ok=True)
+        os.makedirs(self.dead_letter_path, exist_ok=True)
+        # 上次退出时尚未封存的日志直接作为一个新批次
+        if self.journal_path.exists():
+            os.replace(self.journal_path, self.batch_path / f"{uuid4().hex}.jsonl")
+        # 死信文件重新作为新批次写入，修复后重启即可补写
+        for file in self.dead_letter_path.glob("*.jsonl"):
+            os.replace(file, self.batch_path / f"{uuid4().hex}.jsonl")
+
+        files = sorted(self.batch_path.glob("*.jsonl"), key=os.path.getmtime)
+        for file in files:
+            if items := self._split_unknown(file):
+                self.batches[file.stem] = (items, 0, 0)
+            else:
+                file.unlink()
+
+    @with_transaction
+    async def _prune(self, **kwargs):
+        session: AsyncSession = kwargs["session"]
+
+        expired_at = datetime.now(timezone(timedelta(hours=8))) - BATCH_RECORD_TTL
+        stmt = delete(WriteBufferBatch).where(WriteBufferBatch.created_at < expired_at)
+        await session.execute(stmt)
+
+    async def start(self):
+        await asyncio.to_thread(self._replay)
+        try:
+            await self._prune()
+        except Exception as e:
+            logger.warning(f"清理写入缓冲批次记录失败：{e!r}")
+        if self.task is None:
+            self.task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+        await self.flush()
+
+
+write_buffer = WriteBuffer(WRITE_BUFFER_PATH)
+
+driver = get_driver()
+
+
+@driver.on_startup
+async def _():
+    await write_buffer.start()
+
+
+@driver.on_shutdown
+async def _():
+    await write_buffer.close()